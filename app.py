@@ -1,31 +1,112 @@
 import logging
-import sys
-from flask import Flask, request, jsonify, render_template
+import json
+import queue
+import re
+import time
+import zlib
+from flask import Flask, request, jsonify, render_template, Response, stream_with_context
 from omnidimension import Client
+from omnidim_stub import StubClient
 from datetime import datetime
+import atexit
+import hmac
 import os
+import secrets
 import traceback
 from flask_cors import CORS
 from model import RoommateMatchingModel
+from match_scheduler import MatchScheduler
+from partitions import PartitionedIndex
+from cache import make_cache
+from event_log import EventLog
+from archive_exporter import ArchiveExporter, make_sink
+from campaigns import CampaignScheduler
+from transcript_store import TranscriptStore
+from search_index import SearchIndex
+from text_features import TextFeaturizer
+from profile_aggregates import ProfileAggregates
+from room_inventory import RoomInventory
+from reassignment import LocalRepair, snapshot_compatibility, snapshot_preferences
+from stable_roommates import solve_stable_roommates
+from group_formation import DEFAULT_REQUIRED_FACTORS, form_groups
+from deadline_matching import DeadlineExceeded, DeadlineMatcher
+from responses import FastJSONProvider, compress_response
+from profiling import register_profiling
+from refeaturize import RefeaturizationJob
+from static_assets import register_assets
+from traffic_recorder import TrafficRecorder, register_recording
 import config
-from pprint import pformat
+from log_config import setup_logging, PayloadSampler
 
-# Setup logging for Render visibility
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[logging.StreamHandler(sys.stdout)]
-)
+# Setup logging for Render visibility; records are written by a background listener
+setup_logging(level=config.LOG_LEVEL, fmt=config.LOG_FORMAT)
 logger = logging.getLogger(__name__)
+payload_sampler = PayloadSampler(config.LOG_SAMPLE_RATES)
 
 app = Flask(__name__, static_folder="static", template_folder="templates")
+app.json = FastJSONProvider(app)
 CORS(app)
 app.logger.propagate = True  # Ensure Flask logs are not suppressed
 
-client = Client(config.OMNIDIM_API_KEY)
+client = StubClient() if config.OMNIDIM_STUB else Client(config.OMNIDIM_API_KEY)
+campaign_scheduler = CampaignScheduler(
+    client,
+    max_workers=config.CAMPAIGN_MAX_WORKERS,
+    calls_per_second=config.CAMPAIGN_CALLS_PER_SECOND,
+    max_attempts=config.CAMPAIGN_MAX_ATTEMPTS,
+    retry_backoff=config.CAMPAIGN_RETRY_BACKOFF_SECONDS
+)
 
 latest_profile_data = None
 all_profiles = []
+profile_generation = 0
+record_versions = {}  # call_id -> profile_generation when that record was last ingested
+
+transcript_store = TranscriptStore(path=config.TRANSCRIPT_STORE_PATH)
+search_index = SearchIndex(path=config.SEARCH_INDEX_PATH, save_every=config.SEARCH_INDEX_SAVE_EVERY)
+text_featurizer = TextFeaturizer.load(config.TEXT_FEATURIZER_PATH) if config.TEXT_FEATURIZER_PATH else None
+profile_aggregates = ProfileAggregates()
+feature_cache = make_cache(config.CACHE_URL, max_entries=config.CACHE_MAX_ENTRIES)
+partition_index = PartitionedIndex(max_loaded=config.MAX_LOADED_PARTITIONS, cache=feature_cache,
+                                   cache_ttl=config.CACHE_TTL_SECONDS)
+room_inventory = RoomInventory()
+match_scheduler = MatchScheduler(partition_index, room_inventory=room_inventory)
+deadline_matcher = DeadlineMatcher(partition_index, match_scheduler, sample_size=config.DEADLINE_SAMPLE_SIZE,
+                                   max_queued=config.DEADLINE_MAX_QUEUED)
+refeaturize_jobs = {}  # job id -> RefeaturizationJob, oldest first
+event_log = EventLog(config.EVENT_LOG_DIR, segment_bytes=config.EVENT_LOG_SEGMENT_BYTES,
+                     snapshot_every=config.EVENT_LOG_SNAPSHOT_EVERY,
+                     fsync=config.EVENT_LOG_FSYNC) if config.EVENT_LOG_DIR else None
+archive_exporter = ArchiveExporter(
+    make_sink(config.ARCHIVE_URL, s3_endpoint=config.ARCHIVE_S3_ENDPOINT,
+              s3_access_key=config.ARCHIVE_S3_ACCESS_KEY, s3_secret_key=config.ARCHIVE_S3_SECRET_KEY,
+              s3_region=config.ARCHIVE_S3_REGION,
+              http_headers={"Authorization": f"Bearer {config.ARCHIVE_HTTP_TOKEN}"}
+              if config.ARCHIVE_HTTP_TOKEN else None),
+    batch_size=config.ARCHIVE_BATCH_SIZE, flush_seconds=config.ARCHIVE_FLUSH_SECONDS,
+    max_attempts=config.ARCHIVE_MAX_ATTEMPTS) if config.ARCHIVE_URL else None
+if archive_exporter is not None:
+    atexit.register(archive_exporter.stop)  # ship what is still queued on a clean shutdown
+
+@app.after_request
+def compress(response):
+    if not config.COMPRESSION_MIN_BYTES:
+        return response
+    return compress_response(response, request.accept_encodings, min_size=config.COMPRESSION_MIN_BYTES,
+                             gzip_level=config.COMPRESSION_GZIP_LEVEL,
+                             brotli_quality=config.COMPRESSION_BROTLI_QUALITY)
+
+# Profiling hooks exist only when an admin token is configured
+if config.ADMIN_TOKEN:
+    register_profiling(app, config.ADMIN_TOKEN, keep=config.PROFILE_KEEP)
+
+# Anonymized request stream for replaying load tests (benchmarks/replay_traffic.py)
+traffic_recorder = register_recording(app, TrafficRecorder(
+    config.TRAFFIC_RECORD_PATH, routes=config.TRAFFIC_RECORD_ROUTES, salt=config.TRAFFIC_RECORD_SALT,
+    anonymize=not config.TRAFFIC_RECORD_RAW)) if config.TRAFFIC_RECORD_PATH else None
+
+# Fingerprinted, precompressed static files and a landing page rendered once
+static_assets = register_assets(app) if config.STATIC_ASSET_CACHE else None
 
 @app.context_processor
 def inject_widget_config():
@@ -36,7 +117,9 @@ def inject_widget_config():
 
 @app.route('/')
 def index():
-    return render_template("index.html")
+    if static_assets is None:
+        return render_template("index.html")
+    return static_assets.page("index.html", lambda: render_template("index.html")).response(app, "no-cache")
 
 @app.route('/health', methods=['GET'])
 def health():
@@ -87,7 +170,8 @@ def create_agent():
                         {"key": "pets", "prompt": "Pets info."},
                         {"key": "substances", "prompt": "Smoking/drinking info."},
                         {"key": "dietary", "prompt": "Dietary restrictions."},
-                        {"key": "noise_tolerance", "prompt": "Music/noise preferences."}
+                        {"key": "noise_tolerance", "prompt": "Music/noise preferences."},
+                        {"key": "property", "prompt": "Which property or city they want to live in."}
                     ]
                 }
             }
@@ -109,32 +193,108 @@ def initiate_call():
         logger.exception("Failed to initiate call")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@app.route('/campaigns', methods=['POST'])
+def create_campaign():
+    """Start a calling campaign from a JSON list or an uploaded file of phone numbers"""
+    try:
+        upload = request.files.get("file")
+        if upload is not None:
+            agent_id = request.form.get("agent_id")
+            phone_numbers = re.split(r"[\s,;]+", upload.read().decode("utf-8", errors="ignore"))
+        else:
+            data = request.get_json(force=True) or {}
+            agent_id = data.get("agent_id")
+            phone_numbers = data.get("phone_numbers", [])
+        if not agent_id:
+            return jsonify({"status": "error", "message": "agent_id is required"}), 400
+        if isinstance(agent_id, str) and agent_id.isdigit():
+            agent_id = int(agent_id)
+
+        campaign = campaign_scheduler.create(agent_id, phone_numbers)
+        if not campaign.calls:
+            return jsonify({"status": "error", "message": "No valid phone numbers provided"}), 400
+        return jsonify({"status": "scheduled", **campaign.to_dict(include_calls=False)}), 202
+    except Exception as e:
+        logger.exception("Failed to create campaign")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@app.route('/campaigns', methods=['GET'])
+def list_campaigns():
+    return jsonify({"campaigns": [c.to_dict(include_calls=False) for c in campaign_scheduler.list()]})
+
+@app.route('/campaigns/<campaign_id>', methods=['GET'])
+def get_campaign(campaign_id):
+    campaign = campaign_scheduler.get(campaign_id)
+    if campaign is None:
+        return jsonify({"error": f"Campaign {campaign_id} not found"}), 404
+    return jsonify(campaign.to_dict())
+
 @app.route('/omnidim-callback', methods=['POST'])
 def omnidim_callback():
-    global latest_profile_data, all_profiles
     try:
         data = request.get_json(force=True)
         call_report = data.get("call_report", {})
         call_report['timestamp'] = datetime.now().isoformat()
 
-        latest_profile_data = call_report
-        all_profiles.append(call_report)
+        # Matching never reads the transcript; keep only a reference to the compressed blob
+        transcript = call_report.pop("fullConversation", None)
+        if transcript is not None:
+            call_report["transcript_ref"] = transcript_store.put(
+                call_report.get("call_id"), {"fullConversation": transcript})
+        if text_featurizer is not None:
+            call_report["text_vector"] = text_featurizer.transform_profile(call_report)
+
+        # Logged before it is applied, so anything served from memory can be replayed
+        if event_log is not None:
+            event_log.append("ingest", call_report.get("call_id"), call_report)
+        partition = store_profile(call_report, transcript)
+        campaign_id = campaign_scheduler.record_callback(call_report)
+        match_scheduler.profile_ingested(call_report.get("call_id"))
+        # Queued only; bundling and shipping happen on the exporter's thread
+        if archive_exporter is not None:
+            archive_exporter.submit(dict(call_report, fullConversation=transcript)
+                                    if transcript is not None else call_report)
 
-        logger.info(f"✅ Callback received. Total profiles stored: {len(all_profiles)}")
+        logger.info("✅ Callback received. Total profiles stored: %d", len(all_profiles),
+                    extra={"route": "omnidim_callback", "call_id": call_report.get("call_id"),
+                           "partition": partition, "campaign_id": campaign_id})
         processed_data = process_profile_data(call_report)
 
-        logger.info("🧾 Processed Profile Data:\n" + pformat(processed_data))
+        if payload_sampler.sample("omnidim_callback"):
+            logger.info("🧾 Processed Profile Data", extra={"route": "omnidim_callback", "payload": processed_data})
 
         return jsonify({
             "status": "received",
             "stored_in_memory": True,
             "total_profiles": len(all_profiles),
+            "partition": partition,
             "processed_data": processed_data
         })
     except Exception as e:
         logger.exception("Error in /omnidim-callback")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+def store_profile(call_report, transcript=None):
+    """Add an ingested call report to every in-memory structure; shared by the callback and log replay"""
+    global latest_profile_data, profile_generation
+    search_index.add(call_report.get("call_id"), search_fields(call_report, transcript))
+    latest_profile_data = call_report
+    all_profiles.append(call_report)
+    profile_generation += 1
+    record_versions[call_report.get("call_id")] = profile_generation
+    profile_aggregates.add(call_report)
+    return partition_index.add_profile(call_report)
+
+def search_fields(call_report, transcript=None):
+    """Text indexed for /search: summary, cleanliness habits and the transcript"""
+    if isinstance(transcript, list):
+        transcript = "\n".join(str(turn) for turn in transcript)
+    return {
+        "summary": call_report.get("summary"),
+        "cleanliness_habits": call_report.get("extracted_variables", {}).get("cleanliness_habits"),
+        "transcript": transcript
+    }
+
 def process_profile_data(call_report):
     try:
         extracted_vars = call_report.get("extracted_variables", {})
@@ -172,26 +332,227 @@ def process_profile_data(call_report):
         }
         return profile
     except Exception as e:
-        logger.error(f"[Error processing profile data]: {e}")
+        logger.error("[Error processing profile data]: %s", e)
         return None
 
+# The counters behind ETags restart at 0 on every boot and differ between workers, so every
+# tag carries this process's nonce; a tag from an earlier process never revalidates
+ETAG_NONCE = secrets.token_hex(4)
+
+def process_etag(tag):
+    return f"{ETAG_NONCE}-{tag}"
+
+def conditional_response(tag, build):
+    """Answer 304 when the client already holds ``tag``; otherwise ``build()`` the response.
+
+    Tags are weak: they change whenever the data behind a response may have
+    changed, which is checked before any of the work in ``build`` runs.
+    """
+    tag = process_etag(tag)
+    if request.if_none_match.contains_weak(tag):
+        return with_etag(app.response_class(status=304), tag)
+    return with_etag(build(), tag)
+
+def with_etag(response, tag):
+    response.set_etag(tag, weak=True)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+@app.route('/latest-profile', methods=['GET'])
+def get_latest_profile():
+    if latest_profile_data:
+        return conditional_response(f"latest-{profile_generation}", lambda: jsonify(latest_profile_data))
+    else:
+        return jsonify({"error": "No profile data found"}), 404
+
+@app.route('/all-profiles', methods=['GET'])
+def get_all_profiles():
+    """Get all stored profiles; transcripts are served separately by /transcript/<call_id>"""
+    return conditional_response(f"profiles-{profile_generation}", lambda: jsonify({
+        "total": len(all_profiles),
+        "profiles": all_profiles
+    }))
+
+@app.route('/transcript/<call_id>', methods=['GET'])
+def get_transcript(call_id):
+    """Load one call's transcript from the compressed store"""
+    record = transcript_store.get(call_id)
+    if record is None:
+        return jsonify({"error": f"No transcript found for {call_id}"}), 404
+    return jsonify({"call_id": call_id, **record})
+
+@app.route('/search', methods=['GET'])
+def search_profiles():
+    """Full-text search over profiles; quote a phrase to require it verbatim"""
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "Query parameter 'q' is required"}), 400
+    limit = min(request.args.get("limit", default=10, type=int), 100)
+
+    started = time.perf_counter()
+    hits = search_index.search(query, limit=limit)
+    took_ms = (time.perf_counter() - started) * 1000
+
+    results = []
+    for call_id, score in hits:
+        profile = partition_index.profile_of(call_id) or {}
+        results.append({"call_id": call_id, "score": round(score, 4), "summary": profile.get("summary")})
+    return jsonify({"query": query, "total_indexed": len(search_index), "took_ms": round(took_ms, 2),
+                    "results": results})
+
+@app.route('/processed-profile', methods=['GET'])
+def get_processed_profile():
+    if latest_profile_data:
+        return conditional_response(f"processed-{profile_generation}",
+                                    lambda: jsonify(process_profile_data(latest_profile_data)))
+    else:
+        return jsonify({"error": "No profile data found"}), 404
+
+@app.route('/profile-stats', methods=['GET'])
+def get_profile_stats():
+    """Get statistics about stored profiles"""
+    if not profile_aggregates.total:
+        return jsonify({"error": "No profiles found"}), 404
+    return conditional_response(f"stats-{profile_generation}", lambda: jsonify(profile_aggregates.stats()))
+
+@app.route('/analyze-profiles', methods=['GET'])
+def analyze_profiles():
+    """Distributions of ratings, sleep times and categories across all profiles"""
+    if not profile_aggregates.total:
+        return jsonify({"error": "No profiles found"}), 404
+    return conditional_response(f"analysis-{profile_generation}", lambda: jsonify(profile_aggregates.analysis()))
+
+@app.route('/clear-profiles', methods=['POST'])
+def clear_profiles():
+    """Clear all stored profile data; with ADMIN_TOKEN configured, only for requests carrying it"""
+    global latest_profile_data, all_profiles, profile_generation
+    if config.ADMIN_TOKEN and not admin_authorized():
+        return jsonify({"error": "Admin token required"}), 403
+    if event_log is not None:
+        event_log.append("clear")
+    latest_profile_data = None
+    all_profiles = []
+    profile_generation += 1
+    partition_index.clear()
+    match_scheduler.clear()
+    transcript_store.clear()
+    search_index.clear()
+    profile_aggregates.clear()
+    return jsonify({"status": "cleared", "message": "All profile data cleared from memory"})
+
 @app.route('/match-user/<user_id>', methods=['GET'])
 def match_user(user_id):
     if not all_profiles or len(all_profiles) < 2:
         return jsonify({"error": "Need at least 2 profiles to perform matching"}), 400
 
-    matcher = RoommateMatchingModel()
-    result = matcher.find_matches(all_profiles, user_id)
+    partition = partition_index.partition_of(user_id)
+    if partition is None:
+        return jsonify({"error": f"User {user_id} not found"}), 404
+
+    # ?partitions=a,b (or "all") searches other properties as well, in parallel
+    requested = request.args.get("partitions")
+    if requested:
+        def fan_out():
+            keys = partition_index.keys() if requested == "all" else [k.strip().lower() for k in requested.split(",")]
+            matches = partition_index.fan_out(partition_index.profile_of(user_id), keys)
+            result = {
+                "target_user": {"user_id": user_id, "partition": partition},
+                "matches": matches,
+                "partitions_searched": [k for k in keys if partition_index.shard(k) is not None]
+            }
+            log_match_results("match_user", user_id, result)
+            return jsonify(result)
+        tag = f"fanout-{profile_generation}-{zlib.crc32(requested.encode()):08x}"
+        return conditional_response(tag, fan_out)
 
-    if "error" in result:
-        return jsonify(result), 404
+    # Stored results are only looked up here, so an unchanged poll never computes
+    tag = match_etag(user_id, partition)
+    if request.if_none_match.contains_weak(tag):
+        return with_etag(app.response_class(status=304), tag)
 
-    logger.info(f"\n📊 Match Results for User ID {user_id}:")
-    for match in result.get("matches", []):
-        logger.info(f" - Matched User ID: {match['user_id']} | Score: {match['score']:.2f}")
+    # ?budget_ms= answers within the deadline, degrading cached -> exact -> approximate -> sampled
+    budget_ms = request.args.get("budget_ms", type=float)
+    if budget_ms is not None:
+        return match_within_budget(user_id, partition, budget_ms)
 
-    logger.info("📋 Full Match Results:\n" + pformat(result))
-    return jsonify(result)
+    entry, source = match_scheduler.get_or_compute(user_id)
+    if entry is None:
+        return jsonify({"error": f"Need at least 2 profiles in partition '{partition}' to perform matching"}), 400
+    result = match_scheduler.annotate(entry, source)
+
+    log_match_results("match_user", user_id, result)
+    return with_etag(jsonify(result), match_etag(user_id, partition))
+
+def match_within_budget(user_id, partition, budget_ms):
+    shard = partition_index.shard(partition)
+    if shard is None or len(shard.profiles) < 2:
+        return jsonify({"error": f"Need at least 2 profiles in partition '{partition}' to perform matching"}), 400
+
+    started = time.perf_counter()
+    try:
+        result, tier = deadline_matcher.match(user_id, max(budget_ms, 1.0))
+    except DeadlineExceeded as e:
+        logger.warning("⏱️ %s", e, extra={"route": "match_user", "user_id": user_id, "budget_ms": budget_ms})
+        response = jsonify({"error": str(e), "budget_ms": budget_ms})
+        response.headers["Retry-After"] = "1"
+        return response, 503
+    result["degradation"] = {
+        "tier": tier,
+        "budget_ms": budget_ms,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+    }
+
+    log_match_results("match_user", user_id, result)
+    response = jsonify(result)
+    # Only the cached and exact tiers are the canonical result a later poll may revalidate
+    if tier in ("cached", "exact"):
+        with_etag(response, match_etag(user_id, partition))
+    return response
+
+def match_etag(user_id, partition):
+    """Version of a user's match result: their record, their shard and the stored entry"""
+    shard = partition_index.shard(partition)
+    entry = match_scheduler.get(user_id)
+    return process_etag(f"match-{record_versions.get(user_id, 0)}-{partition}-{shard.generation if shard else 0}-"
+                        f"{entry['generation'] if entry else 'none'}-{room_inventory.version_of(partition)}")
+
+def log_match_results(route, user_id, result):
+    matches = result.get("matches", [])
+    logger.info("📊 Match results for user %s: %d matches", user_id, len(matches),
+                extra={"route": route, "user_id": user_id, "match_count": len(matches)})
+    if logger.isEnabledFor(logging.DEBUG):
+        for match in matches:
+            logger.debug(" - Matched User ID: %s | Score: %.2f", match['user_id'], match['match_score'])
+    if payload_sampler.sample(route):
+        logger.info("📋 Full Match Results", extra={"route": route, "payload": result})
+
+def format_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/match-events/<user_id>', methods=['GET'])
+def match_events(user_id):
+    """Stream match-ready / match-updated events for a user instead of polling /match-user"""
+    events = match_scheduler.subscribe(user_id)
+
+    def stream():
+        try:
+            yield f"retry: {config.SSE_HEARTBEAT_SECONDS * 1000}\n\n"
+            entry = match_scheduler.get(user_id)
+            if entry is not None:
+                yield format_sse("match-ready", match_scheduler.annotate(entry, "precomputed"))
+            deadline = time.monotonic() + config.SSE_MAX_STREAM_SECONDS
+            while time.monotonic() < deadline:
+                try:
+                    event, entry = events.get(timeout=config.SSE_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event, match_scheduler.annotate(entry, "precomputed"))
+        finally:
+            match_scheduler.unsubscribe(user_id, events)
+
+    return Response(stream_with_context(stream()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 @app.route('/test-matching', methods=['GET'])
 def test_matching():
@@ -202,32 +563,314 @@ def test_matching():
     matcher = RoommateMatchingModel()
     result = matcher.find_matches(all_profiles, target_id)
 
-    logger.info(f"\n🧪 Test Match for User ID {target_id}:")
-    for match in result.get("matches", []):
-        logger.info(f" - Matched User ID: {match['user_id']} | Score: {match['score']:.2f}")
+    log_match_results("test_matching", target_id, result)
+    return jsonify(result)
+
+@app.route('/stable-matching', methods=['GET'])
+def stable_matching():
+    """Pair everyone at once with Irving's stable roommates algorithm"""
+    if len(all_profiles) < 2:
+        return jsonify({"error": "At least 2 profiles are required for stable matching."}), 400
+
+    k = request.args.get("k", default=10, type=int)
+    partition = request.args.get("partition")
+    if partition:
+        snapshot = partition_index.snapshot(partition.lower())
+        if snapshot is None:
+            return jsonify({"error": f"Partition '{partition}' needs at least 2 profiles."}), 404
+        _, df, X = snapshot[:3]
+    else:
+        matcher = RoommateMatchingModel()
+        df, X = matcher.build_feature_matrix(list(all_profiles))
+    result = solve_stable_roommates(X, list(df['user_id']), k=max(k, 1))
+    result["total_profiles"] = len(df)
+
+    logger.info("🤝 Stable matching: stable=%s pairs=%d unmatched=%d", result["stable"],
+                len(result["pairs"]), len(result["unmatched"]), extra={"route": "stable_matching"})
+    return jsonify(result)
+
+@app.route('/group-matching', methods=['GET'])
+def group_matching():
+    """Form 3-4 person rooms where every pair is compatible (?size=, ?objective=min|mean, ?require=)"""
+    size = request.args.get("size", default=3, type=int)
+    objective = request.args.get("objective", "min")
+    if size not in (3, 4) or objective not in ("min", "mean"):
+        return jsonify({"error": "size must be 3 or 4 and objective 'min' or 'mean'"}), 400
+    required = request.args.get("require")
+    required = tuple(f.strip() for f in required.split(",") if f.strip()) if required is not None \
+        else DEFAULT_REQUIRED_FACTORS
+    if len(all_profiles) < size:
+        return jsonify({"error": f"At least {size} profiles are required for group matching."}), 400
+
+    partition = request.args.get("partition")
+    if partition:
+        snapshot = partition_index.snapshot(partition.lower())
+        if snapshot is None:
+            return jsonify({"error": f"Partition '{partition}' needs at least 2 profiles."}), 404
+        _, df, X = snapshot[:3]
+    else:
+        matcher = RoommateMatchingModel()
+        df, X = matcher.build_feature_matrix(list(all_profiles))
+    try:
+        result = form_groups(X, list(df['user_id']), df=df, group_size=size, objective=objective,
+                             k=request.args.get("k", default=20, type=int), required_factors=required)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    result["total_profiles"] = len(df)
 
-    logger.info("📋 Test Match Results:\n" + pformat(result))
+    logger.info("👥 Group matching: size=%d groups=%d unassigned=%d", size, len(result["groups"]),
+                len(result["unassigned"]), extra={"route": "group_matching"})
     return jsonify(result)
 
+@app.route('/partitions', methods=['GET'])
+def list_partitions():
+    return jsonify({"partitions": partition_index.stats(), "feature_cache": feature_cache.stats()})
+
+@app.route('/partitions/<key>/load', methods=['POST'])
+def load_partition(key):
+    if partition_index.shard(key) is None:
+        return jsonify({"error": f"Partition {key} not found"}), 404
+    return jsonify({"partition": key, "index_loaded": partition_index.load(key)})
+
+@app.route('/partitions/<key>/evict', methods=['POST'])
+def evict_partition(key):
+    if not partition_index.evict(key):
+        return jsonify({"error": f"Partition {key} not found"}), 404
+    return jsonify({"partition": key, "index_loaded": False})
+
+def admin_authorized():
+    supplied = request.headers.get("X-Admin-Token") or ""
+    return bool(config.ADMIN_TOKEN) and hmac.compare_digest(supplied.encode(), config.ADMIN_TOKEN.encode())
+
+@app.route('/admin/refeaturize', methods=['POST'])
+def start_refeaturize():
+    """Re-parse every stored profile in a process pool; matching keeps using the current indexes meanwhile"""
+    if not admin_authorized():
+        return jsonify({"error": "Admin token required"}), 403
+    running = next((job for job in refeaturize_jobs.values() if not job.done), None)
+    if running is not None:
+        return jsonify({"error": "A re-featurization job is already running", **running.to_dict()}), 409
+
+    data = request.get_json(silent=True) or {}
+    profiles, layout = partition_index.export()
+
+    def install(job, df):
+        job.installed_partitions, job.skipped_partitions = partition_index.install(df, layout)
+        # Stored results were ranked with the old parse
+        match_scheduler.clear()
+        logger.info("🔁 Re-featurization %s installed into %d partitions (%d skipped)", job.id,
+                    len(job.installed_partitions), len(job.skipped_partitions), extra={"route": "start_refeaturize"})
+
+    try:
+        job = RefeaturizationJob(profiles, path=config.REFEATURIZE_PATH,
+                                 chunk_size=data.get("chunk_size", config.REFEATURIZE_CHUNK_SIZE),
+                                 max_workers=data.get("workers", config.REFEATURIZE_WORKERS), on_complete=install)
+    except (TypeError, ValueError):
+        return jsonify({"error": "chunk_size and workers must be integers"}), 400
+    refeaturize_jobs[job.id] = job
+    job.start()
+    return jsonify(job.to_dict()), 202
+
+@app.route('/admin/refeaturize', methods=['GET'])
+@app.route('/admin/refeaturize/<job_id>', methods=['GET'])
+def refeaturize_status(job_id=None):
+    if not admin_authorized():
+        return jsonify({"error": "Admin token required"}), 403
+    if job_id is None:
+        job = next(reversed(refeaturize_jobs.values()), None)
+    else:
+        job = refeaturize_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Re-featurization job not found"}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/rooms', methods=['POST'])
+def add_rooms():
+    """Create or update rooms from a JSON object or a list of them"""
+    data = request.get_json(force=True) or {}
+    try:
+        rooms = [room_inventory.add_room(
+            room["room_id"], room["property"],
+            room_type=room.get("room_type", "shared"),
+            capacity=room.get("capacity", 2),
+            floor=room.get("floor"),
+            quiet_zone=room.get("quiet_zone", False)
+        ) for room in (data if isinstance(data, list) else [data])]
+    except KeyError as e:
+        return jsonify({"status": "error", "message": f"Missing field {e}"}), 400
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify({"status": "saved", "rooms": [r.to_dict() for r in rooms]}), 201
+
+@app.route('/rooms', methods=['GET'])
+def list_rooms():
+    """All rooms, or with ?property= the rooms there with free beds (?type=, ?min_beds=, ?floor=, ?quiet_zone=)"""
+    property_key = request.args.get("property")
+    if not property_key:
+        return jsonify({"rooms": [r.to_dict() for r in room_inventory.rooms()], **room_inventory.stats()})
+    quiet_zone = request.args.get("quiet_zone")
+    rooms = room_inventory.free_rooms(
+        property_key.strip().lower(),
+        room_type=request.args.get("type"),
+        min_beds=request.args.get("min_beds", default=1, type=int),
+        floor=request.args.get("floor"),
+        quiet_zone=None if quiet_zone is None else quiet_zone.lower() in ("1", "true", "yes")
+    )
+    return jsonify({"property": property_key, "rooms": [r.to_dict() for r in rooms]})
+
+@app.route('/rooms/<room_id>', methods=['GET'])
+def get_room(room_id):
+    room = room_inventory.get(room_id)
+    if room is None:
+        return jsonify({"error": f"Room {room_id} not found"}), 404
+    return jsonify(room.to_dict())
+
+@app.route('/rooms/<room_id>', methods=['DELETE'])
+def delete_room(room_id):
+    room = room_inventory.remove_room(room_id)
+    if room is None:
+        return jsonify({"error": f"Room {room_id} not found"}), 404
+    return jsonify({"status": "removed", "room": room.to_dict()})
+
+@app.route('/rooms/<room_id>/occupants', methods=['POST'])
+def assign_room(room_id):
+    user_id = (request.get_json(force=True) or {}).get("user_id")
+    if not user_id:
+        return jsonify({"status": "error", "message": "user_id is required"}), 400
+    try:
+        room = room_inventory.assign(user_id, room_id)
+    except KeyError:
+        return jsonify({"error": f"Room {room_id} not found"}), 404
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 409
+    return jsonify(room.to_dict())
+
+@app.route('/rooms/<room_id>/occupants/<user_id>', methods=['DELETE'])
+def vacate_room(room_id, user_id):
+    room = room_inventory.room_of(user_id)
+    if room is None or room.id != room_id:
+        return jsonify({"error": f"{user_id} does not live in room {room_id}"}), 404
+    return jsonify(room_inventory.vacate(user_id).to_dict())
+
+@app.route('/rooms/events', methods=['POST'])
+def room_event():
+    """Apply a move_in / move_out and locally repair the affected rooms"""
+    data = request.get_json(force=True) or {}
+    event, user_id = data.get("type"), data.get("user_id")
+    if event not in ("move_in", "move_out") or not user_id:
+        return jsonify({"status": "error", "message": "type (move_in/move_out) and user_id are required"}), 400
+
+    if event == "move_in":
+        property_key = (data.get("property") or partition_index.partition_of(user_id) or "").strip().lower()
+        if not property_key:
+            return jsonify({"error": f"User {user_id} not found"}), 404
+    else:
+        room = room_inventory.room_of(user_id)
+        if room is None:
+            return jsonify({"error": f"{user_id} does not occupy a room"}), 404
+        property_key = room.property
+
+    snapshot = partition_index.snapshot(property_key)
+    if snapshot is not None:
+        repair = LocalRepair(room_inventory, snapshot_compatibility(snapshot), snapshot_preferences(snapshot),
+                             max_rooms=config.REPAIR_MAX_ROOMS)
+    else:
+        repair = LocalRepair(room_inventory, lambda a, b: 0.5, max_rooms=config.REPAIR_MAX_ROOMS)
+    report = repair.move_in(user_id, property_key) if event == "move_in" else repair.move_out(user_id)
+    return jsonify(report), 200 if report["placed"] else 409
+
+@app.route('/rooms/<room_id>/compatibility/<user_id>', methods=['GET'])
+def room_compatibility(room_id, user_id):
+    """How a user would fit with a room's current occupants"""
+    room = room_inventory.get(room_id)
+    if room is None:
+        return jsonify({"error": f"Room {room_id} not found"}), 404
+    partition = partition_index.partition_of(user_id)
+    if partition is None:
+        return jsonify({"error": f"User {user_id} not found"}), 404
+
+    snapshot = partition_index.snapshot(partition)
+    occupants = []
+    for occupant_id in room.occupants:
+        if occupant_id == user_id:
+            continue
+        factors = None
+        if snapshot is not None and occupant_id in snapshot[4] and user_id in snapshot[4]:
+            matcher, df, _, _, index_of, _ = snapshot
+            factors = matcher.get_compatibility_factors(df, index_of[user_id], index_of[occupant_id])
+        occupants.append({"user_id": occupant_id, "compatibility_factors": factors})
+    return jsonify({
+        "room": room.to_dict(),
+        "user_id": user_id,
+        "has_free_bed": user_id in room.occupants or room.free_beds > 0,
+        "same_property": room.property == partition,
+        "occupants": occupants
+    })
+
 @app.route('/data-summary', methods=['GET'])
 def get_data_summary():
-    return jsonify({
+    return conditional_response(f"summary-{profile_generation}", lambda: jsonify({
         "memory_status": "active",
         "latest_profile_available": latest_profile_data is not None,
         "total_profiles_stored": len(all_profiles),
         "last_update": all_profiles[-1].get("timestamp") if all_profiles else None,
+        "transcript_store": transcript_store.stats(),
         "available_endpoints": [
             "/latest-profile",
             "/all-profiles", 
+            "/transcript/<call_id>",
+            "/search?q=",
             "/processed-profile",
             "/analyze-profiles",
             "/profile-stats",
             "/clear-profiles",
             "/data-summary",
             "/match-user/<user_id>",
-            "/test-matching"
+            "/match-events/<user_id>",
+            "/test-matching",
+            "/stable-matching",
+            "/group-matching",
+            "/partitions",
+            "/rooms",
+            "/campaigns",
+            "/archive"
         ]
-    })
+    }))
+
+@app.route('/event-log', methods=['GET'])
+def get_event_log():
+    if event_log is None:
+        return jsonify({"error": "Event log is not enabled (set EVENT_LOG_DIR)"}), 404
+    return jsonify(event_log.stats())
+
+@app.route('/archive', methods=['GET'])
+def get_archive():
+    if archive_exporter is None:
+        return jsonify({"error": "Archiving is not enabled (set ARCHIVE_URL)"}), 404
+    return jsonify(archive_exporter.stats())
+
+@app.route('/admin/archive/flush', methods=['POST'])
+def flush_archive():
+    if not admin_authorized():
+        return jsonify({"error": "Admin token required"}), 403
+    if archive_exporter is None:
+        return jsonify({"error": "Archiving is not enabled (set ARCHIVE_URL)"}), 404
+    archive_exporter.flush()
+    return jsonify(archive_exporter.stats()), 202
+
+def restore_from_event_log():
+    """Rebuild the profile store and partition indexes from the latest snapshot plus the log tail"""
+    started = time.perf_counter()
+    for call_report in event_log.recover():
+        transcript = None
+        if config.TRANSCRIPT_STORE_PATH and call_report.get("transcript_ref"):
+            transcript = (transcript_store.get(ref=call_report["transcript_ref"]) or {}).get("fullConversation")
+        store_profile(call_report, transcript)
+    logger.info("📼 Restored %d profiles from the event log in %.2f s (%s)", len(all_profiles),
+                time.perf_counter() - started, event_log.last_replay)
+
+if event_log is not None:
+    restore_from_event_log()
 
 if __name__ == '__main__':
     port = int(os.environ.get("PORT", 5000))
@@ -0,0 +1,268 @@
+"""Batched, background archiving of call results.
+
+``omnidim_callback`` only puts the call report on a bounded queue. That
+call never blocks, and the report is dropped (and counted) when the queue
+is full. A worker thread groups reports into bundles of at most
+``batch_size``, or whatever arrived within ``flush_seconds``. Each bundle
+is gzip-compressed JSON lines, and the worker ships it to a sink:
+
+* ``LocalDirectorySink``: files in a directory (``/path`` or ``file:///path``)
+* ``S3Sink``: PUT to an S3-compatible store with SigV4 signing (``s3://bucket/prefix``)
+* ``HTTPSink``: POST to an HTTP endpoint (``http(s)://...``)
+* ``stub://``: an in-process ``archive_stub`` server behind an HTTPSink, for local testing
+
+A failed shipment is retried with exponential backoff and jitter. After
+``max_attempts`` the bundle is parked and tried again on the next flush,
+ahead of newer bundles, so an outage of the sink delays the archive but
+does not lose it. Only when more than ``max_pending`` bundles are waiting
+is the oldest one dropped.
+"""
+import gzip
+import hashlib
+import hmac
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from urllib.parse import quote, urlparse
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class LocalDirectorySink:
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def put(self, name, data, content_type):
+        path = os.path.join(self.directory, name)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def describe(self):
+        return f"file://{os.path.abspath(self.directory)}"
+
+
+class HTTPSink:
+    """POST each bundle; any non-2xx answer counts as a failure"""
+
+    def __init__(self, url, headers=None, timeout=30):
+        self.url = url
+        self.headers = dict(headers or {})
+        self.timeout = timeout
+
+    def put(self, name, data, content_type):
+        response = requests.post(self.url, data=data, timeout=self.timeout, headers={
+            **self.headers, "Content-Type": content_type, "X-Archive-Bundle": name})
+        response.raise_for_status()
+
+    def describe(self):
+        return self.url
+
+
+class S3Sink:
+    """PUT objects into a bucket of any S3-compatible store (path-style URLs, SigV4)"""
+
+    def __init__(self, endpoint, bucket, access_key, secret_key, region="us-east-1", prefix="", timeout=30):
+        self.endpoint = endpoint.rstrip("/")
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.prefix = prefix.strip("/")
+        self.timeout = timeout
+
+    def put(self, name, data, content_type):
+        key = f"{self.prefix}/{name}" if self.prefix else name
+        path = quote(f"/{self.bucket}/{key}", safe="/-_.~")
+        headers = self.sign("PUT", path, data, content_type)
+        response = requests.put(f"{self.endpoint}{path}", data=data, headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+
+    def sign(self, method, path, data, content_type, now=None):
+        """Headers for an AWS Signature Version 4 request with a signed payload hash"""
+        now = now or datetime.now(timezone.utc)
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        payload_hash = hashlib.sha256(data).hexdigest()
+        headers = {
+            "content-type": content_type,
+            "host": urlparse(self.endpoint).netloc,
+            "x-amz-content-sha256": payload_hash,
+            "x-amz-date": amz_date
+        }
+        signed_headers = ";".join(sorted(headers))
+        canonical_request = "\n".join([
+            method, path, "",
+            "".join(f"{k}:{headers[k]}\n" for k in sorted(headers)),
+            signed_headers, payload_hash
+        ])
+        scope = f"{amz_date[:8]}/{self.region}/s3/aws4_request"
+        string_to_sign = "\n".join(["AWS4-HMAC-SHA256", amz_date, scope,
+                                    hashlib.sha256(canonical_request.encode()).hexdigest()])
+        key = f"AWS4{self.secret_key}".encode()
+        for part in (amz_date[:8], self.region, "s3", "aws4_request"):
+            key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+        signature = hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+        headers["authorization"] = (f"AWS4-HMAC-SHA256 Credential={self.access_key}/{scope}, "
+                                    f"SignedHeaders={signed_headers}, Signature={signature}")
+        del headers["host"]  # requests sends it from the URL
+        return headers
+
+    def describe(self):
+        return f"s3://{self.bucket}/{self.prefix} at {self.endpoint}"
+
+
+def make_sink(url, s3_endpoint=None, s3_access_key=None, s3_secret_key=None, s3_region="us-east-1",
+              http_headers=None):
+    """Sink for an archive URL (see the module docstring)"""
+    parsed = urlparse(url)
+    if parsed.scheme in ("", "file"):
+        return LocalDirectorySink(parsed.path if parsed.scheme else url)
+    if parsed.scheme in ("http", "https"):
+        return HTTPSink(url, headers=http_headers)
+    if parsed.scheme == "s3":
+        if not s3_endpoint:
+            raise ValueError("An S3 endpoint is required for s3:// archive URLs")
+        return S3Sink(s3_endpoint, parsed.netloc, s3_access_key, s3_secret_key, s3_region, parsed.path)
+    if parsed.scheme == "stub":
+        from archive_stub import ArchiveStubServer
+        server = ArchiveStubServer().start()
+        return HTTPSink(f"{server.url}/archive")
+    raise ValueError(f"Unsupported archive URL: {url}")
+
+
+class ArchiveExporter:
+    """Queue -> bundles -> sink, on one background thread (see the module docstring)"""
+
+    def __init__(self, sink, batch_size=500, flush_seconds=60, max_queue=10000, max_attempts=5,
+                 backoff_seconds=2.0, max_backoff_seconds=300.0, max_pending=100, level=6):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.max_pending = max_pending
+        self.level = level
+        self.submitted = 0
+        self.dropped = 0
+        self.bundles_shipped = 0
+        self.profiles_shipped = 0
+        self.bytes_shipped = 0
+        self.failed_attempts = 0
+        self.bundles_lost = 0
+        self.last_error = None
+        self.last_shipped_at = None
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._pending = deque()  # (name, data, profiles) waiting for the sink, oldest first
+        self._sequence = 0
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="archive-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, call_report):
+        """Queue one call report for archiving; never blocks, returns False if it was dropped"""
+        try:
+            self._queue.put_nowait(call_report)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.submitted += 1
+        if self._queue.qsize() >= self.batch_size:
+            self._wake.set()
+        return True
+
+    def flush(self):
+        """Bundle whatever is queued now instead of waiting for ``flush_seconds``"""
+        self._wake.set()
+
+    def stop(self, timeout=10.0):
+        """Bundle the rest of the queue, try to ship it, and stop the worker"""
+        self._stopping = True
+        self._wake.set()
+        self._thread.join(timeout)
+
+    def stats(self):
+        return {
+            "sink": self.sink.describe(),
+            "queued": self._queue.qsize(),
+            "pending_bundles": len(self._pending),
+            "submitted": self.submitted,
+            "dropped": self.dropped,
+            "bundles_shipped": self.bundles_shipped,
+            "profiles_shipped": self.profiles_shipped,
+            "bytes_shipped": self.bytes_shipped,
+            "failed_attempts": self.failed_attempts,
+            "bundles_lost": self.bundles_lost,
+            "last_error": self.last_error,
+            "last_shipped_at": self.last_shipped_at
+        }
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            stopping = self._stopping
+            while True:
+                batch = self._take(self.batch_size)
+                if not batch:
+                    break
+                self._pending.append(self._bundle(batch))
+                if len(self._pending) > self.max_pending:
+                    name, _, profiles = self._pending.popleft()
+                    self.bundles_lost += 1
+                    logger.error("Archive backlog full; dropped bundle %s (%d profiles)", name, profiles)
+            while self._pending:
+                if not self._ship(*self._pending[0], stopping=stopping):
+                    break  # parked; try again on the next flush
+                self._pending.popleft()
+            if stopping:
+                return
+
+    def _take(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _bundle(self, batch):
+        self._sequence += 1
+        name = f"call-results-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}-{self._sequence:06d}.jsonl.gz"
+        lines = b"".join(json.dumps(report, default=str).encode("utf-8") + b"\n" for report in batch)
+        return name, gzip.compress(lines, compresslevel=self.level), len(batch)
+
+    def _ship(self, name, data, profiles, stopping=False):
+        """Try one bundle up to ``max_attempts`` times; False leaves it parked"""
+        attempts = 1 if stopping else self.max_attempts
+        for attempt in range(attempts):
+            try:
+                self.sink.put(name, data, "application/gzip")
+            except Exception as e:
+                self.failed_attempts += 1
+                self.last_error = f"{name}: {e}"
+                if attempt + 1 == attempts:
+                    logger.warning("Archiving %s failed %d times; parked until the next flush: %s",
+                                   name, attempts, e)
+                    return False
+                delay = min(self.backoff_seconds * 2 ** attempt, self.max_backoff_seconds)
+                time.sleep(delay * random.uniform(0.5, 1.0))
+                continue
+            self.bundles_shipped += 1
+            self.profiles_shipped += profiles
+            self.bytes_shipped += len(data)
+            self.last_shipped_at = datetime.now().isoformat()
+            logger.info("Archived %d call results to %s (%d bytes)", profiles, name, len(data))
+            return True
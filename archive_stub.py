@@ -0,0 +1,62 @@
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class ArchiveStubServer:
+    """Local stand-in for an archive endpoint or S3-compatible store.
+
+    Accepts ``POST <any path>`` (HTTPSink, named by the X-Archive-Bundle
+    header) and ``PUT /<bucket>/<key>`` (S3Sink), and keeps the bodies in
+    ``objects``. ``failure_rate`` answers that share of requests with a 503
+    so retries and backoff can be exercised.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, failure_rate=0.0, seed=None):
+        self.failure_rate = failure_rate
+        self.objects = {}  # name -> body
+        self.headers = {}  # name -> request headers
+        self.requests = 0
+        self.failures = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self._store(self.headers.get("X-Archive-Bundle") or self.path)
+
+            def do_PUT(self):
+                self._store(self.path.lstrip("/"))
+
+            def _store(self, name):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                with stub._lock:
+                    stub.requests += 1
+                    failed = stub._random.random() < stub.failure_rate
+                    if failed:
+                        stub.failures += 1
+                    else:
+                        stub.objects[name] = body
+                        stub.headers[name] = dict(self.headers)
+                self.send_response(503 if failed else 200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.host, self.port = self._server.server_address[:2]
+        self.url = f"http://{self.host}:{self.port}"
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="archive-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
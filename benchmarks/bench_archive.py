@@ -0,0 +1,55 @@
+"""Archive export: submit latency on the callback path and bundle throughput to a local stub.
+
+Usage: python benchmarks/bench_archive.py [n_reports] [batch_size] [failure_rate]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from archive_exporter import ArchiveExporter, HTTPSink  # noqa: E402
+from archive_stub import ArchiveStubServer  # noqa: E402
+
+
+def synthetic_report(i):
+    return {
+        "call_id": f"call_{i}",
+        "timestamp": "2025-08-02T12:00:00",
+        "summary": f"Resident {i} works from home and likes a quiet flat",
+        "sentiment": "positive",
+        "extracted_variables": {"bedtime": "11 pm", "wake_time": "7 am", "cleanliness_rating": "8/10",
+                                "pets": "no pets", "room_preference": "private"},
+        "fullConversation": "Agent: When do you usually go to bed?\nUser: Around eleven.\n" * 20
+    }
+
+
+def main():
+    n_reports = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    failure_rate = float(sys.argv[3]) if len(sys.argv) > 3 else 0.2
+    server = ArchiveStubServer(failure_rate=failure_rate, seed=0).start()
+    exporter = ArchiveExporter(HTTPSink(f"{server.url}/archive"), batch_size=batch_size, flush_seconds=0.5,
+                               max_queue=n_reports, backoff_seconds=0.05)
+    reports = [synthetic_report(i) for i in range(n_reports)]
+
+    start = time.perf_counter()
+    for report in reports:
+        exporter.submit(report)
+    submitted = time.perf_counter() - start
+    print(f"submit:  {n_reports:,} reports in {submitted * 1000:.1f} ms "
+          f"({submitted / n_reports * 1e6:.2f} us per callback)")
+
+    while exporter.stats()["profiles_shipped"] < n_reports and time.perf_counter() - start < 120:
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - start
+    exporter.stop()
+    stats = exporter.stats()
+    print(f"shipped: {stats['profiles_shipped']:,} reports in {stats['bundles_shipped']} bundles "
+          f"({stats['bytes_shipped'] / 1024:,.0f} KiB gzip) in {elapsed:.2f} s, "
+          f"{stats['failed_attempts']} failed attempts retried, {stats['dropped']} dropped")
+    server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Event log append and replay throughput, with and without a snapshot.
+
+Usage: python benchmarks/bench_event_log.py [n_events] [tail_events]
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from event_log import EventLog  # noqa: E402
+
+
+def synthetic_profile(rng, i):
+    return {
+        "call_id": f"call_{rng.randrange(i + 1)}",  # some callbacks repeat an earlier call_id
+        "timestamp": "2025-08-02T12:00:00",
+        "summary": f"Resident {i} works from home and likes a quiet flat",
+        "sentiment": "positive",
+        "extracted_variables": {
+            "bedtime": rng.choice(["11 pm", "around midnight", "1 am"]),
+            "wake_time": rng.choice(["7 am", "6:30 in the morning", "9am"]),
+            "cleanliness_rating": rng.choice(["8/10", "very high", "medium"]),
+            "social_energy": rng.choice(["high", "quite low", "7"]),
+            "room_preference": rng.choice(["private", "shared", "either is fine"]),
+            "pets": rng.choice(["no pets", "a cat", "dog"]),
+            "cleanliness_habits": "cleans the kitchen every evening"
+        },
+        "transcript_ref": [i * 900, 900, 1]
+    }
+
+
+def write_events(directory, n_events, rng, snapshot_every=0):
+    log = EventLog(directory, snapshot_every=snapshot_every)
+    log.recover()
+    start = time.perf_counter()
+    for i in range(n_events):
+        if i and i % 5000 == 0:
+            log.append("delete", f"call_{rng.randrange(i)}")
+        else:
+            profile = synthetic_profile(rng, i)
+            log.append("ingest", profile["call_id"], profile)
+    elapsed = time.perf_counter() - start
+    return log, elapsed
+
+
+def main():
+    n_events = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    tail_events = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    rng = random.Random(0)
+    directory = tempfile.mkdtemp(prefix="event-log-bench-")
+    try:
+        log, elapsed = write_events(directory, n_events, rng)
+        print(f"append:          {n_events:>9,} events in {elapsed:6.2f} s  "
+              f"({n_events / elapsed:>9,.0f} events/s)")
+
+        replay = EventLog(directory)
+        replay.recover()
+        stats = replay.last_replay
+        print(f"full replay:     {stats['events_replayed']:>9,} events in {stats['seconds']:6.2f} s  "
+              f"({stats['events_per_second']:>9,} events/s) -> {stats['profiles']:,} profiles")
+
+        start = time.perf_counter()
+        log.snapshot()
+        print(f"snapshot:        {len(log.state):>9,} profiles in {time.perf_counter() - start:6.2f} s")
+        for i in range(tail_events):
+            profile = synthetic_profile(rng, n_events + i)
+            log.append("ingest", profile["call_id"], profile)
+        log.close()
+
+        replay = EventLog(directory)
+        replay.recover()
+        stats = replay.last_replay
+        print(f"snapshot + tail: {stats['events_replayed']:>9,} events in {stats['seconds']:6.2f} s  "
+              f"(snapshot {stats['snapshot_seconds']:.2f} s, tail {stats['events_per_second'] or 0:,} events/s) "
+              f"-> {stats['profiles']:,} profiles")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
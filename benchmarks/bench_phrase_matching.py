@@ -0,0 +1,132 @@
+"""Throughput of the shared phrase-matching engine against the old per-phrase scans.
+
+The last section sweeps the vocabulary size with the result cache off, timing
+the str.find scans against the Aho-Corasick automaton; PhraseMatcher switches
+to the automaton at AUTOMATON_MIN_PHRASES.
+
+Usage: python benchmarks/bench_phrase_matching.py [n_texts]
+"""
+import os
+import random
+import re
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model import RoommateMatchingModel, RATING_PHRASES, CATEGORY_VOCABULARIES  # noqa: E402
+from phrase_matcher import AUTOMATON_MIN_PHRASES, PhraseMatcher  # noqa: E402
+
+FILLER = ["i think", "honestly", "probably", "usually", "my", "level is", "i'd say", "kind of",
+          "at home", "most days", "it depends", "and", "really"]
+
+
+def legacy_rating(text):
+    """extract_rating_from_text before the shared engine"""
+    if not text or pd.isna(text):
+        return 5
+    text = str(text).lower()
+    rating_match = re.search(r'(\d+)(?:/10|out of 10|\s*(?:rating|score))', text)
+    if rating_match:
+        return min(int(rating_match.group(1)), 10)
+    rating_map = {
+        'very high': 9, 'extremely high': 10, 'super high': 9,
+        'high': 8, 'quite high': 7,
+        'medium': 5, 'moderate': 5, 'average': 5,
+        'low': 3, 'quite low': 2, 'very low': 1,
+        'none': 1, 'zero': 1
+    }
+    for key, value in rating_map.items():
+        if key in text:
+            return value
+    return 5
+
+
+def legacy_categorize(text, categories):
+    """categorize_text before the shared engine"""
+    if not text or pd.isna(text):
+        return categories[0] if categories else 'unknown'
+    text = str(text).lower()
+    for category in categories:
+        if category.lower() in text:
+            return category
+    return categories[0] if categories else 'unknown'
+
+
+def synthetic_corpus(n_texts, distinct=None, seed=7):
+    """Random answers; with ``distinct`` set, drawn from a pool of that many unique texts"""
+    rng = random.Random(seed)
+    if distinct:
+        pool = synthetic_corpus(distinct, seed=seed + 1)
+        return [rng.choice(pool) for _ in range(n_texts)]
+    phrases = list(RATING_PHRASES) + [c for cats in CATEGORY_VOCABULARIES.values() for c in cats]
+    corpus = []
+    for _ in range(n_texts):
+        words = rng.sample(FILLER, 4) + [rng.choice(phrases)]
+        if rng.random() < 0.2:
+            words.insert(3, "no")
+        rng.shuffle(words)
+        corpus.append(" ".join(words))
+    return corpus
+
+
+def timed(label, fn, corpus):
+    start = time.perf_counter()
+    results = [fn(text) for text in corpus]
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {len(corpus) / elapsed:>12,.0f} texts/s  ({elapsed * 1000:.1f} ms)")
+    return results
+
+
+def run(corpus, label):
+    model = RoommateMatchingModel()
+    pets = CATEGORY_VOCABULARIES['pets']
+
+    print(f"\n{label}")
+    old = timed("legacy rating scan", legacy_rating, corpus)
+    new = timed("engine rating", model.extract_rating_from_text, corpus)
+    print(f"  rating disagreements: {sum(a != b for a, b in zip(old, new)):,}")
+
+    old = timed("legacy categorize (pets)", lambda t: legacy_categorize(t, pets), corpus)
+    new = timed("engine categorize (pets)", lambda t: model.categorize_text(t, pets), corpus)
+    print(f"  category disagreements: {sum(a != b for a, b in zip(old, new)):,}")
+
+
+def vocabulary_sweep(n_texts, sizes=(8, 16, 32, 64, 128, 256, 512), seed=3):
+    """Scans vs automaton on uncached texts of nine words, one of them a vocabulary phrase"""
+    rng = random.Random(seed)
+    words = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 9)))
+             for _ in range(3000)]
+    print(f"\nVocabulary size sweep (uncached, {n_texts:,} texts; automaton from {AUTOMATON_MIN_PHRASES} phrases)")
+    for size in sizes:
+        vocabulary = [" ".join(rng.sample(words, rng.randint(1, 2))) for _ in range(size)]
+        corpus = []
+        for _ in range(n_texts):
+            text = rng.sample(words, 8) + [rng.choice(vocabulary)]
+            if rng.random() < 0.2:
+                text.insert(3, "no")
+            rng.shuffle(text)
+            corpus.append(" ".join(text))
+        rates = []
+        for threshold in (sys.maxsize, 0):
+            engine = PhraseMatcher(cache_size=0, automaton_min_phrases=threshold)
+            engine.add_vocabulary("sweep", {phrase: phrase for phrase in vocabulary})
+            engine.build()
+            start = time.perf_counter()
+            for text in corpus:
+                engine.classify(text, "sweep")
+            rates.append(len(corpus) / (time.perf_counter() - start))
+        print(f"{size:>4} phrases   scans {rates[0]:>10,.0f} texts/s   automaton {rates[1]:>10,.0f} texts/s")
+
+
+def main():
+    n_texts = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    run(synthetic_corpus(n_texts), f"Unique answers: {n_texts:,} texts")
+    run(synthetic_corpus(n_texts, distinct=500), f"Repeated answers (500 distinct): {n_texts:,} texts")
+    vocabulary_sweep(min(n_texts, 20000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Re-featurizing synthetic profiles: one process vs. the process-pool job.
+
+Usage: python benchmarks/bench_refeaturize.py [n_profiles] [workers ...]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model import RoommateMatchingModel  # noqa: E402
+from refeaturize import RefeaturizationJob  # noqa: E402
+
+
+def synthetic_profiles(n_profiles, seed=0):
+    rng = random.Random(seed)
+    return [{
+        "call_id": f"call_{i}",
+        "summary": f"Resident {i} works from home and likes a quiet flat",
+        "extracted_variables": {
+            "bedtime": rng.choice(["11 pm", "around midnight", "10:30 at night", "1 am"]),
+            "wake_time": rng.choice(["7 am", "6:30 in the morning", "9am"]),
+            "sleep_type": rng.choice(["light sleeper", "heavy sleeper", "normal"]),
+            "cleanliness_rating": rng.choice(["8/10", "very high", "about a 6", "medium"]),
+            "social_energy": rng.choice(["high", "quite low", "7"]),
+            "guests_preference": rng.choice(["rarely", "sometimes", "often on weekends"]),
+            "room_preference": rng.choice(["private", "shared", "either is fine"]),
+            "privacy_importance": rng.choice(["9", "moderate", "low"]),
+            "pets": rng.choice(["no pets", "a cat", "dog"]),
+            "substances": rng.choice(["none", "social drinker"]),
+            "dietary": rng.choice(["vegetarian", "none", "vegan"]),
+            "noise_tolerance": rng.choice(["low", "high", "5/10"]),
+            "cleanliness_habits": "cleans the kitchen every evening"
+        }
+    } for i in range(n_profiles)]
+
+
+def main():
+    n_profiles = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    worker_counts = [int(arg) for arg in sys.argv[2:]] or [2, 4, os.cpu_count() or 1]
+    profiles = synthetic_profiles(n_profiles)
+
+    start = time.perf_counter()
+    RoommateMatchingModel().convert_omnidim_to_dataframe(profiles)
+    serial = time.perf_counter() - start
+    print(f"{n_profiles:,} profiles, single process: {serial:7.2f} s")
+
+    for workers in worker_counts:
+        job = RefeaturizationJob(profiles, chunk_size=max(n_profiles // (workers * 4), 1), max_workers=workers)
+        start = time.perf_counter()
+        job.run()
+        elapsed = time.perf_counter() - start
+        print(f"{n_profiles:,} profiles, {workers:>2} workers:     {elapsed:7.2f} s "
+              f"({serial / elapsed:.1f}x, state {job.state})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Bytes and milliseconds per response for /match-user and /all-profiles.
+
+Compares Flask's default JSON provider with FastJSONProvider, each without
+compression and with every encoding available here.
+
+Usage: python benchmarks/bench_responses.py [n_profiles]
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("OMNIDIM_STUB", "1")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+import app as app_module  # noqa: E402
+from responses import FastJSONProvider, brotli  # noqa: E402
+
+CHOICES = {
+    "cleanliness_rating": [f"{n}/10" for n in range(1, 11)],
+    "bedtime": ["10 pm", "11 pm", "midnight", "1 am", "10:30 pm"],
+    "wake_time": ["6 am", "7 am", "8:30 am", "10 am"],
+    "sleep_type": ["light sleeper", "heavy sleeper", "normal"],
+    "social_energy": ["high", "medium", "very low", "7/10"],
+    "guests_preference": ["rarely", "sometimes", "often"],
+    "room_preference": ["private", "shared", "either"],
+    "privacy_importance": ["8/10", "high", "low"],
+    "pets": ["no pets", "a cat", "dog"],
+    "substances": ["none", "socially"],
+    "dietary": ["vegan", "vegetarian", "none"],
+    "noise_tolerance": ["low", "medium", "high"],
+    "cleanliness_habits": ["cleans daily", "weekly deep clean", "dishes right away"],
+}
+
+
+def call_report(rng, i):
+    return {"call_report": {
+        "call_id": f"call-{i}",
+        "summary": f"Profile {i}: " + " ".join(rng.choice(v) for v in CHOICES.values()),
+        "sentiment": "positive",
+        "extracted_variables": {k: rng.choice(v) for k, v in CHOICES.items()}
+    }}
+
+
+def measure(client, path, accept_encoding, repeat=20):
+    timings, size = [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(path, headers={"Accept-Encoding": accept_encoding})
+        timings.append((time.perf_counter() - start) * 1000)
+        size = len(response.get_data())
+    return statistics.median(timings), size
+
+
+def main():
+    n_profiles = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    rng = random.Random(0)
+    app = app_module.app
+    client = app.test_client()
+    for i in range(n_profiles):
+        client.post("/omnidim-callback", json=call_report(rng, i))
+    client.get("/match-user/call-0")  # build the partition index once
+
+    encodings = ["identity", "gzip"] + (["br"] if brotli is not None else [])
+    print(f"{n_profiles:,} profiles")
+    for path in ("/match-user/call-0", "/all-profiles"):
+        print(path)
+        for provider in (DefaultJSONProvider, FastJSONProvider):
+            app.json = provider(app)
+            for encoding in encodings:
+                ms, size = measure(client, path, encoding)
+                print(f"  {provider.__name__:<20} {encoding:<9} {size:>10,} bytes  {ms:7.2f} ms")
+    app.json = FastJSONProvider(app)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Build time and query latency of the profile SearchIndex at 100k profiles.
+
+Usage: python benchmarks/bench_search_index.py [n_profiles]
+"""
+import itertools
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_index import SearchIndex  # noqa: E402
+
+VOCABULARY = ("works night shift day job student nurse engineer designer remote hybrid early riser "
+              "night owl allergic to cats dogs dust loves cooking vegetarian vegan gym yoga music "
+              "guitar quiet tidy cleans daily weekly messy friends over weekends rarely often parties "
+              "reads books plants smoker non drinks socially light sleeper heavy private shared room "
+              "budget city commute office hospital college startup bank teacher").split()
+QUERIES = ['"night shift"', '"allergic to cats"', "vegan yoga", "quiet tidy light sleeper",
+           "guitar music friends", '"early riser" gym', "nurse hospital night"]
+
+
+def synthetic_words(rng, n_words=20000):
+    """Topic words plus filler drawn from a Zipf-like distribution, as real text is"""
+    filler = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 9)))
+              for _ in range(n_words)]
+    words = VOCABULARY + filler
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    rng.shuffle(weights)
+    return words, list(itertools.accumulate(weights))
+
+
+def synthetic_fields(rng, words, cum_weights):
+    def text(n_min, n_max):
+        return " ".join(rng.choices(words, cum_weights=cum_weights, k=rng.randint(n_min, n_max)))
+    return {"summary": text(20, 45), "cleanliness_habits": text(3, 10), "transcript": text(80, 200)}
+
+
+def main():
+    n_profiles = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rng = random.Random(0)
+    words, cum_weights = synthetic_words(rng)
+    documents = [synthetic_fields(rng, words, cum_weights) for _ in range(n_profiles)]
+    index = SearchIndex()
+    start = time.perf_counter()
+    for i, fields in enumerate(documents):
+        index.add(f"call-{i}", fields)
+    build = time.perf_counter() - start
+    print(f"Indexed {n_profiles:,} profiles in {build:.1f}s ({build * 1e6 / n_profiles:.0f} us/profile)")
+
+    for query in QUERIES:
+        index.search(query)  # first query per term builds its cached arrays
+        timings = []
+        for _ in range(5):
+            start = time.perf_counter()
+            results = index.search(query, limit=10)
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"  {query:<28} median {statistics.median(timings):6.2f} ms  "
+              f"{len(results)} hits, top score {results[0][1] if results else 0:.2f}")
+
+
+if __name__ == '__main__':
+    main()
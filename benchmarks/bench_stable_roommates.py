@@ -0,0 +1,57 @@
+"""Stable-roommates solver on synthetic populations of 10k+ participants.
+
+Usage: python benchmarks/bench_stable_roommates.py [n_users ...]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stable_roommates import (StableRoommates, build_preferences, count_blocking_pairs,  # noqa: E402
+                              greedy_matching)
+
+
+def synthetic_features(n_users, n_features=14, seed=0):
+    """Clustered vectors in the unit cube, roughly shaped like prepare_features output"""
+    rng = np.random.default_rng(seed)
+    centers = rng.random((max(n_users // 200, 2), n_features))
+    labels = rng.integers(0, len(centers), n_users)
+    return np.clip(centers[labels] + rng.normal(0, 0.08, (n_users, n_features)), 0, 1)
+
+
+def bench(n_users, k=10, shuffle_fraction=0.0):
+    X = synthetic_features(n_users)
+    start = time.perf_counter()
+    preferences, distances = build_preferences(X, k)
+    if shuffle_fraction:
+        # Perturb some lists so the instance is no longer distance-consistent
+        rng = np.random.default_rng(1)
+        for i in rng.choice(n_users, int(n_users * shuffle_fraction), replace=False):
+            preferences[i] = [int(j) for j in rng.permutation(preferences[i])]
+    built = time.perf_counter()
+    partners = StableRoommates(preferences).solve()
+    solved = time.perf_counter()
+    line = (f"n={n_users:>6,} k={k:<3} shuffled={shuffle_fraction:<4} "
+            f"prefs {1000 * (built - start):>7.0f} ms  irving {1000 * (solved - built):>7.0f} ms")
+    if partners is None:
+        partners, blocking = greedy_matching(preferences, distances, n_users)
+        line += f"  no stable matching -> fallback {1000 * (time.perf_counter() - solved):.0f} ms, {blocking} blocking pairs"
+    else:
+        rank = [{j: r for r, j in enumerate(row)} for row in preferences]
+        assert count_blocking_pairs(partners, preferences, rank) == 0
+        line += f"  stable, {sum(p is None for p in partners)} unmatched"
+    print(line)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 20000]
+    for n_users in sizes:
+        bench(n_users)
+        bench(n_users, shuffle_fraction=0.3)
+
+
+if __name__ == '__main__':
+    main()
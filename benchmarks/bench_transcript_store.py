@@ -0,0 +1,69 @@
+"""Memory saved by moving transcripts into the compressed TranscriptStore.
+
+Usage: python benchmarks/bench_transcript_store.py [n_profiles]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from transcript_store import TranscriptStore  # noqa: E402
+
+AGENT_LINES = [
+    "Hi! I'm here to collect your roommate preferences through voice. Are you ready to begin?",
+    "How important is cleanliness to you, on a scale of one to ten?",
+    "What time do you usually go to bed, and when do you wake up?",
+    "Would you describe yourself as a light or a heavy sleeper?",
+    "Do you like having friends over? How often?",
+    "Do you prefer a private room or are you happy to share?",
+    "Do you have any pets, and do you smoke or drink?",
+    "Any dietary restrictions we should know about?",
+    "Great, let me summarize your preferences. Does that sound right?",
+]
+USER_WORDS = ("yes sure i think probably around eleven pm seven am usually clean every day weekends "
+              "friends sometimes rarely vegetarian vegan no pets a cat quiet music light sleeper "
+              "private room shared is fine i work night shifts allergic to cats").split()
+
+
+def synthetic_transcript(rng):
+    turns = []
+    for line in AGENT_LINES:
+        turns.append(f"Agent: {line}")
+        turns.append("User: " + " ".join(rng.choice(USER_WORDS) for _ in range(rng.randint(4, 25))))
+    return "\n".join(turns)
+
+
+def measure(transcripts, train_after):
+    store = TranscriptStore(train_after=train_after)
+    start = time.perf_counter()
+    refs = [store.put(f"call-{i}", {"fullConversation": t}) for i, t in enumerate(transcripts)]
+    elapsed = time.perf_counter() - start
+    ref_bytes = sum(sys.getsizeof(ref) + sum(sys.getsizeof(v) for v in ref) for ref in refs)
+    stats = store.stats()
+    start = time.perf_counter()
+    for i in range(0, len(transcripts), max(len(transcripts) // 1000, 1)):
+        store.get(f"call-{i}")
+    read_ms = (time.perf_counter() - start) * 1000 / min(len(transcripts), 1000)
+    return stats["stored_bytes"] + stats["dictionary_bytes"], ref_bytes, elapsed, read_ms
+
+
+def main():
+    n_profiles = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rng = random.Random(0)
+    transcripts = [synthetic_transcript(rng) for _ in range(n_profiles)]
+    inline = sum(sys.getsizeof(t) for t in transcripts)
+    per_10k = 10000 / n_profiles
+
+    print(f"{n_profiles:,} profiles, inline transcripts: {inline * per_10k / 1e6:.1f} MB per 10k")
+    for label, train_after in [("zlib per record", 0), ("zlib + trained dictionary", 200)]:
+        blobs, refs, elapsed, read_ms = measure(transcripts, train_after)
+        stored = blobs + refs
+        print(f"  {label:<26} blobs {blobs * per_10k / 1e6:5.2f} MB + refs {refs * per_10k / 1e6:4.2f} MB per 10k "
+              f"(saves {(inline - stored) * per_10k / 1e6:.1f} MB, {inline / stored:.1f}x); "
+              f"write {elapsed * 1e6 / n_profiles:.0f} us/record, read {read_ms * 1000:.0f} us/record")
+
+
+if __name__ == '__main__':
+    main()
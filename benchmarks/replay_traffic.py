@@ -0,0 +1,175 @@
+"""Replay a recorded request stream against a running app and report per-route latency.
+
+Recordings come from ``traffic_recorder`` (set TRAFFIC_RECORD_PATH on the
+app). ``synthetic:N`` instead generates N webhooks interleaved with
+``/match-user`` calls for ids already sent. With ``local`` as the base URL
+the app is started on a free port with the stub Omnidim client
+(OMNIDIM_STUB=1), so replayed webhooks never dial anyone, and it is
+stopped afterwards.
+
+Requests are issued in recorded order, ``rate`` per second (0 = as fast as
+the workers go), by ``concurrency`` worker threads. A ``/match-user`` call
+can therefore overtake the webhook that creates its profile; those 404s
+count as errors, as they would in production.
+
+Usage: python benchmarks/replay_traffic.py recording.jsonl|synthetic:N [base_url|local] [concurrency] [rate]
+"""
+import json
+import os
+import queue
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_records(source):
+    if source.startswith("synthetic:"):
+        return synthetic_records(int(source.split(":", 1)[1]))
+    with open(source, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def synthetic_records(n, seed=0):
+    rng = random.Random(seed)
+    records = []
+    for i in range(n):
+        call_id = f"synthetic_{i}"
+        records.append({"method": "POST", "route": "/omnidim-callback", "path": "/omnidim-callback", "query": "",
+                        "body": {"call_report": {
+                            "call_id": call_id,
+                            "summary": f"Resident {i} works from home and likes a quiet flat",
+                            "sentiment": "positive",
+                            "fullConversation": "Agent: When do you usually go to bed?\nUser: Around eleven.\n" * 10,
+                            "extracted_variables": {
+                                "bedtime": rng.choice(["11 pm", "around midnight", "1 am", "10:30 pm"]),
+                                "wake_time": rng.choice(["7 am", "6:30 in the morning", "9am"]),
+                                "cleanliness_rating": rng.choice(["8/10", "very high", "medium", "4"]),
+                                "social_energy": rng.choice(["high", "quite low", "7"]),
+                                "room_preference": rng.choice(["private", "shared", "either is fine"]),
+                                "pets": rng.choice(["no pets", "a cat", "dog"]),
+                                "cleanliness_habits": "cleans the kitchen every evening"}}}})
+        if i >= 2:
+            target = f"synthetic_{rng.randrange(i)}"
+            records.append({"method": "GET", "route": "/match-user/<user_id>", "path": f"/match-user/{target}",
+                            "query": "", "body": None})
+    return records
+
+
+def start_local_app():
+    """The app on a free port with the stub Omnidim client; returns (process, base_url)"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    env = dict(os.environ, OMNIDIM_STUB="1", LOG_LEVEL=os.environ.get("LOG_LEVEL", "WARNING"))
+    env.pop("TRAFFIC_RECORD_PATH", None)  # don't record the replay itself
+    process = subprocess.Popen([sys.executable, "-m", "flask", "--app", "app", "run", "--port", str(port),
+                                "--no-reload"], cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"The app exited with status {process.returncode} before serving requests")
+        try:
+            if requests.get(f"{base_url}/health", timeout=1).ok:
+                return process, base_url
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("The app did not start within 60 s")
+
+
+def replay(records, base_url, concurrency=8, rate=0.0):
+    """[(route, status or None, seconds), ...] and the wall-clock time of the whole replay"""
+    pending = queue.Queue(maxsize=concurrency * 4)
+    results = []
+    lock = threading.Lock()
+
+    def worker():
+        session = requests.Session()
+        while True:
+            record = pending.get()
+            if record is None:
+                return
+            url = f"{base_url}{record['path']}" + (f"?{record['query']}" if record.get("query") else "")
+            route = f"{record['method']} {record.get('route') or record['path']}"
+            started = time.perf_counter()
+            try:
+                status = session.request(record["method"], url, json=record.get("body"), timeout=60).status_code
+            except requests.RequestException:
+                status = None
+            elapsed = time.perf_counter() - started
+            with lock:
+                results.append((route, status, elapsed))
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    started = time.perf_counter()
+    for i, record in enumerate(records):
+        if rate:
+            delay = started + i / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        pending.put(record)
+    for _ in threads:
+        pending.put(None)
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - started
+
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(p / 100 * len(sorted_values)))]
+
+
+def report(results, wall):
+    by_route = defaultdict(list)
+    for route, status, elapsed in results:
+        by_route[route].append((status, elapsed))
+    print(f"{'route':<32} {'requests':>8} {'req/s':>8} {'errors':>7} {'err %':>6} "
+          f"{'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}  statuses")
+    for route in sorted(by_route) + ["all"]:
+        rows = [(s, e) for rs in by_route.values() for s, e in rs] if route == "all" else by_route[route]
+        latencies = sorted(e * 1000 for _, e in rows)
+        errors = sum(s is None or s >= 400 for s, _ in rows)
+        statuses = Counter("error" if s is None else s for s, _ in rows)
+        print(f"{route:<32} {len(rows):>8} {len(rows) / wall:>8.1f} {errors:>7} {errors / len(rows) * 100:>6.1f} "
+              f"{percentile(latencies, 50):>8.1f} {percentile(latencies, 90):>8.1f} "
+              f"{percentile(latencies, 99):>8.1f} {latencies[-1]:>8.1f}  "
+              + ", ".join(f"{k}x{v}" for k, v in sorted(statuses.items(), key=str)))
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    records = load_records(sys.argv[1])
+    base_url = sys.argv[2] if len(sys.argv) > 2 else "local"
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    rate = float(sys.argv[4]) if len(sys.argv) > 4 else 0.0
+    process = None
+    if base_url == "local":
+        process, base_url = start_local_app()
+    try:
+        results, wall = replay(records, base_url.rstrip("/"), concurrency, rate)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(10)
+    print(f"Replayed {len(results)} requests against {base_url} in {wall:.2f} s "
+          f"(concurrency {concurrency}, rate {rate or 'unthrottled'})")
+    report(results, wall)
+
+
+if __name__ == '__main__':
+    main()
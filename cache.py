@@ -0,0 +1,276 @@
+"""Cache backends shared by the matching path.
+
+``LRUCache`` keeps values in this process. ``RedisCache`` speaks the Redis
+protocol (RESP) over plain sockets, so every worker and node behind a load
+balancer shares one cache without a client library. ``make_cache`` picks a
+backend from a URL:
+
+* ``""`` / ``memory://`` -> LRUCache
+* ``redis://host:6379/0`` -> RedisCache
+* ``stub://`` -> RedisCache against an in-process ``resp_stub`` server (local testing)
+
+Keys are versioned (see ``versioned_key``): a profile update or a parsing
+change produces a new key rather than an invalidation, so nodes never need
+to coordinate deletes. Backend errors are logged and treated as misses;
+the cache never fails a request.
+"""
+import json
+import logging
+import queue
+import socket
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder is used instead
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "saheli"
+
+
+def versioned_key(kind, ident, version):
+    """``saheli:<kind>:v<version>:<ident>``; bump ``version`` instead of deleting stale entries"""
+    return f"{KEY_PREFIX}:{kind}:v{version}:{ident}"
+
+
+def encode_value(value):
+    return orjson.dumps(value) if orjson is not None else json.dumps(value).encode("utf-8")
+
+
+def decode_value(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+class CacheError(Exception):
+    """The backend answered with an error or could not be reached"""
+
+
+class LRUCache:
+    """Least recently used eviction over at most ``max_entries`` keys, with optional TTLs"""
+
+    def __init__(self, max_entries=50000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at or None, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        return self.get_many([key])[0]
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        values = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] is not None and entry[0] <= now:
+                    del self._entries[key]
+                    entry = None
+                if entry is None:
+                    self.misses += 1
+                    values.append(None)
+                else:
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                    values.append(entry[1])
+        return values
+
+    def set(self, key, value, ttl=None):
+        self.set_many({key: value}, ttl)
+
+    def set_many(self, mapping, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            for key, value in mapping.items():
+                self._entries[key] = (expires_at, value)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            return sum(self._entries.pop(key, None) is not None for key in keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {"backend": "memory", "entries": len(self._entries), "max_entries": self.max_entries,
+                "hits": self.hits, "misses": self.misses}
+
+
+class RESPConnection:
+    """One socket speaking RESP2; commands may be pipelined"""
+
+    def __init__(self, host, port, db=0, password=None, timeout=1.0):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile("rb")
+        if password:
+            self.execute("AUTH", password)
+        if db:
+            self.execute("SELECT", db)
+
+    def execute(self, *args):
+        return self.pipeline([args])[0]
+
+    def pipeline(self, commands):
+        """Send every command, then read one reply per command"""
+        self.sock.sendall(b"".join(self._pack(args) for args in commands))
+        replies = [self._read_reply() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, CacheError):
+                raise reply
+        return replies
+
+    def close(self):
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+    @staticmethod
+    def _pack(args):
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode("utf-8")
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        return b"".join(parts)
+
+    def _read_reply(self):
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by the cache server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode("utf-8")
+        if kind == b"-":
+            return CacheError(payload.decode("utf-8"))
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self.reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            length = int(payload)
+            return None if length < 0 else [self._read_reply() for _ in range(length)]
+        raise CacheError(f"Unexpected reply from the cache server: {line[:40]!r}")
+
+
+class RedisCache:
+    """Values JSON-encoded under Redis-protocol keys, over a small pool of connections.
+
+    ``get_many`` is a single MGET; ``set_many`` pipelines one SET per key so
+    every entry gets its TTL in one round trip.
+    """
+
+    def __init__(self, host="127.0.0.1", port=6379, db=0, password=None, timeout=1.0, max_connections=8,
+                 retry_after=5.0):
+        self.host, self.port, self.db, self.password, self.timeout = host, port, db, password, timeout
+        self.retry_after = retry_after
+        self._pool = queue.LifoQueue(maxsize=max_connections)
+        self._down_until = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        parsed = urlparse(url)
+        db = int(parsed.path.lstrip("/") or 0)
+        return cls(parsed.hostname or "127.0.0.1", parsed.port or 6379, db, parsed.password, **kwargs)
+
+    def get(self, key):
+        return self.get_many([key])[0]
+
+    def get_many(self, keys):
+        if not keys:
+            return []
+        replies = self._run([("MGET", *keys)])
+        if replies is None:
+            self.misses += len(keys)
+            return [None] * len(keys)
+        values = [decode_value(data) if data is not None else None for data in replies[0]]
+        found = sum(value is not None for value in values)
+        self.hits += found
+        self.misses += len(keys) - found
+        return values
+
+    def set(self, key, value, ttl=None):
+        self.set_many({key: value}, ttl)
+
+    def set_many(self, mapping, ttl=None):
+        if not mapping:
+            return
+        expiry = ("PX", int(ttl * 1000)) if ttl else ()
+        self._run([("SET", key, encode_value(value), *expiry) for key, value in mapping.items()])
+
+    def delete(self, *keys):
+        replies = self._run([("DEL", *keys)]) if keys else None
+        return replies[0] if replies else 0
+
+    def incr(self, key):
+        replies = self._run([("INCR", key)])
+        return replies[0] if replies else None
+
+    def ping(self):
+        return self._run([("PING",)]) is not None
+
+    def stats(self):
+        return {"backend": "redis", "host": self.host, "port": self.port, "db": self.db,
+                "hits": self.hits, "misses": self.misses, "errors": self.errors}
+
+    def _run(self, commands):
+        """Pipelined replies, or None when the server is unreachable or errors.
+
+        After a failure the server is skipped for ``retry_after`` seconds so a
+        dead cache costs nothing instead of a connect timeout per request.
+        """
+        if time.monotonic() < self._down_until:
+            return None
+        try:
+            connection = self._pool.get_nowait()
+        except queue.Empty:
+            connection = None
+        try:
+            if connection is None:
+                connection = RESPConnection(self.host, self.port, self.db, self.password, self.timeout)
+            replies = connection.pipeline(commands)
+        except (OSError, CacheError) as e:
+            self.errors += 1
+            self._down_until = time.monotonic() + self.retry_after
+            if connection is not None:
+                connection.close()
+            logger.warning("Cache %s:%d unavailable, treating as a miss: %s", self.host, self.port, e)
+            return None
+        try:
+            self._pool.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+        return replies
+
+
+def make_cache(url="", max_entries=50000, timeout=1.0):
+    """Backend for a cache URL (see the module docstring)"""
+    scheme = urlparse(url).scheme if url else "memory"
+    if scheme == "memory":
+        return LRUCache(max_entries)
+    if scheme == "redis":
+        return RedisCache.from_url(url, timeout=timeout)
+    if scheme == "stub":
+        from resp_stub import RESPStubServer
+        server = RESPStubServer().start()
+        return RedisCache(server.host, server.port, timeout=timeout)
+    raise ValueError(f"Unsupported cache URL: {url}")
@@ -0,0 +1,207 @@
+import logging
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+CALL_STATUSES = ("pending", "dialing", "retrying", "placed", "failed", "completed")
+
+
+def normalize_phone_numbers(raw_numbers):
+    """Strip formatting, drop blanks and duplicates while keeping upload order"""
+    seen, numbers = set(), []
+    for raw in raw_numbers:
+        number = re.sub(r"[^\d+]", "", str(raw))
+        if len(number.lstrip("+")) >= 7 and number not in seen:
+            seen.add(number)
+            numbers.append(number)
+    return numbers
+
+
+def place_call(client, agent_id, phone_number, call_context):
+    """Dial through whichever call API the installed Omnidim client exposes"""
+    if hasattr(client.call, "dispatch_call"):
+        response = client.call.dispatch_call(agent_id=agent_id, to_number=phone_number,
+                                             call_context=call_context)
+    else:
+        response = client.call.create(agent_id=agent_id, phone_number=phone_number, call_type="Outgoing")
+    body = response.get("json", response) if isinstance(response, dict) else {}
+    call_id = body.get("call_id") or body.get("requestId") or body.get("id")
+    return str(call_id) if call_id is not None else None
+
+
+class RateLimiter:
+    """Token bucket shared by all dial workers"""
+
+    def __init__(self, rate_per_second, burst=1):
+        self.rate = float(rate_per_second)
+        self.capacity = max(float(burst), 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class Campaign:
+    """A batch of outbound calls and the state of each dial"""
+
+    def __init__(self, agent_id, phone_numbers):
+        self.id = uuid.uuid4().hex[:12]
+        self.agent_id = agent_id
+        self.created_at = datetime.now().isoformat()
+        self.calls = [{
+            "phone_number": number,
+            "status": "pending",
+            "attempts": 0,
+            "call_id": None,
+            "last_error": None,
+            "placed_at": None,
+            "completed_at": None
+        } for number in phone_numbers]
+
+    def progress(self):
+        counts = {status: 0 for status in CALL_STATUSES}
+        for call in self.calls:
+            counts[call["status"]] += 1
+        counts["total"] = len(self.calls)
+        counts["done"] = counts["failed"] + counts["completed"]
+        return counts
+
+    def to_dict(self, include_calls=True):
+        data = {
+            "campaign_id": self.id,
+            "agent_id": self.agent_id,
+            "created_at": self.created_at,
+            "progress": self.progress()
+        }
+        if include_calls:
+            data["calls"] = [dict(call) for call in self.calls]
+        return data
+
+
+class CampaignScheduler:
+    """Dispatch campaign calls through a bounded worker pool.
+
+    Dials share a per-second rate limit; a failed dial is retried with
+    exponential backoff up to ``max_attempts``. Each placed call is
+    remembered by call id, call context and phone number so the later
+    ``omnidim_callback`` report can be tied back to its campaign.
+    """
+
+    def __init__(self, client, max_workers=4, calls_per_second=1.0, max_attempts=3, retry_backoff=5.0):
+        self.client = client
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.limiter = RateLimiter(calls_per_second)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="campaign-dial")
+        self._campaigns = {}
+        self._by_call_id = {}
+        self._by_phone = {}
+        self._lock = threading.Lock()
+
+    def create(self, agent_id, phone_numbers):
+        campaign = Campaign(agent_id, normalize_phone_numbers(phone_numbers))
+        with self._lock:
+            self._campaigns[campaign.id] = campaign
+        for index in range(len(campaign.calls)):
+            self._executor.submit(self._dial, campaign, index)
+        logger.info("📣 Campaign %s created with %d numbers", campaign.id, len(campaign.calls))
+        return campaign
+
+    def get(self, campaign_id):
+        return self._campaigns.get(campaign_id)
+
+    def list(self):
+        return list(self._campaigns.values())
+
+    def record_callback(self, call_report):
+        """Mark the campaign call behind a callback as completed; returns the campaign id.
+
+        The callback's profile is already stored by now, so a malformed
+        ``call_context`` is logged and ignored rather than failing the webhook.
+        """
+        with self._lock:
+            target = None
+            if call_report.get("call_id") in self._by_call_id:
+                target = self._by_call_id[call_report["call_id"]]
+            elif (target := self._context_target(call_report.get("call_context"))) is None:
+                for key in ("phone_number", "to_number", "customer_number"):
+                    number = normalize_phone_numbers([call_report.get(key, "")])
+                    if number and number[0] in self._by_phone:
+                        target = self._by_phone[number[0]]
+                        break
+            if target is None:
+                return None
+            campaign_id, index = target
+            call = self._campaigns[campaign_id].calls[index]
+            call["status"] = "completed"
+            call["completed_at"] = datetime.now().isoformat()
+            if call_report.get("call_id"):
+                call["call_id"] = call_report["call_id"]
+        return campaign_id
+
+    def _context_target(self, context):
+        """``(campaign_id, call index)`` named by a callback's call_context, or None if it names none"""
+        if not isinstance(context, dict) or "campaign_id" not in context:
+            return None
+        campaign = self._campaigns.get(str(context["campaign_id"]))
+        if campaign is None:
+            return None
+        try:
+            index = int(context["campaign_call"])
+        except (KeyError, TypeError, ValueError):
+            logger.warning("Ignoring malformed campaign call_context: %r", context)
+            return None
+        if not 0 <= index < len(campaign.calls):
+            logger.warning("Ignoring call_context for call %d of campaign %s (%d calls)",
+                           index, campaign.id, len(campaign.calls))
+            return None
+        return campaign.id, index
+
+    def _dial(self, campaign, index):
+        call = campaign.calls[index]
+        self.limiter.acquire()
+        with self._lock:
+            call["status"] = "dialing"
+            call["attempts"] += 1
+        try:
+            context = {"campaign_id": campaign.id, "campaign_call": index}
+            call_id = place_call(self.client, campaign.agent_id, call["phone_number"], context)
+        except Exception as e:
+            with self._lock:
+                call["last_error"] = str(e)
+                retry = call["attempts"] < self.max_attempts
+                call["status"] = "retrying" if retry else "failed"
+            if retry:
+                delay = self.retry_backoff * 2 ** (call["attempts"] - 1)
+                logger.warning("Dial to %s failed (attempt %d), retrying in %.1fs",
+                               call["phone_number"], call["attempts"], delay)
+                timer = threading.Timer(delay, self._executor.submit, args=(self._dial, campaign, index))
+                timer.daemon = True
+                timer.start()
+            else:
+                logger.error("Dial to %s failed after %d attempts: %s", call["phone_number"], call["attempts"], e)
+            return
+
+        with self._lock:
+            call["status"] = "placed"
+            call["call_id"] = call_id
+            call["placed_at"] = datetime.now().isoformat()
+            if call_id:
+                self._by_call_id[call_id] = (campaign.id, index)
+            self._by_phone[call["phone_number"]] = (campaign.id, index)
@@ -10,3 +10,98 @@ VOICE_WIDGET_SCRIPT_ID = "omnidimension-web-widget"
 VOICE_WIDGET_SCRIPT_BASE = "https://backend.omnidim.io/web_widget.js"
 
 JSONBIN_API_KEY = "$2a$10$3gNg8b53sjivDhK7KS/Kr.Jghx9nq5bIzyss4xLFAD/gGwa8YvXE6"
+
+# Server-Sent Events: each open stream holds one gunicorn thread (the Procfile runs a
+# gthread worker), so keep streams short; the browser reconnects automatically
+SSE_MAX_STREAM_SECONDS = int(os.getenv("SSE_MAX_STREAM_SECONDS", "25"))
+SSE_HEARTBEAT_SECONDS = int(os.getenv("SSE_HEARTBEAT_SECONDS", "10"))
+
+# Logging: LOG_FORMAT is "json" or "text"; LOG_SAMPLE_RATES enables full payload
+# dumps for a fraction of requests per route, e.g. "match_user=0.05,omnidim_callback=0.01"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+
+# Partitioned matching: how many property/city indexes stay built in memory
+MAX_LOADED_PARTITIONS = int(os.getenv("MAX_LOADED_PARTITIONS", "16"))
+
+# Use the local stand-in for the Omnidim client (no real calls are placed)
+OMNIDIM_STUB = os.getenv("OMNIDIM_STUB", "").lower() in ("1", "true", "yes")
+
+# Outbound call campaigns
+CAMPAIGN_MAX_WORKERS = int(os.getenv("CAMPAIGN_MAX_WORKERS", "4"))
+CAMPAIGN_CALLS_PER_SECOND = float(os.getenv("CAMPAIGN_CALLS_PER_SECOND", "1"))
+CAMPAIGN_MAX_ATTEMPTS = int(os.getenv("CAMPAIGN_MAX_ATTEMPTS", "3"))
+CAMPAIGN_RETRY_BACKOFF_SECONDS = float(os.getenv("CAMPAIGN_RETRY_BACKOFF_SECONDS", "5"))
+
+# Compressed transcript blobs; in memory unless a file path is given
+TRANSCRIPT_STORE_PATH = os.getenv("TRANSCRIPT_STORE_PATH") or None
+
+# Full-text profile search; persisted only when a path is given
+SEARCH_INDEX_PATH = os.getenv("SEARCH_INDEX_PATH") or None
+SEARCH_INDEX_SAVE_EVERY = int(os.getenv("SEARCH_INDEX_SAVE_EVERY", "100"))
+
+# Offline-fitted free-text featurizer (python text_features.py profiles.json out.pkl);
+# matching uses structured features only when unset
+TEXT_FEATURIZER_PATH = os.getenv("TEXT_FEATURIZER_PATH") or None
+
+# Response compression (gzip, or brotli when installed); 0 disables it
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+
+# Room reassignment: how many other rooms a move-in/move-out may touch
+REPAIR_MAX_ROOMS = int(os.getenv("REPAIR_MAX_ROOMS", "12"))
+
+# Admin token for /debug endpoints and X-Profile request profiling; unset disables them entirely.
+# When set, POST /clear-profiles also requires it (unset keeps that route open, as before)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN") or None
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "20"))
+
+# /match-user?budget_ms=: residents ranked by the last-resort sampled tier, and how many
+# computations may wait per tier pool before requests skip straight to the next tier
+DEADLINE_SAMPLE_SIZE = int(os.getenv("DEADLINE_SAMPLE_SIZE", "200"))
+DEADLINE_MAX_QUEUED = int(os.getenv("DEADLINE_MAX_QUEUED", "4"))
+
+# Bulk re-featurization (POST /admin/refeaturize): profiles per worker task, worker
+# processes (defaults to the CPU count) and where the new matrix is written, if anywhere
+REFEATURIZE_CHUNK_SIZE = int(os.getenv("REFEATURIZE_CHUNK_SIZE", "500"))
+REFEATURIZE_WORKERS = int(os.getenv("REFEATURIZE_WORKERS", "0")) or None
+REFEATURIZE_PATH = os.getenv("REFEATURIZE_PATH") or None
+
+# Fingerprint and precompress static files at start-up and render the landing page once;
+# turn off while editing templates or static files
+STATIC_ASSET_CACHE = os.getenv("STATIC_ASSET_CACHE", "1").lower() in ("1", "true", "yes")
+
+# Cache for parsed profile features shared by all workers: "" keeps it in process,
+# "redis://host:6379/0" shares it across nodes ("stub://" runs a local stand-in)
+CACHE_URL = os.getenv("CACHE_URL", "")
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "50000"))
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "604800")) or None
+
+# Append-only profile event log (segments + compacted snapshots) replayed at start-up;
+# unset keeps profiles in memory only
+EVENT_LOG_DIR = os.getenv("EVENT_LOG_DIR") or None
+EVENT_LOG_SEGMENT_BYTES = int(os.getenv("EVENT_LOG_SEGMENT_BYTES", str(8 * 1024 * 1024)))
+EVENT_LOG_SNAPSHOT_EVERY = int(os.getenv("EVENT_LOG_SNAPSHOT_EVERY", "10000"))
+EVENT_LOG_FSYNC = os.getenv("EVENT_LOG_FSYNC", "").lower() in ("1", "true", "yes")
+
+# Batched call-result archive shipped in the background: a directory, "s3://bucket/prefix"
+# (with the ARCHIVE_S3_* settings), an http(s) endpoint or "stub://"; unset disables it
+ARCHIVE_URL = os.getenv("ARCHIVE_URL") or None
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+ARCHIVE_FLUSH_SECONDS = float(os.getenv("ARCHIVE_FLUSH_SECONDS", "60"))
+ARCHIVE_MAX_ATTEMPTS = int(os.getenv("ARCHIVE_MAX_ATTEMPTS", "5"))
+ARCHIVE_HTTP_TOKEN = os.getenv("ARCHIVE_HTTP_TOKEN") or None
+ARCHIVE_S3_ENDPOINT = os.getenv("ARCHIVE_S3_ENDPOINT") or None
+ARCHIVE_S3_ACCESS_KEY = os.getenv("ARCHIVE_S3_ACCESS_KEY") or None
+ARCHIVE_S3_SECRET_KEY = os.getenv("ARCHIVE_S3_SECRET_KEY") or None
+ARCHIVE_S3_REGION = os.getenv("ARCHIVE_S3_REGION", "us-east-1")
+
+# Record webhook and match traffic to JSON lines for benchmarks/replay_traffic.py; unset disables it.
+# Comma-separated path prefixes; a fixed salt keeps pseudonyms stable across restarts
+TRAFFIC_RECORD_PATH = os.getenv("TRAFFIC_RECORD_PATH") or None
+TRAFFIC_RECORD_ROUTES = [p.strip() for p in os.getenv("TRAFFIC_RECORD_ROUTES", "/omnidim-callback,/match-user/").split(",")
+                         if p.strip()]
+TRAFFIC_RECORD_SALT = os.getenv("TRAFFIC_RECORD_SALT") or None
+TRAFFIC_RECORD_RAW = os.getenv("TRAFFIC_RECORD_RAW", "").lower() in ("1", "true", "yes")
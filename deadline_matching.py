@@ -0,0 +1,126 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from model import RoommateMatchingModel
+from partitions import score_candidates
+
+logger = logging.getLogger(__name__)
+
+TIERS = ("cached", "exact", "approximate", "sampled")
+
+
+class DeadlineExceeded(Exception):
+    """No tier produced matches within the request's budget"""
+
+
+class DeadlineMatcher:
+    """Answer /match-user within a time budget, degrading step by step.
+
+    1. ``cached``: the scheduler's stored result, even if a newer profile
+       has since made it stale.
+    2. ``exact``: the normal on-demand computation, given ``exact_share`` of
+       the budget. If it runs over, it keeps going in the background and its
+       result is stored for the next request.
+    3. ``approximate``: the partition's last built index, queried as is
+       without rebuilding, so the newest residents may be missing.
+    4. ``sampled``: an exact ranking over a random subset of at most
+       ``sample_size`` residents.
+
+    Each pool takes at most ``max_workers + max_queued`` computations. A
+    saturated exact pool sends requests straight to the fallback tiers, and
+    a computation that has not started by its deadline is cancelled.
+    """
+
+    def __init__(self, index, scheduler, n_matches=5, sample_size=200, exact_share=0.6, max_workers=4,
+                 max_queued=4):
+        self.index = index
+        self.scheduler = scheduler
+        self.n_matches = n_matches
+        self.sample_size = sample_size
+        self.exact_share = exact_share
+        # Exact computations that overran keep running; give the cheaper tiers
+        # their own workers so they never queue behind them
+        self._exact = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="deadline-exact")
+        self._fallback = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="deadline-fallback")
+        self._slots = {self._exact: threading.BoundedSemaphore(max_workers + max_queued),
+                       self._fallback: threading.BoundedSemaphore(max_workers + max_queued)}
+        self.rejected = 0
+
+    def match(self, user_id, budget_ms):
+        """Return ``(result, tier)``; raises DeadlineExceeded when nothing fit in the budget"""
+        started = time.perf_counter()
+        deadline = started + budget_ms / 1000
+
+        entry = self.scheduler.get(user_id)
+        if entry is not None:
+            return self.scheduler.annotate(entry, "precomputed"), "cached"
+
+        exact_deadline = started + self.exact_share * (deadline - started)
+        entry = self._within(self._exact, exact_deadline, self.scheduler.compute, user_id)
+        if entry is not None:
+            return self.scheduler.annotate(entry, "on_demand"), "exact"
+
+        result = self._within(self._fallback, deadline, self._approximate, user_id)
+        if result is not None:
+            return result, "approximate"
+
+        result = self._within(self._fallback, deadline, self._sampled, user_id)
+        if result is not None:
+            return result, "sampled"
+        raise DeadlineExceeded(f"No matches for {user_id} within {budget_ms} ms")
+
+    def _within(self, executor, deadline, fn, *args):
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return None
+        slots = self._slots[executor]
+        if not slots.acquire(blocking=False):
+            self.rejected += 1
+            logger.info("%s for %s skipped; its pool is saturated", fn.__name__.lstrip("_"), args[0])
+            return None
+        future = executor.submit(fn, *args)
+        future.add_done_callback(lambda _: slots.release())
+        try:
+            return future.result(timeout=remaining)
+        except FutureTimeout:
+            future.cancel()  # only succeeds if it never started; a running computation finishes
+            logger.info("%s for %s missed its deadline", fn.__name__.lstrip("_"), args[0])
+            return None
+
+    def _approximate(self, user_id):
+        shard = self.index.shard_for(user_id)
+        profile = self.index.profile_of(user_id)
+        snapshot = shard.stale_snapshot() if shard is not None else None
+        if snapshot is None or profile is None:
+            return None
+        # query_profile featurizes with transform_features, so an unseen category
+        # in this profile can't re-encode the stale index it is ranked against
+        candidates = shard.query_profile(profile, self.n_matches, allow_stale=True)
+        if not candidates:
+            return None
+        return {
+            "target_user": {"user_id": user_id, "partition": shard.key},
+            "matches": score_candidates(candidates),
+            "index_generation": snapshot[5],
+            "current_generation": shard.generation
+        }
+
+    def _sampled(self, user_id):
+        shard = self.index.shard_for(user_id)
+        profile = self.index.profile_of(user_id)
+        if shard is None or profile is None:
+            return None
+        others = [p for p in list(shard.profiles) if p.get("call_id") != user_id]
+        if not others:
+            return None
+        sample = random.sample(others, min(self.sample_size, len(others)))
+        matcher = RoommateMatchingModel()
+        df, X = matcher.build_feature_matrix(sample + [profile])
+        result = matcher.rank_candidates(df, X, len(sample), self.n_matches)
+        result["target_user"]["partition"] = shard.key
+        result["candidates_considered"] = len(sample)
+        result["total_profiles"] = len(others) + 1
+        return result
@@ -0,0 +1,304 @@
+"""Append-only, segmented event log of profile changes with compacted snapshots.
+
+Every change to the profile store is an event, one JSON line per event:
+
+* ``ingest``: a call report was stored. As in the live store, a repeated
+  call_id is kept as another profile after the earlier one, so a replay
+  rebuilds exactly the list that was in memory;
+* ``delete``: every profile with a call_id was removed;
+* ``clear``: every profile was removed.
+
+Lines go to ``segment-<first seq>.log`` files that roll over at
+``segment_bytes``. Every ``snapshot_every`` events, the live profiles are
+written to ``snapshot-<seq>.json.gz`` in the background (temp file plus
+rename). Only the newest ``keep_snapshots`` snapshots are kept, and
+segments older than the oldest kept snapshot are deleted. ``recover``
+loads the newest snapshot and replays only the events after it.
+``recover(until_seq=...)`` rebuilds an earlier state, for example the one
+just before a ``clear``, as long as a kept snapshot precedes it or the
+segments still reach back to the first event; otherwise it raises
+``EventLogError`` rather than return a partial store.
+
+Usage: python event_log.py events_dir [until_seq] [profiles.json]
+"""
+import gzip
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder is used instead
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+EVENT_TYPES = ("ingest", "delete", "clear")
+SEGMENT_PATTERN = re.compile(r"^segment-(\d{12})\.log$")
+SNAPSHOT_PATTERN = re.compile(r"^snapshot-(\d{12})\.json\.gz$")
+
+
+def _dumps(value):
+    return orjson.dumps(value) if orjson is not None else json.dumps(value).encode("utf-8")
+
+
+def _loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+class EventLogError(Exception):
+    """The requested state can no longer be rebuilt from the kept snapshots and segments"""
+
+
+def apply_event(state, event):
+    """Apply one event to the list of profiles, oldest first"""
+    kind = event["type"]
+    if kind == "ingest":
+        state.append(event["profile"])
+    elif kind == "delete":
+        state[:] = [p for p in state if p.get("call_id") != event["call_id"]]
+    elif kind == "clear":
+        state.clear()
+
+
+class EventLog:
+    """Durable history of the profile store; see the module docstring for the layout"""
+
+    def __init__(self, directory, segment_bytes=8 * 1024 * 1024, snapshot_every=10000, keep_snapshots=2,
+                 fsync=False):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.snapshot_every = snapshot_every
+        self.keep_snapshots = max(keep_snapshots, 1)
+        self.fsync = fsync
+        self.state = []
+        self.seq = 0
+        self.last_replay = None
+        self.last_snapshot = None
+        self._recovered = False
+        self._file = None
+        self._file_size = 0
+        self._since_snapshot = 0
+        self._snapshotting = False
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def recover(self, until_seq=None):
+        """Live profiles (oldest first) from the newest usable snapshot plus the events after it.
+
+        Without ``until_seq`` the result also becomes this log's state, and
+        new events continue from the last replayed sequence number.
+        """
+        started = time.perf_counter()
+        snapshot_seq, profiles = self._load_snapshot(until_seq)
+        segments = self._segments()
+        # Segments are named after their first event; a gap means compacted (or lost) history
+        if segments and segments[0][0] > snapshot_seq + 1:
+            message = (f"Events {snapshot_seq + 1}..{segments[0][0] - 1} are gone and no kept snapshot "
+                       f"covers {'seq ' + str(until_seq) if until_seq is not None else 'them'}")
+            if until_seq is not None:
+                raise EventLogError(message)
+            logger.error("Event log %s is incomplete, recovering what is left: %s", self.directory, message)
+        state = list(profiles)
+        loaded = time.perf_counter()
+        seq, replayed = snapshot_seq, 0
+        for event in self._events_after(snapshot_seq):
+            if until_seq is not None and event["seq"] > until_seq:
+                break
+            apply_event(state, event)
+            seq = event["seq"]
+            replayed += 1
+        finished = time.perf_counter()
+        elapsed = finished - started
+        self.last_replay = {
+            "snapshot_seq": snapshot_seq,
+            "events_replayed": replayed,
+            "seq": seq,
+            "profiles": len(state),
+            "snapshot_seconds": round(loaded - started, 4),
+            "replay_seconds": round(finished - loaded, 4),
+            "seconds": round(elapsed, 4),
+            "events_per_second": round(replayed / (finished - loaded)) if replayed and finished > loaded else None
+        }
+        if until_seq is None:
+            with self._lock:
+                self.state, self.seq = state, seq
+                self._since_snapshot = replayed
+                # New events start a fresh segment; a torn last line stays where it is
+                self._close_segment()
+                self._recovered = True
+        logger.info("Recovered %d profiles from snapshot %d + %d events in %.3f s", len(state), snapshot_seq,
+                    replayed, elapsed)
+        return list(state)
+
+    def append(self, kind, call_id=None, profile=None):
+        """Write one event and apply it to the state; returns its sequence number"""
+        if kind not in EVENT_TYPES:
+            raise ValueError(f"Unknown event type: {kind}")
+        if not self._recovered:
+            self.recover()
+        with self._lock:
+            self.seq += 1
+            event = {"seq": self.seq, "type": kind, "ts": datetime.now().isoformat(),
+                     "call_id": call_id, "profile": profile}
+            self._write(_dumps(event) + b"\n")
+            apply_event(self.state, event)
+            self._since_snapshot += 1
+            snapshot = None
+            if self.snapshot_every and self._since_snapshot >= self.snapshot_every and not self._snapshotting:
+                self._snapshotting = True
+                self._since_snapshot = 0
+                snapshot = (self.seq, list(self.state))
+        if snapshot is not None:
+            threading.Thread(target=self._snapshot_in_background, args=snapshot,
+                             name="event-log-snapshot", daemon=True).start()
+        return event["seq"]
+
+    def snapshot(self):
+        """Write a snapshot of the current state now; returns its sequence number"""
+        with self._lock:
+            seq, profiles = self.seq, list(self.state)
+            self._since_snapshot = 0
+        self._write_snapshot(seq, profiles)
+        return seq
+
+    def close(self):
+        with self._lock:
+            self._close_segment()
+
+    def stats(self):
+        segments = self._segments()
+        return {
+            "directory": self.directory,
+            "seq": self.seq,
+            "profiles": len(self.state),
+            "segments": len(segments),
+            "segment_bytes": sum(os.path.getsize(path) for _, path in segments),
+            "snapshots": [seq for seq, _ in self._snapshots()],
+            "events_since_snapshot": self._since_snapshot,
+            "last_snapshot": self.last_snapshot,
+            "last_replay": self.last_replay
+        }
+
+    def _write(self, line):
+        if self._file is None or self._file_size >= self.segment_bytes:
+            self._close_segment()
+            path = os.path.join(self.directory, f"segment-{self.seq:012d}.log")
+            self._file = open(path, "ab")
+            self._file_size = self._file.tell()
+        self._file.write(line)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._file_size += len(line)
+
+    def _close_segment(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._file_size = 0
+
+    def _segments(self):
+        """``[(first seq, path), ...]`` in order"""
+        return sorted((int(m.group(1)), os.path.join(self.directory, name))
+                      for name in os.listdir(self.directory) if (m := SEGMENT_PATTERN.match(name)))
+
+    def _snapshots(self):
+        return sorted((int(m.group(1)), os.path.join(self.directory, name))
+                      for name in os.listdir(self.directory) if (m := SNAPSHOT_PATTERN.match(name)))
+
+    def _events_after(self, seq):
+        segments = self._segments()
+        for n, (first, path) in enumerate(segments):
+            # Every event in this segment precedes the next segment's first one
+            if n + 1 < len(segments) and segments[n + 1][0] <= seq + 1:
+                continue
+            with open(path, "rb") as f:
+                for line_number, line in enumerate(f, 1):
+                    # Events are written with "seq" first; skip older ones without decoding them
+                    if line.startswith(b'{"seq":'):
+                        end = line.find(b",", 7)
+                        if end > 0 and line[7:end].isdigit() and int(line[7:end]) <= seq:
+                            continue
+                    try:
+                        event = _loads(line)
+                    except ValueError:
+                        logger.warning("Skipping unreadable event at %s:%d", path, line_number)
+                        continue
+                    if event["seq"] > seq:
+                        yield event
+
+    def _load_snapshot(self, until_seq=None):
+        for seq, path in reversed(self._snapshots()):
+            if until_seq is not None and seq > until_seq:
+                continue
+            try:
+                with open(path, "rb") as f:
+                    data = _loads(gzip.decompress(f.read()))
+                return data["seq"], data["profiles"]
+            except (OSError, ValueError, KeyError, EOFError):
+                logger.warning("Snapshot %s is unreadable; trying an older one", path)
+        return 0, []
+
+    def _snapshot_in_background(self, seq, profiles):
+        try:
+            self._write_snapshot(seq, profiles)
+        except Exception:
+            logger.exception("Event log snapshot at %d failed", seq)
+        finally:
+            self._snapshotting = False
+
+    def _write_snapshot(self, seq, profiles):
+        started = time.perf_counter()
+        path = os.path.join(self.directory, f"snapshot-{seq:012d}.json.gz")
+        data = gzip.compress(_dumps({"seq": seq, "created_at": datetime.now().isoformat(), "profiles": profiles}),
+                             compresslevel=3)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self.last_snapshot = {"seq": seq, "profiles": len(profiles), "bytes": len(data),
+                              "seconds": round(time.perf_counter() - started, 4)}
+        self._compact()
+        logger.info("Event log snapshot at %d: %d profiles, %d bytes", seq, len(profiles), len(data))
+
+    def _compact(self):
+        """Drop snapshots beyond ``keep_snapshots`` and segments older than the oldest one kept"""
+        snapshots = self._snapshots()
+        for _, path in snapshots[:-self.keep_snapshots]:
+            os.remove(path)
+        oldest = snapshots[-self.keep_snapshots:][0][0]
+        segments = self._segments()
+        for n, (first, path) in enumerate(segments[:-1]):
+            if segments[n + 1][0] <= oldest + 1:
+                os.remove(path)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    until_seq = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    log = EventLog(sys.argv[1])
+    try:
+        profiles = log.recover(until_seq)
+    except EventLogError as e:
+        print(f"Cannot rebuild the store: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(log.last_replay))
+    if len(sys.argv) > 3:
+        with open(sys.argv[3], "w") as f:
+            json.dump({"profiles": profiles}, f)
+        print(f"Wrote {len(profiles)} profiles to {sys.argv[3]}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
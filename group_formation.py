@@ -0,0 +1,216 @@
+import math
+
+import numpy as np
+from sklearn.neighbors import NearestNeighbors
+
+COMPATIBILITY_FACTORS = ("sleep_compatibility", "cleanliness_compatibility", "social_compatibility",
+                         "lifestyle_compatibility", "privacy_compatibility")
+# Factors from RoommateMatchingModel.get_compatibility_factors that every pair in a room must satisfy
+DEFAULT_REQUIRED_FACTORS = ("sleep_compatibility", "lifestyle_compatibility")
+
+
+class FactorConstraints:
+    """Vectorised ``get_compatibility_factors`` checks used as hard constraints.
+
+    Built from the raw (unscaled) DataFrame of ``convert_omnidim_to_dataframe``
+    with the same thresholds as the model. Users who prefer a private room
+    are never placed in a group.
+    """
+
+    def __init__(self, df, required=DEFAULT_REQUIRED_FACTORS):
+        unknown = set(required) - set(COMPATIBILITY_FACTORS)
+        if unknown:
+            raise ValueError(f"Unknown compatibility factors: {', '.join(sorted(unknown))}")
+        self.required = tuple(required)
+        self.bedtime = df['bedtime_num'].to_numpy(dtype=float)
+        self.wake_time = df['wake_time_num'].to_numpy(dtype=float)
+        self.cleanliness = df['cleanliness_rating'].to_numpy(dtype=float)
+        self.social = df['social_energy_rating'].to_numpy(dtype=float)
+        self.privacy = df['privacy_importance'].to_numpy(dtype=float)
+        self.lifestyle = (df['pets'].astype(str) + "|" + df['substances'].astype(str)).to_numpy()
+        self.wants_private = (df['room_type_preference'] == 'private').to_numpy()
+
+    def feasible(self, i, others):
+        """Boolean mask: can user ``i`` share a room with each of ``others``"""
+        others = np.asarray(others, dtype=int)
+        ok = ~self.wants_private[others] & ~self.wants_private[i]
+        if "sleep_compatibility" in self.required:
+            ok &= _clock_gap(self.bedtime[i], self.bedtime[others]) <= 2
+            ok &= _clock_gap(self.wake_time[i], self.wake_time[others]) <= 2
+        if "cleanliness_compatibility" in self.required:
+            ok &= np.abs(self.cleanliness[i] - self.cleanliness[others]) <= 2
+        if "social_compatibility" in self.required:
+            ok &= np.abs(self.social[i] - self.social[others]) <= 3
+        if "lifestyle_compatibility" in self.required:
+            ok &= self.lifestyle[others] == self.lifestyle[i]
+        if "privacy_compatibility" in self.required:
+            ok &= np.abs(self.privacy[i] - self.privacy[others]) <= 2
+        return ok
+
+    def pair(self, i, j):
+        return bool(self.feasible(i, [j])[0])
+
+    def eligible(self):
+        return ~self.wants_private
+
+
+def _clock_gap(a, b):
+    diff = np.abs(a - b)
+    return np.minimum(diff, 24 - diff)
+
+
+class GroupFormation:
+    """Form 3-4 person rooms where every pair is compatible.
+
+    Pair compatibility is ``1 / (1 + distance)`` over the feature matrix; a
+    group's value is the minimum (``objective="min"``) or mean pairwise
+    compatibility. Groups are seeded greedily, most-constrained user first,
+    growing each group with the candidate from its members' k nearest
+    neighbours that keeps the group's value highest and satisfies every hard
+    constraint. A bounded local search then swaps members between groups
+    while the summed group value improves. Work stays O(n * k) per pass, so
+    thousands of residents per property are fine.
+    """
+
+    def __init__(self, X, constraints=None, group_size=3, objective="min", k=20, max_passes=3):
+        if objective not in ("min", "mean"):
+            raise ValueError("objective must be 'min' or 'mean'")
+        self.X = np.asarray(X, dtype=float)
+        self.rows = self.X.tolist()
+        self.n = len(self.X)
+        self.constraints = constraints
+        self.group_size = group_size
+        self.objective = objective
+        self.k = k
+        self.max_passes = max_passes
+        self._pair_feasible = {}
+
+    def score(self, i, j):
+        return 1.0 / (1.0 + math.dist(self.rows[i], self.rows[j]))
+
+    def value(self, members):
+        scores = [self.score(a, b) for x, a in enumerate(members) for b in members[x + 1:]]
+        if not scores:
+            return 0.0
+        return min(scores) if self.objective == "min" else sum(scores) / len(scores)
+
+    def compatible(self, i, j):
+        if self.constraints is None:
+            return True
+        key = (i, j) if i < j else (j, i)
+        if key not in self._pair_feasible:
+            self._pair_feasible[key] = self.constraints.pair(i, j)
+        return self._pair_feasible[key]
+
+    def solve(self):
+        """Return ``(groups, unassigned, swaps)`` with groups as lists of row indices"""
+        eligible = self.constraints.eligible() if self.constraints is not None else np.ones(self.n, dtype=bool)
+        if self.n < self.group_size:
+            return [], [i for i in range(self.n)], 0
+        knn = NearestNeighbors(n_neighbors=min(self.k + 1, self.n)).fit(self.X)
+        neighbours = knn.kneighbors(self.X, return_distance=False)[:, 1:]
+        feasible_neighbours = []
+        for i in range(self.n):
+            row = neighbours[i][eligible[neighbours[i]]]
+            if self.constraints is not None and eligible[i]:
+                row = row[self.constraints.feasible(i, row)]
+            feasible_neighbours.append(row if eligible[i] else row[:0])
+
+        group_of = np.full(self.n, -1)
+        groups = []
+        order = sorted(np.flatnonzero(eligible), key=lambda i: len(feasible_neighbours[i]))
+        self._seed(order, feasible_neighbours, group_of, groups)
+
+        # Users whose neighbourhoods are used up get a second chance among all leftovers
+        leftovers = np.flatnonzero(eligible & (group_of < 0))
+        if len(leftovers) >= self.group_size:
+            self._seed(list(leftovers), None, group_of, groups, pool=leftovers)
+
+        swaps = self._improve(groups, group_of, feasible_neighbours)
+        unassigned = [int(i) for i in np.flatnonzero(group_of < 0)]
+        return groups, unassigned, swaps
+
+    def _seed(self, order, feasible_neighbours, group_of, groups, pool=None):
+        for seed in order:
+            if group_of[seed] >= 0:
+                continue
+            members = [int(seed)]
+            while len(members) < self.group_size:
+                if pool is None:
+                    candidates = np.unique(np.concatenate([feasible_neighbours[m] for m in members]))
+                else:
+                    candidates = pool
+                candidates = candidates[group_of[candidates] < 0]
+                candidates = candidates[~np.isin(candidates, members)]
+                for m in members:
+                    if not len(candidates):
+                        break
+                    if self.constraints is not None:
+                        candidates = candidates[self.constraints.feasible(m, candidates)]
+                if not len(candidates):
+                    break
+                gaps = np.linalg.norm(self.X[candidates][:, None, :] - self.X[members][None, :, :], axis=2)
+                scores = 1.0 / (1.0 + gaps)
+                values = scores.min(axis=1) if self.objective == "min" else scores.mean(axis=1)
+                members.append(int(candidates[int(np.argmax(values))]))
+            if len(members) == self.group_size:
+                for m in members:
+                    group_of[m] = len(groups)
+                groups.append(members)
+
+    def _improve(self, groups, group_of, feasible_neighbours):
+        values = [self.value(g) for g in groups]
+        swaps = 0
+        for _ in range(self.max_passes):
+            improved = False
+            for g, members in enumerate(groups):
+                for u in list(members):
+                    if u not in groups[g]:
+                        continue
+                    for v in feasible_neighbours[u]:
+                        h = group_of[v]
+                        if h < 0 or h == g:
+                            continue
+                        new_g = [x if x != u else int(v) for x in groups[g]]
+                        new_h = [x if x != v else u for x in groups[h]]
+                        if not (all(self.compatible(int(v), x) for x in new_g if x != v)
+                                and all(self.compatible(u, x) for x in new_h if x != u)):
+                            continue
+                        value_g, value_h = self.value(new_g), self.value(new_h)
+                        if value_g + value_h > values[g] + values[h] + 1e-9:
+                            groups[g], groups[h] = new_g, new_h
+                            values[g], values[h] = value_g, value_h
+                            group_of[v], group_of[u] = g, h
+                            swaps += 1
+                            improved = True
+                            break
+            if not improved:
+                break
+        return swaps
+
+
+def form_groups(X, user_ids, df=None, group_size=3, objective="min", k=20,
+                required_factors=DEFAULT_REQUIRED_FACTORS):
+    """Partition users into compatible rooms of ``group_size``; leftovers are reported unassigned"""
+    constraints = FactorConstraints(df, required_factors) if df is not None else None
+    engine = GroupFormation(X, constraints, group_size=group_size, objective=objective, k=k)
+    groups, unassigned, swaps = engine.solve()
+
+    results = []
+    for members in groups:
+        scores = [engine.score(a, b) for x, a in enumerate(members) for b in members[x + 1:]]
+        results.append({
+            "user_ids": [user_ids[m] for m in members],
+            "min_compatibility": round(min(scores), 4),
+            "mean_compatibility": round(sum(scores) / len(scores), 4)
+        })
+    results.sort(key=lambda g: g["min_compatibility" if objective == "min" else "mean_compatibility"],
+                 reverse=True)
+    return {
+        "group_size": group_size,
+        "objective": objective,
+        "required_factors": list(required_factors) if df is not None else [],
+        "groups": results,
+        "unassigned": [user_ids[i] for i in unassigned],
+        "improvement_swaps": swaps
+    }
@@ -0,0 +1,97 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Render records as one JSON object per line.
+
+    Values passed through ``extra`` (e.g. ``extra={"payload": result}``) are
+    serialized here, in the listener thread, rather than in the request.
+    """
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves all formatting to the background listener.
+
+    The stock ``prepare`` formats the message in the calling thread; here the
+    record is enqueued as-is, so payloads passed via ``extra`` must not be
+    mutated after logging.
+    """
+
+    def prepare(self, record):
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
+class PayloadSampler:
+    """Decide per route whether a verbose payload dump should be logged.
+
+    Rates come from a string like ``"match_user=0.1,omnidim_callback=0.01"``;
+    routes without a rate never dump payloads.
+    """
+
+    def __init__(self, rates=""):
+        self.rates = self.parse_rates(rates)
+
+    @staticmethod
+    def parse_rates(rates):
+        parsed = {}
+        for item in filter(None, (part.strip() for part in rates.split(","))):
+            route, _, rate = item.partition("=")
+            try:
+                parsed[route.strip()] = max(0.0, min(float(rate), 1.0))
+            except ValueError:
+                continue
+        return parsed
+
+    def sample(self, route):
+        rate = self.rates.get(route, 0.0)
+        return rate > 0 and (rate >= 1 or random.random() < rate)
+
+
+def setup_logging(level="INFO", fmt="json"):
+    """Route all logging through a queue drained by a background listener thread"""
+    if fmt == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(message)s")
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.handlers = [DeferredQueueHandler(log_queue)]
+    root.setLevel(level)
+
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -0,0 +1,168 @@
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class MatchScheduler:
+    """Precompute each user's top-k matches in a background thread pool.
+
+    Matches come from the user's partition in a ``PartitionedIndex``; entries
+    record the shard generation they were computed at, so a later newcomer in
+    the same partition marks them stale. Results are stored per user so
+    ``/match-user`` becomes a dictionary lookup. With a ``RoomInventory``,
+    candidates who could share an available room at the partition's property
+    rank first, and entries computed before the rooms at their own property
+    last changed are recomputed on request.
+    """
+
+    def __init__(self, index, n_matches=5, max_workers=2, room_inventory=None):
+        self.index = index
+        self.room_inventory = room_inventory
+        self.n_matches = n_matches
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="match-precompute")
+        self._results = {}
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def profile_ingested(self, user_id):
+        """Schedule a refresh for a newly ingested user and anyone they displace"""
+        return self._executor.submit(self._refresh, user_id)
+
+    def get(self, user_id):
+        """Return the stored entry for a user, or None if nothing was precomputed"""
+        with self._lock:
+            return self._results.get(user_id)
+
+    def get_or_compute(self, user_id):
+        """Return ``(entry, source)``, computing on demand when nothing is stored yet"""
+        entry = self.get(user_id)
+        if entry is not None and entry["inventory_version"] == self._inventory_version(entry["partition"]):
+            return entry, "precomputed"
+        return self.compute(user_id), "on_demand"
+
+    def compute(self, user_id):
+        """Compute and store a single user's matches synchronously"""
+        snapshot = self._snapshot_for(user_id)
+        if snapshot is None:
+            return None
+        return self._compute_and_store(snapshot, user_id)
+
+    def annotate(self, entry, source):
+        """Copy a stored result and attach its freshness metadata"""
+        shard = self.index.shard(entry["partition"])
+        current_generation = shard.generation if shard is not None else entry["generation"]
+        result = dict(entry["result"])
+        result["freshness"] = {
+            "source": source,
+            "partition": entry["partition"],
+            "computed_at": entry["computed_at"],
+            "generation": entry["generation"],
+            "current_generation": current_generation,
+            "stale": entry["generation"] < current_generation
+        }
+        return result
+
+    def subscribe(self, user_id):
+        """Return a queue receiving ``(event, entry)`` whenever the user's matches change"""
+        events = queue.Queue()
+        with self._lock:
+            self._subscribers.setdefault(user_id, []).append(events)
+        return events
+
+    def unsubscribe(self, user_id, events):
+        with self._lock:
+            listeners = self._subscribers.get(user_id, [])
+            if events in listeners:
+                listeners.remove(events)
+            if not listeners:
+                self._subscribers.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._results = {}
+
+    def _inventory_version(self, key):
+        return self.room_inventory.version_of(key) if self.room_inventory is not None else 0
+
+    def _snapshot_for(self, user_id):
+        key = self.index.partition_of(user_id)
+        if key is None:
+            return None
+        snapshot = self.index.snapshot(key, self.n_matches)
+        if snapshot is None or user_id not in snapshot[4]:
+            return None
+        return key, snapshot
+
+    def _refresh(self, user_id):
+        try:
+            found = self._snapshot_for(user_id)
+            if found is None:
+                return
+            key, (matcher, df, X, knn, index_of, generation) = found
+            self._compute_and_store(found, user_id)
+
+            # Only users whose k-th neighbour is farther away than the newcomer
+            # (or who have nothing stored yet) need their list recomputed. Both
+            # distances are measured in this snapshot: a refit rescales features,
+            # so distances stored from an earlier fit are not comparable.
+            distances = np.linalg.norm(X - X[index_of[user_id]], axis=1)
+            refreshed = 0
+            for other_id, other_index in index_of.items():
+                if other_id == user_id:
+                    continue
+                entry = self.get(other_id)
+                if (entry is None
+                        or len(entry["match_ids"]) < self.n_matches
+                        or distances[other_index] < self._kth_distance(X, index_of, other_index, entry)):
+                    self._compute_and_store(found, other_id)
+                    refreshed += 1
+            logger.info("Precomputed matches for %s; refreshed %d displaced users (partition %s, generation %d)",
+                        user_id, refreshed, key, generation)
+        except Exception:
+            logger.exception("Failed to precompute matches for %s", user_id)
+
+    @staticmethod
+    def _kth_distance(X, index_of, target_index, entry):
+        """Distance to the farthest stored match, in the given snapshot; inf if one has left it"""
+        if any(match_id not in index_of for match_id in entry["match_ids"]):
+            return np.inf
+        return float(max((np.linalg.norm(X[index_of[m]] - X[target_index]) for m in entry["match_ids"]),
+                         default=np.inf))
+
+    def _compute_and_store(self, found, user_id):
+        key, (matcher, df, X, knn, index_of, generation) = found
+        target_index = index_of[user_id]
+        inventory_version = self._inventory_version(key)
+        room_check = None
+        if self.room_inventory is not None and self.room_inventory.has_rooms(key):
+            def room_check(target_id, candidate_id):
+                return self.room_inventory.shared_room_for(target_id, candidate_id, key)
+        result = matcher.rank_candidates(df, X, target_index, self.n_matches, knn=knn, room_check=room_check)
+        entry = {
+            "result": result,
+            "partition": key,
+            "generation": generation,
+            "computed_at": datetime.now().isoformat(),
+            "match_ids": [m['user_id'] for m in result['matches'] if m['user_id'] in index_of],
+            "inventory_version": inventory_version
+        }
+        with self._lock:
+            existing = self._results.get(user_id)
+            if (existing is None or existing["partition"] != key
+                    or existing["generation"] < generation
+                    or (existing["generation"] == generation
+                        and existing["inventory_version"] <= inventory_version)):
+                self._results[user_id] = entry
+                event = "match-ready" if existing is None else "match-updated"
+                for events in self._subscribers.get(user_id, []):
+                    events.put((event, entry))
+            else:
+                entry = existing
+        return entry
@@ -5,12 +5,66 @@ from sklearn.neighbors import NearestNeighbors
 from sklearn.metrics.pairwise import cosine_similarity
 import re
 from datetime import datetime
+from phrase_matcher import PhraseMatcher
+
+RATING_PHRASES = {
+    'very high': 9, 'extremely high': 10, 'super high': 9,
+    'high': 8, 'quite high': 7,
+    'medium': 5, 'moderate': 5, 'average': 5,
+    'low': 3, 'quite low': 2, 'very low': 1,
+    'none': 1, 'zero': 1
+}
+
+CATEGORY_VOCABULARIES = {
+    'sleep_type': ['light', 'heavy', 'normal'],
+    'guests_preference': ['never', 'rarely', 'sometimes', 'often', 'frequently'],
+    'room_type_preference': ['private', 'shared', 'either'],
+    'pets': ['none', 'cat', 'dog', 'other', 'multiple'],
+    'substances': ['none', 'social', 'regular', 'heavy'],
+    'dietary_restrictions': ['none', 'vegetarian', 'vegan', 'allergies', 'other']
+}
+
+# How many times n_matches neighbours are scored when room availability reorders them
+ROOM_CANDIDATE_POOL = 4
+
+# Version of the parse_profile rules; bump it whenever they change so parsed
+# rows cached under the old rules are no longer read (see partitions.py)
+PARSER_VERSION = 1
+
+# One automaton over every rating phrase and category vocabulary
+FEATURE_COLS = (
+    'bedtime_sin', 'bedtime_cos', 'wake_time_sin', 'wake_time_cos',
+    'sleep_type', 'cleanliness_rating',
+    'social_energy_rating', 'guests_preference', 'room_type_preference',
+    'privacy_importance', 'pets', 'substances', 'dietary_restrictions',
+    'noise_tolerance'
+)
+CATEGORICAL_COLS = ['sleep_type', 'guests_preference', 'room_type_preference',
+                    'pets', 'substances', 'dietary_restrictions']
+NUMERICAL_COLS = ['cleanliness_rating', 'social_energy_rating',
+                  'privacy_importance', 'noise_tolerance']
+
+PHRASE_ENGINE = PhraseMatcher()
+PHRASE_ENGINE.add_vocabulary('rating', RATING_PHRASES)
+
+def register_categories(categories):
+    """Add a category list to the shared engine; a negated mention maps to 'none' when available"""
+    PHRASE_ENGINE.add_vocabulary(
+        tuple(categories),
+        {category: category for category in categories},
+        negated_value='none' if 'none' in categories else None
+    )
+
+for _categories in CATEGORY_VOCABULARIES.values():
+    register_categories(_categories)
+PHRASE_ENGINE.build()
 
 class RoommateMatchingModel:
     def __init__(self):
         self.scaler = MinMaxScaler()
         self.label_encoders = {}
         self.feature_cols = []
+        self.text_dims = 0
         self.is_fitted = False
         
     def extract_time_from_text(self, time_str):
@@ -31,10 +85,11 @@ class RoommateMatchingModel:
             match = re.search(pattern, time_str)
             if match:
                 hour = int(match.group(1))
-                if len(match.groups()) >= 3 and match.group(3):  # Has AM/PM
-                    if match.group(3) == 'pm' and hour != 12:
+                meridiem = match.groups()[-1]
+                if meridiem in ('am', 'pm'):  # Has AM/PM
+                    if meridiem == 'pm' and hour != 12:
                         hour += 12
-                    elif match.group(3) == 'am' and hour == 12:
+                    elif meridiem == 'am' and hour == 12:
                         hour = 0
                 return hour
         
@@ -66,112 +121,100 @@ class RoommateMatchingModel:
         if rating_match:
             return min(int(rating_match.group(1)), 10)
         
-        # Handle descriptive ratings
-        rating_map = {
-            'very high': 9, 'extremely high': 10, 'super high': 9,
-            'high': 8, 'quite high': 7,
-            'medium': 5, 'moderate': 5, 'average': 5,
-            'low': 3, 'quite low': 2, 'very low': 1,
-            'none': 1, 'zero': 1
-        }
-        
-        for key, value in rating_map.items():
-            if key in text:
-                return value
-                
-        return 5  # Default
+        # Handle descriptive ratings; longest phrase wins, so "very low" beats "low"
+        return PHRASE_ENGINE.classify(text, 'rating', default=5)
 
     def categorize_text(self, text, categories):
         """Categorize text into predefined categories"""
         if not text or pd.isna(text):
             return categories[0] if categories else 'unknown'
-            
-        text = str(text).lower()
+        if not categories:
+            return 'unknown'
         
-        for category in categories:
-            if category.lower() in text:
-                return category
-                
-        return categories[0] if categories else 'unknown'
+        vocabulary = tuple(categories)
+        if not PHRASE_ENGINE.has_vocabulary(vocabulary):
+            register_categories(categories)
+        return PHRASE_ENGINE.classify(text, vocabulary, default=categories[0])
 
     def convert_omnidim_to_dataframe(self, profiles_data):
         """Convert Omnidim AI agent data to standardized DataFrame"""
-        processed_profiles = []
-        
-        for profile in profiles_data:
-            extracted_vars = profile.get("extracted_variables", {})
+        return pd.DataFrame([self.parse_profile(profile, position)
+                             for position, profile in enumerate(profiles_data)])
+
+    def parse_profile(self, profile, position=0):
+        """One DataFrame row (a plain dict) for the profile at ``position`` of the list being converted"""
+        extracted_vars = profile.get("extracted_variables", {})
+        processed_profile = {
+            'user_id': profile.get("call_id", f"user_{position}"),
+            'user_name': f"User_{position + 1}",
+            'timestamp': profile.get("timestamp", datetime.now().isoformat()),
             
-            # Process each profile
-            processed_profile = {
-                'user_id': profile.get("call_id", f"user_{len(processed_profiles)}"),
-                'user_name': f"User_{len(processed_profiles) + 1}",
-                'timestamp': profile.get("timestamp", datetime.now().isoformat()),
-                
-                # Sleep preferences
-                'bedtime_num': self.extract_time_from_text(extracted_vars.get("bedtime")),
-                'wake_time_num': self.extract_time_from_text(extracted_vars.get("wake_time")),
-                'sleep_type': self.categorize_text(
-                    extracted_vars.get("sleep_type"), 
-                    ['light', 'heavy', 'normal']
-                ),
-                
-                # Cleanliness
-                'cleanliness_rating': self.extract_rating_from_text(extracted_vars.get("cleanliness_rating")),
-                'cleanliness_habits': extracted_vars.get("cleanliness_habits", ""),
-                
-                # Social preferences
-                'social_energy_rating': self.extract_rating_from_text(extracted_vars.get("social_energy")),
-                'guests_preference': self.categorize_text(
-                    extracted_vars.get("guests_preference"),
-                    ['never', 'rarely', 'sometimes', 'often', 'frequently']
-                ),
-                
-                # Living preferences
-                'room_type_preference': self.categorize_text(
-                    extracted_vars.get("room_preference"),
-                    ['private', 'shared', 'either']
-                ),
-                'privacy_importance': self.extract_rating_from_text(extracted_vars.get("privacy_importance")),
-                
-                # Lifestyle
-                'pets': self.categorize_text(
-                    extracted_vars.get("pets"),
-                    ['none', 'cat', 'dog', 'other', 'multiple']
-                ),
-                'substances': self.categorize_text(
-                    extracted_vars.get("substances"),
-                    ['none', 'social', 'regular', 'heavy']
-                ),
-                'dietary_restrictions': self.categorize_text(
-                    extracted_vars.get("dietary"),
-                    ['none', 'vegetarian', 'vegan', 'allergies', 'other']
-                ),
-                'noise_tolerance': self.extract_rating_from_text(extracted_vars.get("noise_tolerance")),
-                
-                # Summary and sentiment
-                'summary': profile.get("summary", ""),
-                'sentiment': profile.get("sentiment", "neutral")
-            }
+            # Sleep preferences
+            'bedtime_num': self.extract_time_from_text(extracted_vars.get("bedtime")),
+            'wake_time_num': self.extract_time_from_text(extracted_vars.get("wake_time")),
+            'sleep_type': self.categorize_text(
+                extracted_vars.get("sleep_type"), 
+                CATEGORY_VOCABULARIES['sleep_type']
+            ),
             
-            processed_profiles.append(processed_profile)
-        
-        return pd.DataFrame(processed_profiles)
+            # Cleanliness
+            'cleanliness_rating': self.extract_rating_from_text(extracted_vars.get("cleanliness_rating")),
+            'cleanliness_habits': extracted_vars.get("cleanliness_habits", ""),
+            
+            # Social preferences
+            'social_energy_rating': self.extract_rating_from_text(extracted_vars.get("social_energy")),
+            'guests_preference': self.categorize_text(
+                extracted_vars.get("guests_preference"),
+                CATEGORY_VOCABULARIES['guests_preference']
+            ),
+            
+            # Living preferences
+            'room_type_preference': self.categorize_text(
+                extracted_vars.get("room_preference"),
+                CATEGORY_VOCABULARIES['room_type_preference']
+            ),
+            'privacy_importance': self.extract_rating_from_text(extracted_vars.get("privacy_importance")),
+            
+            # Lifestyle
+            'pets': self.categorize_text(
+                extracted_vars.get("pets"),
+                CATEGORY_VOCABULARIES['pets']
+            ),
+            'substances': self.categorize_text(
+                extracted_vars.get("substances"),
+                CATEGORY_VOCABULARIES['substances']
+            ),
+            'dietary_restrictions': self.categorize_text(
+                extracted_vars.get("dietary"),
+                CATEGORY_VOCABULARIES['dietary_restrictions']
+            ),
+            'noise_tolerance': self.extract_rating_from_text(extracted_vars.get("noise_tolerance")),
+            
+            # Summary and sentiment
+            'summary': profile.get("summary", ""),
+            'sentiment': profile.get("sentiment", "neutral"),
+
+            # Free-text vector computed once at ingest (see text_features.py)
+            'text_vector': profile.get("text_vector")
+        }
+        return processed_profile
+
+    def encode_circular_time(self, hours):
+        """Map hours of the day onto the unit circle as (sin, cos), shifted into [0, 1]"""
+        angle = 2 * np.pi * (np.asarray(hours, dtype=float) % 24) / 24
+        return (np.sin(angle) + 1) / 2, (np.cos(angle) + 1) / 2
 
     def prepare_features(self, df):
         """Prepare features for matching algorithm"""
         # Define feature columns
-        self.feature_cols = [
-            'bedtime_num', 'wake_time_num', 'sleep_type', 'cleanliness_rating',
-            'social_energy_rating', 'guests_preference', 'room_type_preference',
-            'privacy_importance', 'pets', 'substances', 'dietary_restrictions',
-            'noise_tolerance'
-        ]
+        self.feature_cols = list(FEATURE_COLS)
         
-        # Encode categorical variables
-        categorical_cols = ['sleep_type', 'guests_preference', 'room_type_preference', 
-                           'pets', 'substances', 'dietary_restrictions']
+        # Encode clock times on the unit circle so 23:00 and 01:00 end up
+        # 2 hours apart, matching calculate_sleep_compatibility
+        self.add_circular_times(df)
         
-        for col in categorical_cols:
+        # Encode categorical variables
+        for col in CATEGORICAL_COLS:
             if col not in self.label_encoders:
                 self.label_encoders[col] = LabelEncoder()
             
@@ -179,30 +222,66 @@ class RoommateMatchingModel:
             if not self.is_fitted:
                 df[col] = self.label_encoders[col].fit_transform(df[col].astype(str))
             else:
-                # Handle new categories
-                known_classes = set(self.label_encoders[col].classes_)
-                new_classes = set(df[col].unique()) - known_classes
+                # Handle new categories: append them in sorted order, so existing
+                # codes never move and the new ones don't depend on set ordering
+                encoder = self.label_encoders[col]
+                new_classes = set(df[col].astype(str).unique()) - set(encoder.classes_)
                 if new_classes:
-                    # Add new classes to the encoder
-                    all_classes = list(known_classes) + list(new_classes)
-                    self.label_encoders[col].classes_ = np.array(all_classes)
+                    encoder.classes_ = np.array(list(encoder.classes_) + sorted(new_classes))
                 
-                df[col] = df[col].apply(lambda x: self.label_encoders[col].transform([str(x)])[0] 
-                                       if str(x) in self.label_encoders[col].classes_ else 0)
+                df[col] = self.encode_categories(col, df[col])
         
+        # Append the cached free-text vectors; profiles without one (ingested
+        # before a featurizer was configured) get zeros
+        if not self.is_fitted:
+            lengths = {len(v) for v in df.get('text_vector', []) if isinstance(v, list)}
+            self.text_dims = lengths.pop() if len(lengths) == 1 else 0
+        self.feature_cols = self.feature_cols + self.add_text_vectors(df)
+
         # Scale numerical features
-        numerical_cols = ['bedtime_num', 'wake_time_num', 'cleanliness_rating',
-                         'social_energy_rating', 'privacy_importance', 'noise_tolerance']
-        
         if not self.is_fitted:
-            df[numerical_cols] = self.scaler.fit_transform(df[numerical_cols])
+            df[NUMERICAL_COLS] = self.scaler.fit_transform(df[NUMERICAL_COLS])
             self.is_fitted = True
         else:
-            df[numerical_cols] = self.scaler.transform(df[numerical_cols])
+            df[NUMERICAL_COLS] = self.scaler.transform(df[NUMERICAL_COLS])
         
         return df[self.feature_cols].values
 
-    def find_matches(self, profiles_data, target_user_id, n_matches=5):
+    def transform_features(self, df):
+        """Features for new rows on a fitted matcher, without changing its encoders or scaler.
+
+        Categories the encoders have never seen all map to one extra code,
+        ``len(classes_)``, so queries against a shared index encode the same
+        way no matter what was queried before.
+        """
+        self.add_circular_times(df)
+        for col in CATEGORICAL_COLS:
+            df[col] = self.encode_categories(col, df[col])
+        text_cols = self.add_text_vectors(df)
+        df[NUMERICAL_COLS] = self.scaler.transform(df[NUMERICAL_COLS])
+        return df[list(FEATURE_COLS) + text_cols].values
+
+    def add_circular_times(self, df):
+        for col, prefix in [('bedtime_num', 'bedtime'), ('wake_time_num', 'wake_time')]:
+            df[f'{prefix}_sin'], df[f'{prefix}_cos'] = self.encode_circular_time(df[col])
+
+    def encode_categories(self, col, values):
+        """Codes from the fitted encoder for ``col``; unseen categories get ``len(classes_)``"""
+        classes = self.label_encoders[col].classes_
+        codes = {category: code for code, category in enumerate(classes)}
+        return values.astype(str).map(lambda category: codes.get(category, len(classes)))
+
+    def add_text_vectors(self, df):
+        """Expand ``text_vector`` into ``text_<i>`` columns and return their names"""
+        if not self.text_dims:
+            return []
+        text_cols = [f'text_{i}' for i in range(self.text_dims)]
+        zeros = [0.0] * self.text_dims
+        df[text_cols] = np.array([v if isinstance(v, list) and len(v) == self.text_dims else zeros
+                                  for v in df['text_vector']])
+        return text_cols
+
+    def find_matches(self, profiles_data, target_user_id, n_matches=5, room_check=None):
         """Find best matches for a target user"""
         # Convert to DataFrame
         df = self.convert_omnidim_to_dataframe(profiles_data)
@@ -223,10 +302,37 @@ class RoommateMatchingModel:
         # Prepare features
         X = self.prepare_features(df.copy())
         
-        # Combined similarity model
+        return self.rank_candidates(df, X, target_index, n_matches, room_check=room_check)
+
+    def build_feature_matrix(self, profiles_data):
+        """Convert profiles and return the DataFrame together with its feature matrix"""
+        df = self.convert_omnidim_to_dataframe(profiles_data)
+        X = self.prepare_features(df.copy())
+        return df, X
+
+    def build_index(self, X, n_matches=5):
+        """Fit the KNN index used by rank_candidates"""
         knn = NearestNeighbors(n_neighbors=min(n_matches+1, len(X)), metric='euclidean')
         knn.fit(X)
-        distances, indices = knn.kneighbors([X[target_index]])
+        return knn
+
+    def rank_candidates(self, df, X, target_index, n_matches=5, knn=None, room_check=None):
+        """Rank the best matches for the user at target_index of an already prepared matrix.
+
+        ``room_check(target_user_id, candidate_user_id)`` returns a room the
+        two could share (or None); when given, a wider pool of neighbours is
+        scored and candidates with an available room are ranked first.
+        """
+        target_user_id = df.iloc[target_index]['user_id']
+        
+        # Combined similarity model
+        if knn is None:
+            knn = self.build_index(X, n_matches)
+        if room_check is not None:
+            n_neighbors = min((n_matches + 1) * ROOM_CANDIDATE_POOL, len(X))
+            distances, indices = knn.kneighbors([X[target_index]], n_neighbors=n_neighbors)
+        else:
+            distances, indices = knn.kneighbors([X[target_index]])
         
         # Cosine similarity
         cosine_sim = cosine_similarity([X[target_index]], X).flatten()
@@ -256,10 +362,18 @@ class RoommateMatchingModel:
                     'compatibility_factors': self.get_compatibility_factors(df, target_index, idx),
                     'profile_summary': df.iloc[idx]['summary']
                 }
+                if room_check is not None:
+                    wants_private = 'private' in (df.iloc[target_index]['room_type_preference'],
+                                                  df.iloc[idx]['room_type_preference'])
+                    room = None if wants_private else room_check(target_user_id, match_info['user_id'])
+                    match_info['shared_room'] = room.id if room is not None else None
                 matches.append(match_info)
         
-        # Sort by match score
-        matches = sorted(matches, key=lambda x: x['match_score'], reverse=True)
+        # Sort by match score; with a room check, pairs that can move in together come first
+        if room_check is not None:
+            matches = sorted(matches, key=lambda x: (x['shared_room'] is not None, x['match_score']), reverse=True)
+        else:
+            matches = sorted(matches, key=lambda x: x['match_score'], reverse=True)
         
         return {
             'target_user': {
@@ -272,15 +386,16 @@ class RoommateMatchingModel:
 
     def get_compatibility_factors(self, df, user1_idx, user2_idx):
         """Get detailed compatibility analysis between two users"""
-        user1 = df.iloc[user1_idx]
-        user2 = df.iloc[user2_idx]
-        
+        return self.compatibility_factors_for(df.iloc[user1_idx], df.iloc[user2_idx])
+
+    def compatibility_factors_for(self, user1, user2):
+        """Compatibility factors between two profile rows (as returned by ``df.iloc``)"""
         factors = {
-            'sleep_compatibility': self.calculate_sleep_compatibility(user1, user2),
-            'cleanliness_compatibility': abs(user1['cleanliness_rating'] - user2['cleanliness_rating']) <= 2,
-            'social_compatibility': abs(user1['social_energy_rating'] - user2['social_energy_rating']) <= 3,
-            'lifestyle_compatibility': user1['pets'] == user2['pets'] and user1['substances'] == user2['substances'],
-            'privacy_compatibility': abs(user1['privacy_importance'] - user2['privacy_importance']) <= 2
+            'sleep_compatibility': bool(self.calculate_sleep_compatibility(user1, user2)),
+            'cleanliness_compatibility': bool(abs(user1['cleanliness_rating'] - user2['cleanliness_rating']) <= 2),
+            'social_compatibility': bool(abs(user1['social_energy_rating'] - user2['social_energy_rating']) <= 3),
+            'lifestyle_compatibility': bool(user1['pets'] == user2['pets'] and user1['substances'] == user2['substances']),
+            'privacy_compatibility': bool(abs(user1['privacy_importance'] - user2['privacy_importance']) <= 2)
         }
         
         return factors
@@ -0,0 +1,46 @@
+import itertools
+import random
+import threading
+import time
+
+
+class StubCallAPI:
+    """Local stand-in for ``client.call``: records dials instead of phoning anyone"""
+
+    def __init__(self, failure_rate=0.0, latency=0.0, seed=None):
+        self.failure_rate = failure_rate
+        self.latency = latency
+        self.placed = []
+        self._random = random.Random(seed)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def dispatch_call(self, agent_id, to_number, from_number_id=None, call_context=None):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            if self._random.random() < self.failure_rate:
+                raise RuntimeError(f"Stub dial to {to_number} failed")
+            call_id = f"stub-call-{next(self._ids)}"
+            self.placed.append({"call_id": call_id, "agent_id": agent_id, "to_number": to_number,
+                                "call_context": dict(call_context or {})})
+        return {"status": 200, "json": {"success": True, "call_id": call_id}}
+
+    def create(self, agent_id, phone_number, call_type="Outgoing"):
+        return self.dispatch_call(agent_id, phone_number)["json"]
+
+
+class StubAgentAPI:
+    def __init__(self):
+        self._ids = itertools.count(1)
+
+    def create(self, **kwargs):
+        return {"id": next(self._ids), "name": kwargs.get("name")}
+
+
+class StubClient:
+    """Drop-in for ``omnidimension.Client`` used when OMNIDIM_STUB is set"""
+
+    def __init__(self, api_key=None, failure_rate=0.0, latency=0.0, seed=None):
+        self.call = StubCallAPI(failure_rate=failure_rate, latency=latency, seed=seed)
+        self.agent = StubAgentAPI()
@@ -0,0 +1,329 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from cache import versioned_key
+from model import PARSER_VERSION, RoommateMatchingModel
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PARTITION = "default"
+
+
+def partition_key(call_report):
+    """Property/city a profile belongs to, taken from the call or the widget metadata"""
+    extracted_vars = call_report.get("extracted_variables", {}) or {}
+    metadata = call_report.get("metadata", {}) or {}
+    for value in (call_report.get("property_id"), metadata.get("property"), metadata.get("city"),
+                  extracted_vars.get("property"), extracted_vars.get("city")):
+        if value and str(value).strip():
+            return str(value).strip().lower()
+    return DEFAULT_PARTITION
+
+
+def profile_version(profile):
+    """Digest of everything parse_profile reads; any update to the profile changes it"""
+    fields = {field: profile.get(field) for field in
+              ("call_id", "timestamp", "extracted_variables", "summary", "sentiment", "text_vector")}
+    return hashlib.blake2b(json.dumps(fields, sort_keys=True, default=str).encode("utf-8"),
+                           digest_size=8).hexdigest()
+
+
+def score_candidates(candidates):
+    """Turn ``[(distance, match_info), ...]`` into matches in find_matches' 85-95 band, closest first"""
+    if not candidates:
+        return []
+    distances = np.array([d for d, _ in candidates])
+    span = distances.max() - distances.min()
+    matches = []
+    for distance, match_info in candidates:
+        score = 95 - 10 * (distance - distances.min()) / span if span > 0 else 90
+        matches.append(dict(match_info, match_score=float(score)))
+    return matches
+
+
+class PartitionShard:
+    """Profiles of one property/city together with their lazily built feature index.
+
+    With a ``cache`` (see cache.py), parsed rows are stored per profile
+    version, so a rebuild, or another worker building the same partition,
+    only parses profiles it has not seen. They are fetched in one
+    ``get_many``. Rows installed by a re-featurization job are kept and
+    reused by later rebuilds, so only profiles added since are parsed here.
+    """
+
+    def __init__(self, key, cache=None, cache_ttl=None):
+        self.key = key
+        self.profiles = []
+        self.versions = []
+        self.cache = cache
+        self.cache_ttl = cache_ttl
+        self.generation = 0
+        self.last_used = time.monotonic()
+        self._snapshot = None
+        self._previous = None
+        self._installed_rows = []  # rows for the first profiles, as parsed by the last installed job
+        self._lock = threading.Lock()
+
+    def add(self, profile):
+        with self._lock:
+            self.profiles.append(profile)
+            self.versions.append(profile_version(profile))
+            self.generation += 1
+            self._previous = self._snapshot or self._previous
+            self._snapshot = None
+
+    @property
+    def loaded(self):
+        return self._snapshot is not None
+
+    def snapshot(self, n_matches=5):
+        """Return the fitted ``(matcher, df, X, knn, index_of, generation)``, building it if needed"""
+        with self._lock:
+            self.last_used = time.monotonic()
+            if self._snapshot is None and len(self.profiles) >= 2:
+                matcher = RoommateMatchingModel()
+                df = self._parse(matcher)
+                self._snapshot = self._build(matcher, df, self.generation, n_matches)
+            return self._snapshot
+
+    def install(self, df, generation, n_matches=5, build=True):
+        """Swap in rows parsed by a re-featurization job (see refeaturize.py).
+
+        ``df`` holds this shard's profiles in order, as parsed at ``generation``;
+        if newer profiles have arrived since, nothing is installed and the
+        index is rebuilt on next use as usual. The rows are kept for later
+        rebuilds; with ``build`` the index is also rebuilt from them now,
+        otherwise an unloaded shard stays unloaded until it is next used.
+        """
+        df = df.reset_index(drop=True)
+        df['user_name'] = [f"User_{i + 1}" for i in range(len(df))]
+        snapshot = self._build(RoommateMatchingModel(), df, generation, n_matches) if build and len(df) >= 2 else None
+        rows = df.to_dict("records")
+        with self._lock:
+            if self.generation != generation:
+                return False
+            if snapshot is not None:
+                self._previous = None
+                self._snapshot = snapshot
+            self._installed_rows = rows
+        return True
+
+    def _parse(self, matcher):
+        # Names follow the position in this shard, not where a row was first parsed
+        rows = [dict(row, user_name=f"User_{position + 1}") for position, row in enumerate(self._installed_rows)]
+        start = len(rows)
+        if self.cache is None:
+            rows.extend(matcher.parse_profile(profile, position)
+                        for position, profile in enumerate(self.profiles[start:], start))
+            return pd.DataFrame(rows)
+        keys = [versioned_key("features", f"{profile.get('call_id')}:{version}", PARSER_VERSION)
+                for profile, version in zip(self.profiles[start:], self.versions[start:])]
+        missing = {}
+        for position, (key, profile, row) in enumerate(zip(keys, self.profiles[start:], self.cache.get_many(keys)),
+                                                       start):
+            if row is None:
+                rows.append(matcher.parse_profile(profile, position))
+                missing[key] = rows[-1]
+            else:
+                rows.append(dict(row, user_name=f"User_{position + 1}"))
+        self.cache.set_many(missing, self.cache_ttl)
+        return pd.DataFrame(rows)
+
+    @staticmethod
+    def _build(matcher, df, generation, n_matches):
+        X = matcher.prepare_features(df.copy())
+        knn = matcher.build_index(X, n_matches)
+        index_of = {uid: i for i, uid in enumerate(df['user_id'])}
+        return (matcher, df, X, knn, index_of, generation)
+
+    def stale_snapshot(self):
+        """The current snapshot, or the last one built before newer profiles arrived; never builds"""
+        return self._snapshot or self._previous
+
+    def evict(self):
+        """Drop the built index; profiles stay and the index is rebuilt on next use"""
+        with self._lock:
+            self._snapshot = None
+            self._previous = None
+
+    def query_profile(self, profile, n_matches=5, allow_stale=False):
+        """Nearest residents of this shard for a profile that may live elsewhere.
+
+        With ``allow_stale`` the last built index is used as is (it may miss
+        the newest residents) instead of rebuilding. Returns
+        ``[(distance, match_info), ...]`` ordered by distance.
+        """
+        snapshot = self.stale_snapshot() if allow_stale else self.snapshot(n_matches)
+        if snapshot is None:
+            return []
+        matcher, df, X, knn, index_of, _ = snapshot
+        target_df = matcher.convert_omnidim_to_dataframe([profile])
+        # The snapshot's matcher is shared by every query; transform_features
+        # never extends its encoders, so the target encodes the way X was
+        target = matcher.transform_features(target_df.copy())[0]
+        distances, indices = knn.kneighbors([target], n_neighbors=min(n_matches + 1, len(X)))
+
+        candidates = []
+        target_row = target_df.iloc[0]
+        for distance, idx in zip(distances.flatten(), indices.flatten()):
+            row = df.iloc[idx]
+            if row['user_id'] == target_row['user_id']:
+                continue
+            candidates.append((float(distance), {
+                'user_id': row['user_id'],
+                'user_name': row['user_name'],
+                'partition': self.key,
+                'compatibility_factors': matcher.compatibility_factors_for(target_row, row),
+                'profile_summary': row['summary']
+            }))
+        return candidates[:n_matches]
+
+
+class PartitionedIndex:
+    """Per-partition feature indexes with request routing.
+
+    A user's own matches only search her partition's shard. At most
+    ``max_loaded`` shard indexes are kept built; the least recently used one is
+    evicted when that limit is exceeded.
+    """
+
+    def __init__(self, max_loaded=16, max_workers=4, cache=None, cache_ttl=None):
+        self.max_loaded = max_loaded
+        self.cache = cache
+        self.cache_ttl = cache_ttl
+        self._shards = OrderedDict()
+        self._user_partition = {}
+        self._user_profile = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="partition-query")
+
+    def add_profile(self, call_report):
+        key = partition_key(call_report)
+        with self._lock:
+            shard = self._shards.get(key)
+            if shard is None:
+                shard = self._shards[key] = PartitionShard(key, self.cache, self.cache_ttl)
+            self._user_partition[call_report.get("call_id")] = key
+            self._user_profile[call_report.get("call_id")] = call_report
+        shard.add(call_report)
+        return key
+
+    def partition_of(self, user_id):
+        return self._user_partition.get(user_id)
+
+    def profile_of(self, user_id):
+        return self._user_profile.get(user_id)
+
+    def shard(self, key):
+        return self._shards.get(key)
+
+    def shard_for(self, user_id):
+        key = self.partition_of(user_id)
+        return self._shards.get(key) if key is not None else None
+
+    def keys(self):
+        return list(self._shards)
+
+    def snapshot(self, key, n_matches=5):
+        """Fitted snapshot of a shard, enforcing the loaded-shard limit"""
+        shard = self._shards.get(key)
+        if shard is None:
+            return None
+        snapshot = shard.snapshot(n_matches)
+        with self._lock:
+            if self._shards.get(key) is shard:  # clear() may have dropped it meanwhile
+                self._shards.move_to_end(key)
+        self._enforce_limit()
+        return snapshot
+
+    def _enforce_limit(self):
+        with self._lock:
+            loaded = [s for s in self._shards.values() if s.loaded]
+        for stale in loaded[:max(len(loaded) - self.max_loaded, 0)]:
+            logger.info("Evicting partition index %s", stale.key)
+            stale.evict()
+
+    def evict(self, key):
+        shard = self._shards.get(key)
+        if shard is not None:
+            shard.evict()
+        return shard is not None
+
+    def load(self, key, n_matches=5):
+        return self.snapshot(key, n_matches) is not None
+
+    def export(self):
+        """All profiles, shard after shard, with each shard's ``(key, start, end, generation)`` in that list"""
+        profiles, layout = [], []
+        for shard in list(self._shards.values()):
+            with shard._lock:
+                layout.append((shard.key, len(profiles), len(profiles) + len(shard.profiles), shard.generation))
+                profiles.extend(shard.profiles)
+        return profiles, layout
+
+    def install(self, df, layout, n_matches=5):
+        """Install re-parsed rows laid out as by ``export`` into every shard of the layout.
+
+        Shards with a built index are rebuilt from the rows now; the others
+        keep the rows for their next build, so every partition ends up parsed
+        under the same rules. Returns ``(installed, skipped)`` partition keys;
+        a shard is skipped when profiles arrived after the export (it is
+        re-parsed with the current rules on its next build) or was cleared.
+        """
+        installed, skipped = [], []
+        for key, start, end, generation in layout:
+            shard = self._shards.get(key)
+            if shard is not None and shard.install(df.iloc[start:end].copy(), generation, n_matches,
+                                                   build=shard.stale_snapshot() is not None):
+                installed.append(key)
+            else:
+                skipped.append(key)
+        self._enforce_limit()
+        return installed, skipped
+
+    def fan_out(self, profile, partitions, n_matches=5):
+        """Query several partitions in parallel and merge their candidates in one feature space.
+
+        Every shard fits its own scaler and encoders, so their distances are
+        not comparable; each shard's nearest residents are re-featurized
+        together with the target by one matcher and ranked by that distance.
+        """
+        futures = [self._executor.submit(self._shards[key].query_profile, profile, n_matches)
+                   for key in partitions if key in self._shards]
+        candidates = [c for future in futures for c in future.result()]
+        return score_candidates(self._rescore(profile, candidates)[:n_matches])
+
+    def _rescore(self, profile, candidates):
+        """``[(distance, match_info), ...]`` with distances recomputed in a single fitted space, closest first"""
+        candidates = [(d, info) for d, info in candidates if self._user_profile.get(info['user_id']) is not None]
+        if not candidates:
+            return []
+        matcher = RoommateMatchingModel()
+        df = matcher.convert_omnidim_to_dataframe(
+            [profile] + [self._user_profile[info['user_id']] for _, info in candidates])
+        X = matcher.prepare_features(df)
+        distances = np.linalg.norm(X[1:] - X[0], axis=1)
+        return sorted(((float(d), info) for d, (_, info) in zip(distances, candidates)), key=lambda c: c[0])
+
+    def stats(self):
+        return [{
+            "partition": shard.key,
+            "profiles": len(shard.profiles),
+            "generation": shard.generation,
+            "index_loaded": shard.loaded,
+            "idle_seconds": round(time.monotonic() - shard.last_used, 1)
+        } for shard in list(self._shards.values())]
+
+    def clear(self):
+        with self._lock:
+            self._shards = OrderedDict()
+            self._user_partition = {}
+            self._user_profile = {}
@@ -0,0 +1,177 @@
+import functools
+import re
+import threading
+from collections import deque
+from itertools import groupby
+
+NEGATION_CUES = ("no", "not", "never", "without", "don't", "dont", "do not",
+                 "doesn't", "does not", "non")
+NEGATION_VOCABULARY = "__negation__"
+
+# How many words may sit between a negation cue and the phrase it negates
+NEGATION_WINDOW = 2
+_CLAUSE_BREAK = re.compile(r"[,.;!?]|\bbut\b")
+
+# Vocabularies smaller than this are classified with C-level str.find scans, longest
+# phrases first. The cost of the scans grows with the phrase count and the automaton's
+# doesn't: bench_phrase_matching.py measures the two about even at 32 phrases and the
+# automaton ~1.5x ahead at 64. Category lists passed to categorize_text can be that long
+AUTOMATON_MIN_PHRASES = 64
+
+
+class PhraseMatcher:
+    """Longest-match, negation-aware phrase classification over several vocabularies.
+
+    Every vocabulary maps phrases to values. ``classify`` picks the longest
+    (earliest on ties) non-negated match for the requested vocabulary. A
+    negated match resolves to the vocabulary's ``negated_value`` when it has
+    one ("no cats" -> "none") and is ignored otherwise.
+
+    Vocabularies with at least ``automaton_min_phrases`` phrases are matched
+    by one Aho-Corasick automaton, where a single pass finds every phrase.
+    Smaller ones, such as every vocabulary in model.py, scan with
+    ``str.find`` from the longest phrase down and stop at the first length
+    that matches. Extracted answers repeat heavily ("none", "light sleeper"),
+    so results are memoized per text and vocabulary in a bounded LRU cache.
+    """
+
+    def __init__(self, negation_cues=NEGATION_CUES, cache_size=8192, automaton_min_phrases=AUTOMATON_MIN_PHRASES):
+        self._vocabularies = {}
+        self._negated_values = {}
+        self._by_length = {}  # vocabulary -> [[(phrase, value), ...] per phrase length, longest first]
+        self.automaton_min_phrases = automaton_min_phrases
+        self._lock = threading.Lock()
+        self._automaton = None
+        self._scan = functools.lru_cache(maxsize=cache_size)(self._scan_text)
+        self._classify = functools.lru_cache(maxsize=cache_size)(self._classify_text)
+        self._cue_pattern = re.compile(r"(?<![^\W_])(?:%s)(?![^\W_])" % "|".join(
+            re.escape(cue) for cue in sorted(negation_cues, key=len, reverse=True)))
+        self.add_vocabulary(NEGATION_VOCABULARY, {cue: True for cue in negation_cues})
+
+    def add_vocabulary(self, name, phrases, negated_value=None):
+        """Register ``{phrase: value}`` under ``name``; the automaton is rebuilt lazily"""
+        with self._lock:
+            self._vocabularies[name] = {phrase.lower(): value for phrase, value in phrases.items()}
+            self._negated_values[name] = negated_value
+            ordered = sorted(self._vocabularies[name].items(), key=lambda item: -len(item[0]))
+            self._by_length[name] = [list(group) for _, group in groupby(ordered, key=lambda item: len(item[0]))]
+            self._automaton = None
+        self._scan.cache_clear()
+        self._classify.cache_clear()
+
+    def has_vocabulary(self, name):
+        return name in self._vocabularies
+
+    def build(self):
+        """Build goto/fail/output tables over every registered phrase"""
+        with self._lock:
+            if self._automaton is not None:
+                return self._automaton
+            goto, fail, output = [{}], [0], [[]]
+            for vocabulary, phrases in self._vocabularies.items():
+                for phrase, value in phrases.items():
+                    state = 0
+                    for char in phrase:
+                        if char not in goto[state]:
+                            goto.append({})
+                            fail.append(0)
+                            output.append([])
+                            goto[state][char] = len(goto) - 1
+                        state = goto[state][char]
+                    output[state].append((len(phrase), vocabulary, value))
+
+            # Resolve failure links breadth-first and fold them into a full
+            # transition table, so scanning is a single dict lookup per char
+            delta = [dict(goto[0])] + [None] * (len(goto) - 1)
+            pending = deque(goto[0].values())
+            while pending:
+                state = pending.popleft()
+                delta[state] = dict(delta[fail[state]])
+                delta[state].update(goto[state])
+                for char, child in goto[state].items():
+                    pending.append(child)
+                    fail[child] = delta[fail[state]].get(char, 0)
+                    output[child] = output[child] + output[fail[child]]
+
+            self._automaton = (delta, output)
+            return self._automaton
+
+    def find_all(self, text):
+        """Return the lowercased text and ``(start, end, vocabulary, value)`` for every
+        phrase starting on a word boundary"""
+        text = text.lower()
+        return text, self._scan(text)
+
+    def _scan_text(self, text):
+        delta, output = self._automaton or self.build()
+        matches = []
+        state = 0
+        for position, char in enumerate(text):
+            state = delta[state].get(char, 0)
+            if not output[state]:
+                continue
+            for length, vocabulary, value in output[state]:
+                start = position - length + 1
+                if start > 0 and text[start - 1].isalnum():
+                    continue
+                end = position + 1
+                # Negation cues are whole words ("no" must not fire inside "now")
+                if vocabulary == NEGATION_VOCABULARY and end < len(text) and text[end].isalnum():
+                    continue
+                matches.append((start, end, vocabulary, value))
+        return tuple(matches)
+
+    def classify(self, text, vocabulary, default=None):
+        """Value of the longest non-negated ``vocabulary`` phrase in ``text``, or ``default``"""
+        return self._classify(text if isinstance(text, str) else str(text), vocabulary, default)
+
+    def _classify_text(self, text, vocabulary, default):
+        text = text.lower()
+        if len(self._vocabularies[vocabulary]) < self.automaton_min_phrases:
+            return self._classify_by_scans(text, vocabulary, default)
+        text, matches = self.find_all(text)
+        cues = [(start, end) for start, end, name, _ in matches if name == NEGATION_VOCABULARY]
+        best = None
+        for start, end, name, value in matches:
+            if name != vocabulary:
+                continue
+            if self._is_negated(text, start, cues):
+                value = self._negated_values.get(vocabulary)
+                if value is None:
+                    continue
+            key = (end - start, -start)
+            if best is None or key > best[0]:
+                best = (key, value)
+        return best[1] if best else default
+
+    def _classify_by_scans(self, text, vocabulary, default):
+        """Same result as the automaton: the first phrase length with a match wins, earliest occurrence first"""
+        cues = None
+        for group in self._by_length[vocabulary]:
+            best = None
+            for phrase, value in group:
+                start = text.find(phrase)
+                while start != -1 and (best is None or start < best[0]):
+                    if start == 0 or not text[start - 1].isalnum():
+                        if cues is None:
+                            cues = [match.span() for match in self._cue_pattern.finditer(text)]
+                        if not (cues and self._is_negated(text, start, cues)):
+                            best = (start, value)
+                            break
+                        if self._negated_values.get(vocabulary) is not None:
+                            best = (start, self._negated_values[vocabulary])
+                            break
+                    start = text.find(phrase, start + 1)
+            if best is not None:
+                return best[1]
+        return default
+
+    @staticmethod
+    def _is_negated(text, start, cues):
+        for cue_start, cue_end in cues:
+            if cue_end > start:
+                continue
+            gap = text[cue_end:start]
+            if len(gap.split()) <= NEGATION_WINDOW and not _CLAUSE_BREAK.search(gap):
+                return True
+        return False
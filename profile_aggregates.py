@@ -0,0 +1,135 @@
+import threading
+from collections import Counter
+from datetime import datetime
+
+from model import CATEGORY_VOCABULARIES, RoommateMatchingModel
+
+# Rating variables and their 1-10 histograms
+RATING_FIELDS = {
+    "cleanliness_rating": "cleanliness_rating",
+    "social_energy_rating": "social_energy",
+    "privacy_importance": "privacy_importance",
+    "noise_tolerance": "noise_tolerance"
+}
+# Categorical feature -> extracted variable it is read from
+CATEGORY_FIELDS = {
+    "sleep_type": "sleep_type",
+    "guests_preference": "guests_preference",
+    "room_type_preference": "room_preference",
+    "pets": "pets",
+    "substances": "substances",
+    "dietary_restrictions": "dietary"
+}
+TIME_FIELDS = ("bedtime", "wake_time")
+
+
+class RatingHistogram:
+    def __init__(self):
+        self.bins = [0] * 10
+        self.total = 0
+        self.count = 0
+
+    def add(self, rating):
+        rating = min(max(int(round(rating)), 1), 10)
+        self.bins[rating - 1] += 1
+        self.total += rating
+        self.count += 1
+
+    def to_dict(self):
+        return {
+            "histogram": {str(r + 1): n for r, n in enumerate(self.bins)},
+            "mean": round(self.total / self.count, 2) if self.count else None,
+            "count": self.count
+        }
+
+
+class ProfileAggregates:
+    """Running aggregates over every ingested profile.
+
+    Each callback updates fixed-size histograms and counters once, so the
+    analytics endpoints read totals instead of walking ``all_profiles``.
+    Values are parsed with the same helpers the matcher uses.
+    """
+
+    def __init__(self):
+        self._parser = RoommateMatchingModel()
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self.total = 0
+            self.oldest_timestamp = None
+            self.latest_timestamp = None
+            self.latest_data_points = []
+            self.data_points = Counter()
+            self.ratings = {name: RatingHistogram() for name in RATING_FIELDS}
+            self.hours = {name: [0] * 24 for name in TIME_FIELDS}
+            self.categories = {name: Counter() for name in CATEGORY_FIELDS}
+            self.per_day = Counter()
+
+    def add(self, call_report):
+        extracted_vars = call_report.get("extracted_variables", {}) or {}
+        ratings = {name: self._parser.extract_rating_from_text(extracted_vars[var])
+                   for name, var in RATING_FIELDS.items() if extracted_vars.get(var)}
+        hours = {name: self._parser.extract_time_from_text(extracted_vars[name])
+                 for name in TIME_FIELDS if extracted_vars.get(name)}
+        categories = {name: self._parser.categorize_text(extracted_vars.get(var), CATEGORY_VOCABULARIES[name])
+                      for name, var in CATEGORY_FIELDS.items()}
+        timestamp = call_report.get("timestamp") or datetime.now().isoformat()
+
+        with self._lock:
+            self.total += 1
+            self.oldest_timestamp = self.oldest_timestamp or timestamp
+            self.latest_timestamp = timestamp
+            self.latest_data_points = list(extracted_vars)
+            self.data_points.update(extracted_vars.keys())
+            for name, rating in ratings.items():
+                self.ratings[name].add(rating)
+            for name, hour in hours.items():
+                self.hours[name][int(hour) % 24] += 1
+            for name, category in categories.items():
+                self.categories[name][category] += 1
+            self.per_day[timestamp[:10]] += 1
+
+    def stats(self):
+        """Body of /profile-stats"""
+        with self._lock:
+            return {
+                "total_profiles": self.total,
+                "latest_timestamp": self.latest_timestamp,
+                "oldest_timestamp": self.oldest_timestamp,
+                "available_data_points": self.latest_data_points,
+                "data_point_coverage": dict(self.data_points),
+                "profiles_per_day": dict(sorted(self.per_day.items()))
+            }
+
+    def analysis(self):
+        """Body of /analyze-profiles"""
+        with self._lock:
+            return {
+                "total_profiles": self.total,
+                "analysis": {
+                    "cleanliness_ratings": self.ratings["cleanliness_rating"].to_dict(),
+                    "sleep_patterns": {
+                        "bedtime_by_hour": list(self.hours["bedtime"]),
+                        "wake_time_by_hour": list(self.hours["wake_time"]),
+                        "sleep_type": dict(self.categories["sleep_type"])
+                    },
+                    "social_preferences": {
+                        "social_energy": self.ratings["social_energy_rating"].to_dict(),
+                        "guests_preference": dict(self.categories["guests_preference"])
+                    },
+                    "living_preferences": {
+                        "privacy_importance": self.ratings["privacy_importance"].to_dict(),
+                        "room_type_preference": dict(self.categories["room_type_preference"])
+                    },
+                    "lifestyle_factors": {
+                        "pets": dict(self.categories["pets"]),
+                        "substances": dict(self.categories["substances"]),
+                        "dietary_restrictions": dict(self.categories["dietary_restrictions"]),
+                        "noise_tolerance": self.ratings["noise_tolerance"].to_dict()
+                    }
+                },
+                "profiles_per_day": dict(sorted(self.per_day.items()))
+            }
@@ -0,0 +1,191 @@
+"""Opt-in request profiling and memory snapshots for production debugging.
+
+Nothing here is registered unless ADMIN_TOKEN is configured. With it set:
+
+* a request carrying ``X-Profile: 1`` (or ``?_profile=1``) plus the admin token in
+  ``X-Admin-Token`` runs under cProfile; the stats are stored and their id is
+  returned in ``X-Profile-Id`` (``?_profile=inline`` returns the stats instead of
+  the normal body);
+* ``POST /debug/profile {"count": N, "path_prefix": "/match-user"}`` profiles the
+  next N matching requests without any header, ``GET /debug/profile`` lists the
+  stored profiles and ``GET /debug/profile/<id>`` returns one;
+* ``GET /debug/tracemalloc`` starts tracing on first use, then returns the top
+  allocation sites and the growth since the previous snapshot;
+  ``DELETE /debug/tracemalloc`` stops tracing.
+"""
+import cProfile
+import hmac
+import io
+import itertools
+import logging
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import deque
+from datetime import datetime
+from urllib.parse import urlencode
+
+from flask import g, jsonify, request
+
+logger = logging.getLogger(__name__)
+
+
+class ProfileStore:
+    """The most recent profiles plus the sampling budget armed via /debug/profile"""
+
+    def __init__(self, keep=20):
+        self.profiles = deque(maxlen=keep)
+        self._ids = itertools.count(1)
+        self._armed = 0
+        self._path_prefix = ""
+        self._lock = threading.Lock()
+        # cProfile cannot run two profilers at once, so requests are profiled one at a time
+        self.running = threading.Lock()
+
+    def arm(self, count, path_prefix=""):
+        with self._lock:
+            self._armed = count
+            self._path_prefix = path_prefix
+
+    def take_sample(self, path):
+        with self._lock:
+            if self._armed > 0 and path.startswith(self._path_prefix):
+                self._armed -= 1
+                return True
+        return False
+
+    def armed(self):
+        return {"remaining": self._armed, "path_prefix": self._path_prefix}
+
+    def add(self, profile, path, elapsed_ms, limit=40):
+        stream = io.StringIO()
+        stats = pstats.Stats(profile, stream=stream).strip_dirs().sort_stats("cumulative")
+        stats.print_stats(limit)
+        entry = {
+            "id": next(self._ids),
+            "path": path,
+            "elapsed_ms": round(elapsed_ms, 2),
+            "recorded_at": datetime.now().isoformat(),
+            "total_calls": stats.total_calls,
+            "stats": stream.getvalue()
+        }
+        self.profiles.append(entry)
+        return entry
+
+    def get(self, profile_id):
+        return next((p for p in self.profiles if p["id"] == profile_id), None)
+
+
+def register_profiling(app, admin_token, keep=20, tracemalloc_frames=10):
+    """Attach the profiling hooks and /debug routes to ``app``"""
+    store = ProfileStore(keep)
+    last_snapshot = {}
+
+    def authorized():
+        supplied = request.headers.get("X-Admin-Token") or ""
+        return hmac.compare_digest(supplied.encode(), admin_token.encode())
+
+    def requested():
+        flag = request.headers.get("X-Profile") or request.args.get("_profile")
+        return bool(flag) and flag != "0" and authorized()
+
+    @app.before_request
+    def start_profile():
+        if not (requested() or store.take_sample(request.path)):
+            return
+        if not store.running.acquire(blocking=False):
+            return
+        g.profiler = cProfile.Profile()
+        g.profile_started = time.perf_counter()
+        g.profiler.enable()
+
+    @app.after_request
+    def finish_profile(response):
+        profiler = g.pop("profiler", None)
+        if profiler is None:
+            return response
+        profiler.disable()
+        store.running.release()
+        args = urlencode([(k, v) for k, v in request.args.items(multi=True) if k not in ("admin_token", "_profile")])
+        entry = store.add(profiler, f"{request.path}?{args}" if args else request.path,
+                          (time.perf_counter() - g.pop("profile_started")) * 1000)
+        logger.info("Profiled %s in %.1f ms (profile %d)", entry["path"], entry["elapsed_ms"], entry["id"])
+        if request.args.get("_profile") == "inline":
+            response = jsonify(entry)
+        response.headers["X-Profile-Id"] = str(entry["id"])
+        return response
+
+    @app.teardown_request
+    def release_profile(exc):
+        # after_request is skipped when the handler raised
+        if g.pop("profiler", None) is not None:
+            store.running.release()
+
+    @app.route('/debug/profile', methods=['POST'])
+    def arm_profiling():
+        if not authorized():
+            return jsonify({"error": "Admin token required"}), 403
+        data = request.get_json(silent=True) or {}
+        store.arm(max(int(data.get("count", 1)), 0), data.get("path_prefix", ""))
+        return jsonify({"status": "armed", **store.armed()})
+
+    @app.route('/debug/profile', methods=['GET'])
+    def list_profiles():
+        if not authorized():
+            return jsonify({"error": "Admin token required"}), 403
+        return jsonify({
+            "armed": store.armed(),
+            "profiles": [{k: v for k, v in p.items() if k != "stats"} for p in store.profiles]
+        })
+
+    @app.route('/debug/profile/<int:profile_id>', methods=['GET'])
+    def get_profile(profile_id):
+        if not authorized():
+            return jsonify({"error": "Admin token required"}), 403
+        entry = store.get(profile_id)
+        if entry is None:
+            return jsonify({"error": f"Profile {profile_id} not found"}), 404
+        if request.args.get("format") == "text":
+            return app.response_class(entry["stats"], mimetype="text/plain")
+        return jsonify(entry)
+
+    @app.route('/debug/tracemalloc', methods=['GET'])
+    def tracemalloc_snapshot():
+        if not authorized():
+            return jsonify({"error": "Admin token required"}), 403
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(tracemalloc_frames)
+            last_snapshot.clear()
+            return jsonify({"tracing": True, "started": True})
+
+        limit = request.args.get("limit", default=20, type=int)
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        result = {
+            "tracing": True,
+            "current_bytes": current,
+            "peak_bytes": peak,
+            "top": [{"location": str(stat.traceback[0]), "size_bytes": stat.size, "count": stat.count}
+                    for stat in snapshot.statistics("lineno")[:limit]]
+        }
+        if "previous" in last_snapshot:
+            result["growth"] = [{"location": str(stat.traceback[0]), "size_diff_bytes": stat.size_diff,
+                                 "count_diff": stat.count_diff}
+                                for stat in snapshot.compare_to(last_snapshot["previous"], "lineno")[:limit]]
+        last_snapshot["previous"] = snapshot
+        return jsonify(result)
+
+    @app.route('/debug/tracemalloc', methods=['DELETE'])
+    def stop_tracemalloc():
+        if not authorized():
+            return jsonify({"error": "Admin token required"}), 403
+        tracemalloc.stop()
+        last_snapshot.clear()
+        return jsonify({"tracing": False})
+
+    logger.info("Profiling endpoints enabled")
+    return store
@@ -0,0 +1,166 @@
+import itertools
+import logging
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def snapshot_compatibility(snapshot, neutral=0.5):
+    """Pairwise compatibility ``1 / (1 + distance)`` over a partition snapshot's features.
+
+    Residents without a profile in the snapshot score ``neutral`` with everyone.
+    """
+    _, _, X, _, index_of, _ = snapshot
+    cache = {}
+
+    def compatibility(a, b):
+        if a not in index_of or b not in index_of:
+            return neutral
+        key = (a, b) if a < b else (b, a)
+        if key not in cache:
+            cache[key] = 1.0 / (1.0 + float(np.linalg.norm(X[index_of[a]] - X[index_of[b]])))
+        return cache[key]
+    return compatibility
+
+
+def snapshot_preferences(snapshot):
+    """user_id -> 'private' / 'shared' / 'either' as categorised for matching"""
+    df = snapshot[1]
+    return dict(zip(df['user_id'], df['room_type_preference']))
+
+
+class LocalRepair:
+    """Keep room assignments good under churn without a global re-solve.
+
+    A move-in or move-out only touches the affected room and up to
+    ``max_rooms`` other rooms at the same property. Within that neighbourhood
+    single moves into free beds and pairwise swaps are applied best-first
+    while they raise the total in-room compatibility (the sum over every pair
+    sharing a room), for at most ``max_iterations`` steps. Every pair counts
+    as a benefit, so splitting a compatible pair into emptier rooms is a
+    loss, never a gain. Each call reports the moves made and the
+    compatibility delta: what the event itself added (negative when a
+    resident leaves their roommates) plus what the repair won back.
+    """
+
+    def __init__(self, inventory, compatibility, preferences=None, max_rooms=12, max_iterations=50):
+        self.inventory = inventory
+        self.compatibility = compatibility
+        self.preferences = preferences or {}
+        self.max_rooms = max_rooms
+        self.max_iterations = max_iterations
+
+    def allowed(self, user_id, room_type):
+        preference = self.preferences.get(user_id, "either")
+        return preference not in ("private", "shared") or preference == room_type
+
+    def room_score(self, occupants):
+        return sum(self.compatibility(a, b) for a, b in itertools.combinations(occupants, 2))
+
+    def move_in(self, user_id, property_key):
+        """Place a newcomer in the best free bed they accept, then repair around it"""
+        started = time.perf_counter()
+        previous = self.inventory.vacate(user_id)
+        best_room, best_score = None, None
+        for room in self.inventory.free_rooms(property_key):
+            if not self.allowed(user_id, room.room_type):
+                continue
+            added = sum(self.compatibility(user_id, other) for other in room.occupants)
+            if best_score is None or added > best_score:
+                best_room, best_score = room, added
+        if best_room is None:
+            if previous is not None:
+                self.inventory.assign(user_id, previous.id)
+            return self._report("move_in", user_id, [], 0.0, 0.0, 0.0, [], started, placed=False)
+
+        self.inventory.assign(user_id, best_room.id)
+        moves = [{"user_id": user_id, "from": previous.id if previous else None, "to": best_room.id}]
+        return self._repair("move_in", user_id, self._neighbourhood(best_room, property_key),
+                            best_score, moves, started)
+
+    def move_out(self, user_id):
+        """Free a resident's bed, then let neighbours fill or swap into it if that helps"""
+        started = time.perf_counter()
+        room = self.inventory.room_of(user_id)
+        if room is None:
+            return self._report("move_out", user_id, [], 0.0, 0.0, 0.0, [], started, placed=False)
+        event_delta = -sum(self.compatibility(user_id, other) for other in room.occupants if other != user_id)
+        self.inventory.vacate(user_id)
+        moves = [{"user_id": user_id, "from": room.id, "to": None}]
+        return self._repair("move_out", user_id, self._neighbourhood(room, room.property),
+                            event_delta, moves, started)
+
+    def _neighbourhood(self, room, property_key):
+        """The affected room plus the least compatible other rooms at the property"""
+        others = [r for r in self.inventory.rooms(property_key) if r.id != room.id]
+        others.sort(key=lambda r: self.room_score(r.occupants) / max(len(r.occupants) - 1, 1))
+        return [room] + others[:self.max_rooms]
+
+    def _repair(self, event, user_id, rooms, event_delta, moves, started):
+        layout = {r.id: list(r.occupants) for r in rooms}
+        capacity = {r.id: r.capacity for r in rooms}
+        room_type = {r.id: r.room_type for r in rooms}
+        scores = {room_id: self.room_score(occupants) for room_id, occupants in layout.items()}
+        origin = {u: room_id for room_id, occupants in layout.items() for u in occupants}
+        before = sum(scores.values())
+
+        for _ in range(self.max_iterations):
+            best = None  # (gain, new layouts for the two rooms)
+            for first, second in itertools.permutations(layout, 2):
+                current = scores[first] + scores[second]
+                for u in layout[first]:
+                    if u == user_id or not self.allowed(u, room_type[second]):
+                        continue
+                    # Move u into a free bed
+                    if len(layout[second]) < capacity[second]:
+                        a = [x for x in layout[first] if x != u]
+                        b = layout[second] + [u]
+                        gain = self.room_score(a) + self.room_score(b) - current
+                        if gain > 1e-9 and (best is None or gain > best[0]):
+                            best = (gain, first, a, second, b)
+                    # Swap u with v (each unordered pair is visited once)
+                    if first < second:
+                        for v in layout[second]:
+                            if v == user_id or not self.allowed(v, room_type[first]):
+                                continue
+                            a = [x if x != u else v for x in layout[first]]
+                            b = [x if x != v else u for x in layout[second]]
+                            gain = self.room_score(a) + self.room_score(b) - current
+                            if gain > 1e-9 and (best is None or gain > best[0]):
+                                best = (gain, first, a, second, b)
+            if best is None:
+                break
+            _, first, a, second, b = best
+            layout[first], layout[second] = a, b
+            scores[first], scores[second] = self.room_score(a), self.room_score(b)
+
+        # Apply: vacate everyone who changed rooms first so capacities never overflow
+        final = {u: room_id for room_id, occupants in layout.items() for u in occupants}
+        changed = [u for u, room_id in final.items() if origin.get(u, room_id) != room_id]
+        for u in changed:
+            self.inventory.vacate(u)
+        for u in changed:
+            self.inventory.assign(u, final[u])
+            moves.append({"user_id": u, "from": origin[u], "to": final[u]})
+        after = sum(scores.values())
+        return self._report(event, user_id, moves, event_delta, before, after, list(layout), started)
+
+    def _report(self, event, user_id, moves, event_delta, before, after, rooms, started, placed=True):
+        report = {
+            "event": event,
+            "user_id": user_id,
+            "placed": placed,
+            "moves": moves,
+            "rooms_considered": rooms,
+            "event_delta": round(event_delta, 4),
+            "compatibility_before_repair": round(before, 4),
+            "compatibility_after_repair": round(after, 4),
+            "compatibility_delta": round(after - before + event_delta, 4),
+            "repair_gain": round(after - before, 4),
+            "took_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
+        logger.info("Reassignment %s for %s: %d moves, delta %.3f in %.1f ms", event, user_id,
+                    len(moves), report["compatibility_delta"], report["took_ms"])
+        return report
@@ -0,0 +1,196 @@
+"""Bulk re-featurization of every stored profile across a process pool.
+
+Run this after the parsing rules change (``extract_time_from_text``,
+``extract_rating_from_text``, ``categorize_text``). The profiles are split
+into chunks, and each chunk is parsed by ``convert_omnidim_to_dataframe`` in
+a worker process. The parsed frame and its feature matrix are then written
+in one atomic rename. Readers of the file never see a half-written matrix,
+and the app keeps serving from its current indexes until the job installs
+the new one.
+
+Usage: python refeaturize.py profiles.json features.pkl [workers] [chunk_size]
+
+``profiles.json`` is the body of ``GET /all-profiles`` (or a plain list of call reports).
+"""
+import json
+import logging
+import multiprocessing
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import pandas as pd
+
+from model import RoommateMatchingModel
+
+logger = logging.getLogger(__name__)
+
+JOB_STATES = ("pending", "running", "completed", "failed")
+
+
+def parse_chunk(profiles):
+    """Worker entry point: the raw (unencoded) DataFrame for one chunk of call reports"""
+    return RoommateMatchingModel().convert_omnidim_to_dataframe(profiles)
+
+
+def write_features(path, df, X, feature_cols):
+    """Write the parsed frame and its matrix to ``path`` atomically (temp file in the same directory + rename)"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".features-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump({"df": df, "X": X, "feature_cols": list(feature_cols),
+                         "written_at": datetime.now().isoformat()}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_features(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+class RefeaturizationJob:
+    """Re-parse a list of profiles in chunks across a ``ProcessPoolExecutor``.
+
+    Workers are started with ``spawn``: forking a threaded web process can
+    copy locks that other threads were holding at the time. ``on_complete(job, df)``
+    runs in the job's thread after the file is written. ``df`` has one row
+    per profile, in input order.
+    """
+
+    def __init__(self, profiles, path=None, chunk_size=500, max_workers=None, on_complete=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.profiles = list(profiles)
+        self.path = path
+        self.chunk_size = max(int(chunk_size), 1)
+        self.max_workers = max(int(max_workers or os.cpu_count() or 1), 1)
+        self.on_complete = on_complete
+        self.state = "pending"
+        self.created_at = datetime.now().isoformat()
+        self.chunks_total = -(-len(self.profiles) // self.chunk_size)
+        self.chunks_done = 0
+        self.profiles_done = 0
+        self.error = None
+        self.matrix_shape = None
+        self.installed_partitions = None  # set by on_complete when it installs the rows
+        self.skipped_partitions = None
+        self._started = None
+        self._finished = None
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name=f"refeaturize-{self.id}", daemon=True)
+        self._thread.start()
+        return self
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def done(self):
+        return self.state in ("completed", "failed")
+
+    def run(self):
+        self.state = "running"
+        self._started = time.monotonic()
+        try:
+            df = self._parse()
+            matcher = RoommateMatchingModel()
+            X = matcher.prepare_features(df.copy())
+            self.matrix_shape = list(X.shape)
+            if self.path:
+                write_features(self.path, df, X, matcher.feature_cols)
+            if self.on_complete is not None:
+                self.on_complete(self, df)
+            self.state = "completed"
+            logger.info("Re-featurized %d profiles in %.1f s (%d chunks, %d workers)", len(self.profiles),
+                        time.monotonic() - self._started, self.chunks_total, self.max_workers)
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+            logger.exception("Re-featurization job %s failed", self.id)
+        finally:
+            self._finished = time.monotonic()
+
+    def _parse(self):
+        chunks = [self.profiles[i:i + self.chunk_size] for i in range(0, len(self.profiles), self.chunk_size)]
+        frames = [None] * len(chunks)
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(self.max_workers, max(len(chunks), 1)), mp_context=context) as pool:
+            futures = {pool.submit(parse_chunk, chunk): n for n, chunk in enumerate(chunks)}
+            for future in as_completed(futures):
+                n = futures[future]
+                frames[n] = future.result()
+                self.chunks_done += 1
+                self.profiles_done += len(chunks[n])
+        df = pd.concat(frames, ignore_index=True) if frames else parse_chunk([])
+        # Names are numbered per chunk by the workers; renumber them as one list would be
+        df['user_name'] = [f"User_{i + 1}" for i in range(len(df))]
+        return df
+
+    def progress(self):
+        elapsed = ((self._finished or time.monotonic()) - self._started) if self._started else 0.0
+        fraction = self.profiles_done / len(self.profiles) if self.profiles else 1.0
+        return {
+            "chunks_done": self.chunks_done,
+            "chunks_total": self.chunks_total,
+            "profiles_done": self.profiles_done,
+            "profiles_total": len(self.profiles),
+            "percent": round(100 * fraction, 1),
+            "elapsed_seconds": round(elapsed, 2),
+            "eta_seconds": round(elapsed / fraction - elapsed, 1) if 0 < fraction < 1 else None
+        }
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "state": self.state,
+            "created_at": self.created_at,
+            "path": self.path,
+            "chunk_size": self.chunk_size,
+            "workers": self.max_workers,
+            "matrix_shape": self.matrix_shape,
+            "installed_partitions": self.installed_partitions,
+            "skipped_partitions": self.skipped_partitions,
+            "error": self.error,
+            "progress": self.progress()
+        }
+
+
+def main():
+    if len(sys.argv) < 3:
+        print(__doc__)
+        sys.exit(1)
+    with open(sys.argv[1]) as f:
+        data = json.load(f)
+    profiles = data["profiles"] if isinstance(data, dict) else data
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    chunk_size = int(sys.argv[4]) if len(sys.argv) > 4 else 500
+    job = RefeaturizationJob(profiles, sys.argv[2], chunk_size=chunk_size, max_workers=workers).start()
+    while not job.done:
+        job.join(1)
+        progress = job.progress()
+        print(f"{progress['profiles_done']}/{progress['profiles_total']} profiles "
+              f"({progress['percent']}%), {progress['elapsed_seconds']} s", flush=True)
+    if job.state == "failed":
+        print(f"Failed: {job.error}")
+        sys.exit(1)
+    print(f"Wrote {job.matrix_shape[0]}x{job.matrix_shape[1]} feature matrix to {sys.argv[2]}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
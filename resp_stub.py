@@ -0,0 +1,130 @@
+import socketserver
+import threading
+import time
+
+
+class RESPStubServer:
+    """Local stand-in for a Redis server: the commands RedisCache sends, over real RESP.
+
+    Supports PING, GET, MGET, SET (with EX/PX), DEL, INCR, EXISTS, DBSIZE,
+    FLUSHDB, SELECT and AUTH. Keys live in one dict in this process.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.data = {}  # key -> (expires_at or None, value)
+        self.commands = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                while True:
+                    try:
+                        args = stub._read_command(self.rfile)
+                    except (ConnectionError, ValueError):
+                        return
+                    if args is None:
+                        return
+                    if not args:
+                        continue
+                    self.wfile.write(stub.dispatch(args))
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self._server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.host, self.port = self._server.server_address[:2]
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="resp-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def dispatch(self, args):
+        command, args = args[0].upper().decode(), args[1:]
+        with self._lock:
+            self.commands += 1
+            handler = getattr(self, f"_cmd_{command.lower()}", None)
+            if handler is None:
+                return _error(f"ERR unknown command '{command}'")
+            try:
+                return handler(*args)
+            except (IndexError, TypeError, ValueError):
+                return _error(f"ERR wrong arguments for '{command}'")
+
+    def _live(self, key):
+        entry = self.data.get(key)
+        if entry is not None and entry[0] is not None and entry[0] <= time.monotonic():
+            del self.data[key]
+            return None
+        return entry
+
+    def _cmd_ping(self, *args):
+        return b"+PONG\r\n"
+
+    def _cmd_auth(self, *args):
+        return b"+OK\r\n"
+
+    def _cmd_select(self, db):
+        return b"+OK\r\n"
+
+    def _cmd_get(self, key):
+        entry = self._live(key)
+        return _bulk(entry[1] if entry else None)
+
+    def _cmd_mget(self, *keys):
+        entries = [self._live(key) for key in keys]
+        return b"*%d\r\n" % len(keys) + b"".join(_bulk(e[1] if e else None) for e in entries)
+
+    def _cmd_set(self, key, value, *options):
+        expires_at = None
+        options = [o.upper() for o in options]
+        for unit, scale in ((b"EX", 1.0), (b"PX", 0.001)):
+            if unit in options:
+                expires_at = time.monotonic() + int(options[options.index(unit) + 1]) * scale
+        self.data[key] = (expires_at, value)
+        return b"+OK\r\n"
+
+    def _cmd_del(self, *keys):
+        return b":%d\r\n" % sum(self.data.pop(key, None) is not None for key in keys)
+
+    def _cmd_exists(self, *keys):
+        return b":%d\r\n" % sum(self._live(key) is not None for key in keys)
+
+    def _cmd_incr(self, key):
+        entry = self._live(key)
+        value = int(entry[1]) + 1 if entry else 1
+        self.data[key] = (entry[0] if entry else None, str(value).encode())
+        return b":%d\r\n" % value
+
+    def _cmd_dbsize(self):
+        return b":%d\r\n" % len(self.data)
+
+    def _cmd_flushdb(self, *args):
+        self.data.clear()
+        return b"+OK\r\n"
+
+    @staticmethod
+    def _read_command(reader):
+        line = reader.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            return line.split()  # inline command, e.g. from telnet
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(reader.readline()[1:])
+            args.append(reader.read(length + 2)[:-2])
+        return args
+
+
+def _bulk(value):
+    return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+def _error(message):
+    return f"-{message}\r\n".encode()
@@ -0,0 +1,99 @@
+import gzip
+import json
+import logging
+from datetime import date, datetime
+
+import numpy as np
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder is used instead
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional; responses fall back to gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_MIMETYPES = ("application/json", "text/html", "text/css", "text/plain",
+                          "application/javascript", "text/javascript")
+
+
+def _default(value):
+    """Types neither encoder handles natively: numpy scalars/arrays, dates, sets"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """``jsonify`` backed by orjson, with numpy values encoded directly.
+
+    Keys keep insertion order instead of being sorted. Without orjson the
+    stdlib encoder is used with the same numpy-aware fallback.
+    """
+
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            return self._dumps_bytes(obj).decode("utf-8")
+        kwargs.setdefault("default", _default)
+        kwargs.setdefault("ensure_ascii", False)
+        return json.dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = self._dumps_bytes(obj) if orjson is not None else self.dumps(obj)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+    @staticmethod
+    def _dumps_bytes(obj):
+        return orjson.dumps(obj, default=_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+
+def negotiate_encoding(accept_encodings):
+    """Best of br/gzip the client accepts, or None"""
+    for encoding in ("br", "gzip"):
+        if encoding == "br" and brotli is None:
+            continue
+        if accept_encodings[encoding] > 0:
+            return encoding
+    return None
+
+
+def compress_response(response, accept_encodings, min_size=1024, gzip_level=6, brotli_quality=5):
+    """Compress a buffered response body in place when it is worth it.
+
+    Streamed responses (SSE) are left alone, as are small bodies, errors
+    and anything that already carries a Content-Encoding.
+    """
+    response.vary.add("Accept-Encoding")
+    if (response.is_streamed or response.direct_passthrough or response.status_code < 200
+            or response.status_code >= 300 or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    encoding = negotiate_encoding(accept_encodings)
+    if encoding is None:
+        return response
+    body = response.get_data()
+    if len(body) < min_size:
+        return response
+
+    if encoding == "br":
+        compressed = brotli.compress(body, quality=brotli_quality)
+    else:
+        compressed = gzip.compress(body, compresslevel=gzip_level, mtime=0)
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+    return response
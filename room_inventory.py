@@ -0,0 +1,216 @@
+import threading
+from bisect import bisect_left, insort
+
+ROOM_TYPES = ("private", "shared")
+
+
+class Room:
+    """A room at a property and the users currently living in it"""
+
+    def __init__(self, room_id, property_key, room_type, capacity, floor=None, quiet_zone=False):
+        self.id = str(room_id)
+        self.property = str(property_key).strip().lower()
+        self.room_type = room_type
+        self.capacity = int(capacity)
+        self.floor = floor
+        self.quiet_zone = bool(quiet_zone)
+        self.occupants = []
+
+    @property
+    def free_beds(self):
+        return self.capacity - len(self.occupants)
+
+    def to_dict(self):
+        return {
+            "room_id": self.id,
+            "property": self.property,
+            "room_type": self.room_type,
+            "capacity": self.capacity,
+            "floor": self.floor,
+            "quiet_zone": self.quiet_zone,
+            "occupants": list(self.occupants),
+            "free_beds": self.free_beds
+        }
+
+
+class RoomInventory:
+    """Rooms, beds and occupants with indexes for the questions matching asks.
+
+    Rooms with free beds are kept per ``(property, room_type)`` in a list
+    sorted by ``(free_beds, room_id)``, so "a shared room at property Y with
+    at least n free beds" is a binary search that also returns the tightest
+    fit. Occupants are indexed by user id. ``version`` changes on every
+    update; ``version_of(property)`` changes only when that property's rooms
+    or occupants do, so cached match results for one property survive room
+    churn at the others.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._rooms = {}
+            self._by_property = {}
+            self._free = {}  # (property, room_type) -> sorted [(free_beds, room_id)]
+            self._room_of = {}
+            self.version = getattr(self, "version", 0) + 1
+            # Every per-property version restarts above anything handed out before the clear
+            self._version_base = self.version
+            self._versions = {}
+
+    def add_room(self, room_id, property_key, room_type="shared", capacity=2, floor=None, quiet_zone=False):
+        """Create or update a room; current occupants are kept if they still fit"""
+        if room_type not in ROOM_TYPES:
+            raise ValueError(f"room_type must be one of {', '.join(ROOM_TYPES)}")
+        room = Room(room_id, property_key, room_type, capacity, floor, quiet_zone)
+        if room.capacity < 1 or (room_type == "private" and room.capacity != 1):
+            raise ValueError("capacity must be at least 1, and exactly 1 for a private room")
+        with self._lock:
+            existing = self._rooms.get(room.id)
+            if existing is not None:
+                if len(existing.occupants) > room.capacity:
+                    raise ValueError(f"Room {room.id} has {len(existing.occupants)} occupants")
+                self._unindex(existing)
+                self._by_property[existing.property].discard(existing.id)
+                room.occupants = existing.occupants
+                self._touch(existing.property)
+            self._rooms[room.id] = room
+            self._by_property.setdefault(room.property, set()).add(room.id)
+            self._index(room)
+            self._touch(room.property)
+        return room
+
+    def remove_room(self, room_id):
+        with self._lock:
+            room = self._rooms.pop(str(room_id), None)
+            if room is None:
+                return None
+            self._unindex(room)
+            self._by_property[room.property].discard(room.id)
+            for user_id in room.occupants:
+                self._room_of.pop(user_id, None)
+            self._touch(room.property)
+        return room
+
+    def get(self, room_id):
+        return self._rooms.get(str(room_id))
+
+    def rooms(self, property_key=None):
+        if property_key is None:
+            return list(self._rooms.values())
+        return [self._rooms[room_id] for room_id in sorted(self._by_property.get(property_key, ()))]
+
+    def has_rooms(self, property_key):
+        return bool(self._by_property.get(property_key))
+
+    def room_of(self, user_id):
+        room_id = self._room_of.get(user_id)
+        return self._rooms.get(room_id) if room_id is not None else None
+
+    def roommates_of(self, user_id):
+        room = self.room_of(user_id)
+        return [u for u in room.occupants if u != user_id] if room else []
+
+    def assign(self, user_id, room_id):
+        """Move a user into a room, vacating any bed they held before"""
+        with self._lock:
+            room = self._rooms.get(str(room_id))
+            if room is None:
+                raise KeyError(room_id)
+            if user_id in room.occupants:
+                return room
+            if room.free_beds < 1:
+                raise ValueError(f"Room {room.id} is full")
+            previous = self._vacate(user_id)
+            if previous is not None:
+                self._touch(previous.property)
+            self._unindex(room)
+            room.occupants.append(user_id)
+            self._room_of[user_id] = room.id
+            self._index(room)
+            self._touch(room.property)
+        return room
+
+    def vacate(self, user_id):
+        """Free the bed a user holds; returns the room they left, if any"""
+        with self._lock:
+            room = self._vacate(user_id)
+            if room is not None:
+                self._touch(room.property)
+        return room
+
+    def version_of(self, property_key):
+        """Changes whenever a room at the property, or who lives in one, changes"""
+        return self._version_base + self._versions.get(property_key, 0)
+
+    def free_rooms(self, property_key, room_type=None, min_beds=1, floor=None, quiet_zone=None):
+        """Rooms with at least ``min_beds`` free beds, tightest fit first"""
+        types = [room_type] if room_type else ROOM_TYPES
+        found = []
+        with self._lock:
+            for kind in types:
+                entries = self._free.get((property_key, kind), [])
+                start = bisect_left(entries, (min_beds, ""))
+                found.extend(self._rooms[room_id] for _, room_id in entries[start:])
+        found.sort(key=lambda r: (r.free_beds, r.id))
+        return [r for r in found
+                if (floor is None or r.floor == floor) and (quiet_zone is None or r.quiet_zone == quiet_zone)]
+
+    def find_room(self, property_key, room_type, beds=1):
+        """Tightest-fitting room of a type with ``beds`` free beds, or None"""
+        with self._lock:
+            entries = self._free.get((property_key, room_type), [])
+            start = bisect_left(entries, (beds, ""))
+            return self._rooms[entries[start][1]] if start < len(entries) else None
+
+    def shared_room_for(self, user_a, user_b, property_key):
+        """A shared room at the property that both users could live in together.
+
+        Prefers a room one of them already occupies (with a bed left for the
+        other); otherwise the tightest shared room with two free beds.
+        """
+        for user, other in ((user_a, user_b), (user_b, user_a)):
+            room = self.room_of(user)
+            if room is not None and room.property == property_key and room.room_type == "shared":
+                if other in room.occupants or room.free_beds >= 1:
+                    return room
+        return self.find_room(property_key, "shared", beds=2)
+
+    def stats(self):
+        with self._lock:
+            rooms = list(self._rooms.values())
+        return {
+            "rooms": len(rooms),
+            "beds": sum(r.capacity for r in rooms),
+            "occupied_beds": sum(len(r.occupants) for r in rooms),
+            "free_beds": sum(r.free_beds for r in rooms),
+            "properties": sorted({r.property for r in rooms}),
+            "version": self.version
+        }
+
+    def _touch(self, property_key):
+        self.version += 1
+        self._versions[property_key] = self._versions.get(property_key, 0) + 1
+
+    def _vacate(self, user_id):
+        room_id = self._room_of.pop(user_id, None)
+        room = self._rooms.get(room_id) if room_id is not None else None
+        if room is not None:
+            self._unindex(room)
+            room.occupants.remove(user_id)
+            self._index(room)
+        return room
+
+    def _index(self, room):
+        if room.free_beds > 0:
+            insort(self._free.setdefault((room.property, room.room_type), []), (room.free_beds, room.id))
+
+    def _unindex(self, room):
+        entries = self._free.get((room.property, room.room_type))
+        if not entries:
+            return
+        position = bisect_left(entries, (room.free_beds, room.id))
+        if position < len(entries) and entries[position] == (room.free_beds, room.id):
+            del entries[position]
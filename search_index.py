@@ -0,0 +1,256 @@
+import logging
+import os
+import pickle
+import re
+import tempfile
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+PHRASE_RE = re.compile(r'"([^"]+)"')
+STOPWORDS = frozenset("a an and are as at be but by for i if in is it of on or so the to was with".split())
+# Positions jump between fields so a phrase never matches across two fields
+FIELD_GAP = 16
+# Phrase matching packs (document, position) into one integer key
+POSITION_BITS = 24
+
+
+def normalize_token(token):
+    """Lowercase token with possessives and plain plurals folded ("cats" -> "cat")"""
+    if token.endswith("'s"):
+        token = token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        token = token[:-1]
+    return token
+
+
+def tokenize(text, keep_stopwords=False):
+    tokens = (normalize_token(t) for t in TOKEN_RE.findall(str(text).lower()))
+    return [t for t in tokens if keep_stopwords or t not in STOPWORDS]
+
+
+class SearchIndex:
+    """In-process inverted index with positional postings and BM25 ranking.
+
+    Documents are added incrementally (re-adding an id replaces it). Quoted
+    parts of a query must match as exact phrases; all query terms are ranked
+    with BM25 over every indexed field. Postings are kept as dicts for cheap
+    updates and turned into numpy arrays lazily per term, so a query is a
+    handful of vectorized operations even at 100k documents.
+
+    With ``path`` set, the index is loaded from disk at start-up and re-saved
+    in the background every ``save_every`` changes. Only one background save
+    runs at a time; when it finishes it starts over if enough changes piled
+    up meanwhile. ``clear`` saves the empty index right away.
+    """
+
+    def __init__(self, path=None, save_every=100, k1=1.2, b=0.75):
+        self.path = path
+        self.save_every = save_every
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()  # one writer at a time, so an older snapshot never replaces a newer one
+        self._saving = False
+        self._reset()
+        if path and os.path.exists(path):
+            self._load(path)
+
+    def __len__(self):
+        return len(self._doc_numbers)
+
+    def add(self, doc_id, fields):
+        """Index ``{field_name: text}`` for a document"""
+        positions = {}
+        position = 0
+        for text in fields.values():
+            if not text:
+                continue
+            for token in tokenize(text, keep_stopwords=True):
+                if token not in STOPWORDS:
+                    positions.setdefault(token, []).append(position)
+                position += 1
+            position += FIELD_GAP
+
+        with self._lock:
+            self._remove(doc_id)
+            number = len(self._doc_ids)
+            self._doc_ids.append(doc_id)
+            self._doc_numbers[doc_id] = number
+            self._doc_terms[number] = list(positions)
+            for term, term_positions in positions.items():
+                self._postings.setdefault(term, {})[number] = term_positions
+                self._arrays.pop(term, None)
+            length = sum(len(p) for p in positions.values())
+            self._lengths.append(length)
+            self._lengths_array = None
+            self._total_length += length
+            self._dirty += 1
+        self._maybe_save()
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove(doc_id)
+            self._dirty += 1
+        self._maybe_save()
+
+    def search(self, query, limit=10):
+        """Return ``[(doc_id, score), ...]`` best first"""
+        phrases = [tokenize(p, keep_stopwords=True) for p in PHRASE_RE.findall(query)]
+        terms = tokenize(query)
+        with self._lock:
+            if not self._doc_numbers or not terms:
+                return []
+            scores = self._bm25(terms)
+            for phrase in phrases:
+                mask = np.zeros(len(scores), dtype=bool)
+                mask[self._phrase_docs(phrase)] = True
+                scores[~mask] = 0
+            hits = np.flatnonzero(scores > 0)
+            if len(hits) > limit:
+                hits = hits[np.argpartition(scores[hits], -limit)[-limit:]]
+            hits = hits[np.argsort(-scores[hits], kind="stable")]
+            return [(self._doc_ids[n], float(scores[n])) for n in hits]
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+            self._dirty += 1
+        # Otherwise a restart before the next save_every changes would bring the documents back
+        if self.path:
+            self.save()
+
+    def save(self, path=None):
+        """Write the index atomically (unique temp file + rename)"""
+        path = path or self.path
+        with self._save_lock:
+            with self._lock:
+                data = pickle.dumps({
+                    "doc_ids": self._doc_ids,
+                    "lengths": self._lengths,
+                    "postings": self._postings
+                }, protocol=pickle.HIGHEST_PROTOCOL)
+                self._dirty = 0
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                            prefix=f"{os.path.basename(path)}.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        logger.info("Saved search index with %d documents to %s", len(self), path)
+
+    def _maybe_save(self):
+        with self._lock:
+            if not self.path or self._saving or self._dirty < self.save_every:
+                return
+            self._saving = True
+        threading.Thread(target=self._save_in_background, name="search-index-save", daemon=True).start()
+
+    def _save_in_background(self):
+        while True:
+            try:
+                self.save()
+            except Exception:
+                logger.exception("Could not save the search index to %s", self.path)
+                with self._lock:
+                    self._saving = False
+                return
+            with self._lock:
+                # Checked and released under one lock, so an add in between can't be left unsaved
+                if self._dirty < self.save_every:
+                    self._saving = False
+                    return
+
+    def _reset(self):
+        self._doc_ids = []  # document number -> external id (None once removed)
+        self._doc_numbers = {}
+        self._lengths = []
+        self._lengths_array = None
+        self._postings = {}  # term -> {document number: [positions]}
+        self._arrays = {}
+        self._doc_terms = {}
+        self._total_length = 0
+        self._dirty = 0
+
+    def _load(self, path):
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+        self._doc_ids = data["doc_ids"]
+        self._lengths = data["lengths"]
+        self._postings = data["postings"]
+        self._doc_numbers = {doc_id: n for n, doc_id in enumerate(self._doc_ids) if doc_id is not None}
+        self._total_length = sum(self._lengths)
+        for term, docs in self._postings.items():
+            for number in docs:
+                self._doc_terms.setdefault(number, []).append(term)
+        logger.info("Loaded search index with %d documents from %s", len(self), path)
+
+    def _remove(self, doc_id):
+        number = self._doc_numbers.pop(doc_id, None)
+        if number is None:
+            return
+        for term in self._doc_terms.pop(number, ()):
+            del self._postings[term][number]
+            self._arrays.pop(term, None)
+            if not self._postings[term]:
+                del self._postings[term]
+        self._doc_ids[number] = None
+        self._total_length -= self._lengths[number]
+        self._lengths[number] = 0
+        self._lengths_array = None
+
+    def _term_arrays(self, term):
+        """``(document numbers, term frequencies)`` for a term, cached until it changes"""
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            docs = self._postings.get(term, {})
+            numbers = np.fromiter(docs.keys(), dtype=np.int64, count=len(docs))
+            frequencies = np.fromiter((len(p) for p in docs.values()), dtype=np.float64, count=len(docs))
+            arrays = self._arrays[term] = (numbers, frequencies, None)
+        return arrays
+
+    def _term_keys(self, term):
+        """Sorted ``document << POSITION_BITS | position`` keys for phrase matching"""
+        numbers, frequencies, keys = self._term_arrays(term)
+        if keys is None:
+            docs = self._postings.get(term, {})
+            keys = np.fromiter(((n << POSITION_BITS) | p for n, positions in docs.items() for p in positions),
+                               dtype=np.int64, count=int(frequencies.sum()))
+            keys.sort()
+            self._arrays[term] = (numbers, frequencies, keys)
+        return keys
+
+    def _phrase_docs(self, phrase):
+        """Document numbers containing the phrase tokens at consecutive positions"""
+        offsets = [(i, t) for i, t in enumerate(phrase) if t not in STOPWORDS]
+        if not offsets or any(t not in self._postings for _, t in offsets):
+            return np.empty(0, dtype=np.int64)
+        first_offset, first_term = offsets[0]
+        starts = self._term_keys(first_term) - first_offset
+        for offset, term in offsets[1:]:
+            starts = np.intersect1d(starts, self._term_keys(term) - offset, assume_unique=True)
+            if not len(starts):
+                break
+        return np.unique(starts >> POSITION_BITS)
+
+    def _bm25(self, terms):
+        if self._lengths_array is None:
+            self._lengths_array = np.asarray(self._lengths, dtype=np.float64)
+        lengths = self._lengths_array
+        n_docs = len(self._doc_numbers)
+        average_length = (self._total_length / n_docs) or 1.0
+        scores = np.zeros(len(lengths))
+        for term in set(terms):
+            if term not in self._postings:
+                continue
+            numbers, frequencies, _ = self._term_arrays(term)
+            idf = np.log(1 + (n_docs - len(numbers) + 0.5) / (len(numbers) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * lengths[numbers] / average_length)
+            scores[numbers] += terms.count(term) * idf * frequencies * (self.k1 + 1) / (frequencies + norm)
+        return scores
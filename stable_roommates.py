@@ -0,0 +1,235 @@
+from collections import deque
+
+import numpy as np
+from sklearn.neighbors import NearestNeighbors
+
+
+def build_preferences(X, k=10):
+    """Truncated preference lists from the KNN index over the feature matrix.
+
+    Each user ranks her top-k nearest neighbours; acceptability is made
+    symmetric (if j is in i's top-k, i is appended to j's list) and every list
+    is ordered by distance, so memory stays O(n * k).
+    Returns ``(preferences, distances)`` where ``distances[i][j]`` is the
+    euclidean distance between acceptable partners.
+    """
+    n = len(X)
+    if n < 2:
+        return [[] for _ in range(n)], [{} for _ in range(n)]
+    knn = NearestNeighbors(n_neighbors=min(k + 1, n), metric='euclidean')
+    knn.fit(X)
+    neighbor_distances, neighbor_indices = knn.kneighbors(X)
+
+    distances = [{} for _ in range(n)]
+    for i in range(n):
+        for d, j in zip(neighbor_distances[i], neighbor_indices[i]):
+            j = int(j)
+            if j == i:
+                continue
+            distances[i][j] = float(d)
+            distances[j].setdefault(i, float(d))
+    preferences = [sorted(row, key=lambda j, row=row: (row[j], j)) for row in distances]
+    return preferences, distances
+
+
+class StableRoommates:
+    """Irving's stable roommates algorithm over (possibly incomplete) preference lists.
+
+    ``solve`` returns a partner list (``None`` for users left unmatched) or
+    ``None`` when the instance admits no stable matching.
+    """
+
+    def __init__(self, preferences):
+        self.preferences = preferences
+        self.n = len(preferences)
+        self.rank = [{j: r for r, j in enumerate(row)} for row in preferences]
+        self.alive = [set(row) for row in preferences]
+        self._lo = [0] * self.n
+        self._hi = [len(row) - 1 for row in preferences]
+        self._emptied = False
+
+    def first(self, i):
+        row, alive = self.preferences[i], self.alive[i]
+        while self._lo[i] <= self._hi[i] and row[self._lo[i]] not in alive:
+            self._lo[i] += 1
+        return row[self._lo[i]] if self._lo[i] <= self._hi[i] else None
+
+    def second(self, i):
+        row, alive = self.preferences[i], self.alive[i]
+        seen_first = False
+        for position in range(self._lo[i], self._hi[i] + 1):
+            if row[position] in alive:
+                if seen_first:
+                    return row[position]
+                seen_first = True
+        return None
+
+    def last(self, i):
+        row, alive = self.preferences[i], self.alive[i]
+        while self._hi[i] >= self._lo[i] and row[self._hi[i]] not in alive:
+            self._hi[i] -= 1
+        return row[self._hi[i]] if self._hi[i] >= self._lo[i] else None
+
+    def remove(self, i, j):
+        self.alive[i].discard(j)
+        self.alive[j].discard(i)
+        if not self.alive[i] or not self.alive[j]:
+            self._emptied = True
+
+    def truncate_after(self, j, i):
+        """j keeps i as her last acceptable choice; everyone ranked below i is dropped"""
+        row = self.preferences[j]
+        for position in range(self.rank[j][i] + 1, self._hi[j] + 1):
+            if row[position] in self.alive[j]:
+                self.remove(j, row[position])
+        self._hi[j] = self.rank[j][i]
+
+    def phase_one(self):
+        held = [None] * self.n
+        free = deque(range(self.n))
+        while free:
+            i = free.popleft()
+            while True:
+                j = self.first(i)
+                if j is None:
+                    break
+                holder = held[j]
+                if holder is not None and self.rank[j][holder] < self.rank[j][i]:
+                    self.remove(i, j)
+                    continue
+                held[j] = i
+                self.truncate_after(j, i)
+                if holder is not None and holder != i:
+                    free.append(holder)
+                break
+        # Users emptied here are unmatched in every stable matching
+        self._emptied = False
+
+    def phase_two(self):
+        """Find and eliminate rotations until every list has at most one entry"""
+        path, on_path = [], {}
+        cursor = 0
+        while True:
+            if not path:
+                while cursor < self.n and len(self.alive[cursor]) < 2:
+                    cursor += 1
+                if cursor == self.n:
+                    return True
+                path.append(cursor)
+                on_path[cursor] = 0
+
+            current = self.second(path[-1])
+            following = self.last(current) if current is not None else None
+            if following is None:
+                on_path.pop(path.pop())
+                continue
+            if following not in on_path:
+                on_path[following] = len(path)
+                path.append(following)
+                continue
+
+            start = on_path[following]
+            cycle = path[start:]
+            seconds = [self.second(x) for x in cycle]
+            for x in cycle:
+                del on_path[x]
+            del path[start:]
+            # Guard against links that went stale since they were walked
+            if any(self.last(seconds[i]) != cycle[(i + 1) % len(cycle)] for i in range(len(cycle))):
+                path.clear()
+                on_path.clear()
+                continue
+
+            for x, y in zip(cycle, seconds):
+                self.truncate_after(y, x)
+            if self._emptied:
+                return False
+            while path and len(self.alive[path[-1]]) < 2:
+                on_path.pop(path.pop())
+
+    def solve(self):
+        self.phase_one()
+        if not self.phase_two():
+            return None
+        return [self.first(i) for i in range(self.n)]
+
+
+def count_blocking_pairs(partners, preferences, rank):
+    """Acceptable pairs who both prefer each other to their assigned partners"""
+    blocking = 0
+    for i, row in enumerate(preferences):
+        own = rank[i].get(partners[i], len(row)) if partners[i] is not None else len(row)
+        for j in row[:own]:
+            if j <= i:
+                continue
+            theirs = rank[j].get(partners[j], len(preferences[j])) if partners[j] is not None else len(preferences[j])
+            if rank[j][i] < theirs:
+                blocking += 1
+    return blocking
+
+
+def greedy_matching(preferences, distances, n, max_rounds=50):
+    """Minimal-instability fallback: greedy matching on mutual rank (closest pair
+    breaking ties), then repeatedly satisfy the tightest blocking pair and keep
+    the matching with fewest blocks"""
+    rank = [{j: r for r, j in enumerate(row)} for row in preferences]
+    edges = sorted((rank[i][j] + rank[j][i], d, i, j)
+                   for i, row in enumerate(distances) for j, d in row.items() if i < j)
+    edges = [(d, i, j) for _, d, i, j in edges]
+
+    def fill(partners):
+        for d, i, j in edges:
+            if partners[i] is None and partners[j] is None:
+                partners[i], partners[j] = j, i
+        return partners
+
+    partners = fill([None] * n)
+    best, best_blocking = list(partners), count_blocking_pairs(partners, preferences, rank)
+    for _ in range(max_rounds):
+        if best_blocking == 0:
+            break
+        tightest = None
+        for d, i, j in edges:
+            own_i = rank[i].get(partners[i], len(preferences[i])) if partners[i] is not None else len(preferences[i])
+            own_j = rank[j].get(partners[j], len(preferences[j])) if partners[j] is not None else len(preferences[j])
+            if rank[i][j] < own_i and rank[j][i] < own_j:
+                tightest = (i, j)
+                break
+        if tightest is None:
+            break
+        i, j = tightest
+        for user in (i, j):
+            if partners[user] is not None:
+                partners[partners[user]] = None
+        partners[i], partners[j] = j, i
+        partners = fill(partners)
+        blocking = count_blocking_pairs(partners, preferences, rank)
+        if blocking < best_blocking:
+            best, best_blocking = list(partners), blocking
+    return best, best_blocking
+
+
+def solve_stable_roommates(X, user_ids, k=10):
+    """Pair every user with a roommate; stable when possible, least unstable otherwise"""
+    X = np.asarray(X, dtype=float)
+    preferences, distances = build_preferences(X, k)
+    partners = StableRoommates(preferences).solve()
+    stable = partners is not None
+    if stable:
+        blocking = 0
+    else:
+        partners, blocking = greedy_matching(preferences, distances, len(X))
+
+    pairs, unmatched = [], []
+    for i, j in enumerate(partners):
+        if j is None:
+            unmatched.append(user_ids[i])
+        elif i < j:
+            pairs.append({"user_ids": [user_ids[i], user_ids[j]], "distance": distances[i][j]})
+    return {
+        "stable": stable,
+        "pairs": pairs,
+        "unmatched": unmatched,
+        "blocking_pairs": blocking,
+        "preference_list_length": k
+    }
@@ -132,6 +132,25 @@ function showMatchingResults(userId) {
     const resultsSection = document.getElementById('results-section');
     const resultsContainer = document.getElementById('results-container');
 
+    if (!window.EventSource) {
+        fetchMatchingResults(userId, resultsSection, resultsContainer);
+        return;
+    }
+
+    // The server pushes match-ready once the profile has been processed and
+    // match-updated whenever a newcomer changes the list, so no retry loop here
+    const events = new EventSource(`/match-events/${userId}`);
+    const onMatches = (event) => {
+        const result = JSON.parse(event.data);
+        const matches = (result.matches || []).map(toMatchCard);
+        if (matches.length > 0) renderMatches(matches, resultsSection, resultsContainer);
+    };
+    events.addEventListener('match-ready', onMatches);
+    events.addEventListener('match-updated', onMatches);
+    window.addEventListener('beforeunload', () => events.close());
+}
+
+function fetchMatchingResults(userId, resultsSection, resultsContainer) {
     fetch(`/match-user/${userId}`)
         .then(response => {
             if (!response.ok) throw new Error("Failed to fetch matches");
@@ -140,7 +159,7 @@ function showMatchingResults(userId) {
         .then(result => {
             const matches = result.matches;
             if (!matches || matches.length === 0) throw new Error("No matches returned");
-            renderMatches(matches, resultsSection, resultsContainer);
+            renderMatches(matches.map(toMatchCard), resultsSection, resultsContainer);
         })
         .catch(err => {
             console.warn("Using fallback matches due to error:", err.message);
@@ -153,6 +172,16 @@ function showMatchingResults(userId) {
         });
 }
 
+function toMatchCard(match) {
+    return {
+        name: match.user_name || match.name,
+        score: match.match_score !== undefined ? match.match_score / 100 : match.score,
+        profession: match.profession,
+        city: match.city,
+        avatar: match.avatar
+    };
+}
+
 function renderMatches(matches, section, container) {
     container.innerHTML = `
         <h2>Great news! We found ${matches.length} perfect match${matches.length > 1 ? 'es' : ''} for you! 🎉</h2>
@@ -169,7 +198,7 @@ function renderMatches(matches, section, container) {
         </div>
     `;
 
-    createConfetti();
+    if (section.style.display !== 'block') createConfetti();
     setTimeout(() => {
         document.querySelectorAll('.match-card').forEach(card => card.classList.add('show'));
     }, 500);
@@ -0,0 +1,142 @@
+"""Fingerprinted, precompressed static assets and a cached landing page.
+
+At start-up every file under the static folder is read once. Each file gets
+a content hash, and its gzip and brotli variants are built then, when they
+are smaller. ``url_for('static', filename='index.js')`` then returns
+``/static/index.<hash>.js``, which is served from memory with a one-year
+``immutable`` Cache-Control. Plain names still work, for example from
+cached HTML. They are served with ``no-cache`` and an ETag, so a
+revalidation costs one 304.
+
+The landing page is rendered once, on first use, and served the same way
+(always ``no-cache``, because it names the current fingerprints).
+"""
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import threading
+
+from flask import request
+
+from responses import COMPRESSIBLE_MIMETYPES, brotli, negotiate_encoding
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+class Asset:
+    """One response body held in memory with its precomputed encodings"""
+
+    def __init__(self, name, body, mimetype, gzip_level=9, brotli_quality=11):
+        self.name = name
+        self.body = body
+        self.mimetype = mimetype
+        self.digest = hashlib.sha256(body).hexdigest()[:12]
+        self.variants = {}
+        if mimetype in COMPRESSIBLE_MIMETYPES:
+            candidates = {"gzip": gzip.compress(body, compresslevel=gzip_level, mtime=0)}
+            if brotli is not None:
+                candidates["br"] = brotli.compress(body, quality=brotli_quality)
+            self.variants = {encoding: data for encoding, data in candidates.items() if len(data) < len(body)}
+
+    @property
+    def fingerprinted_name(self):
+        root, ext = os.path.splitext(self.name)
+        return f"{root}.{self.digest}{ext}"
+
+    def response(self, app, cache_control):
+        if request.if_none_match.contains(self.digest):
+            response = app.response_class(status=304)
+        else:
+            encoding = negotiate_encoding(request.accept_encodings)
+            response = app.response_class(self.variants.get(encoding, self.body), mimetype=self.mimetype)
+            if encoding in self.variants:
+                response.headers["Content-Encoding"] = encoding
+        response.set_etag(self.digest)
+        response.headers["Cache-Control"] = cache_control
+        response.vary.add("Accept-Encoding")
+        return response
+
+
+class AssetManifest:
+    """Every file under ``root`` keyed by its plain and its fingerprinted name"""
+
+    def __init__(self, root, gzip_level=9, brotli_quality=11):
+        self.root = root
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.assets = {}
+        self._by_fingerprint = {}
+        self._pages = {}
+        self._lock = threading.Lock()
+        self.scan()
+
+    def scan(self):
+        assets, by_fingerprint = {}, {}
+        for directory, _, files in os.walk(self.root):
+            for filename in files:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, self.root).replace(os.sep, "/")
+                mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+                with open(path, "rb") as f:
+                    asset = Asset(name, f.read(), mimetype, self.gzip_level, self.brotli_quality)
+                assets[name] = asset
+                by_fingerprint[asset.fingerprinted_name] = asset
+        self.assets, self._by_fingerprint = assets, by_fingerprint
+        logger.info("Fingerprinted %d static assets (%d bytes, %d bytes precompressed)", len(assets),
+                    sum(len(a.body) for a in assets.values()),
+                    sum(len(v) for a in assets.values() for v in a.variants.values()))
+
+    def url_name(self, filename):
+        asset = self.assets.get(filename)
+        return asset.fingerprinted_name if asset is not None else filename
+
+    def lookup(self, filename):
+        """``(asset, fingerprinted)`` for a requested name, or ``(None, False)``"""
+        asset = self._by_fingerprint.get(filename)
+        if asset is not None:
+            return asset, True
+        return self.assets.get(filename), False
+
+    def page(self, name, render):
+        """The rendered page ``name``, rendering it with ``render()`` the first time"""
+        page = self._pages.get(name)
+        if page is None:
+            with self._lock:
+                page = self._pages.get(name)
+                if page is None:
+                    page = self._pages[name] = Asset(name, render().encode("utf-8"), "text/html",
+                                                     self.gzip_level, self.brotli_quality)
+        return page
+
+    def stats(self):
+        return {
+            "assets": len(self.assets),
+            "bytes": sum(len(a.body) for a in self.assets.values()),
+            "precompressed_bytes": sum(len(v) for a in self.assets.values() for v in a.variants.values()),
+            "pages": sorted(self._pages)
+        }
+
+
+def register_assets(app, gzip_level=9, brotli_quality=11, max_age=IMMUTABLE_MAX_AGE):
+    """Serve ``app``'s static folder from an AssetManifest and fingerprint ``url_for('static', ...)``"""
+    manifest = AssetManifest(app.static_folder, gzip_level, brotli_quality)
+    fallback = app.view_functions["static"]
+
+    @app.url_defaults
+    def fingerprint_static(endpoint, values):
+        if endpoint == "static" and "filename" in values:
+            values["filename"] = manifest.url_name(values["filename"])
+
+    def serve_static(filename):
+        asset, fingerprinted = manifest.lookup(filename)
+        if asset is None:
+            # Files added after start-up are served from disk without the long cache
+            return fallback(filename=filename)
+        return asset.response(app, f"public, max-age={max_age}, immutable" if fingerprinted else "no-cache")
+
+    app.view_functions["static"] = serve_static
+    return manifest
@@ -0,0 +1,101 @@
+import gzip
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import archive_exporter  # noqa: E402
+from archive_exporter import ArchiveExporter, HTTPSink  # noqa: E402
+from archive_stub import ArchiveStubServer  # noqa: E402
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def make_exporter(server, **kwargs):
+    kwargs = {"flush_seconds": 60, "backoff_seconds": 0.01, "max_backoff_seconds": 0.05, **kwargs}
+    return ArchiveExporter(HTTPSink(f"{server.url}/archive"), **kwargs)
+
+
+def bundle_ids(server):
+    return [[json.loads(line)["call_id"] for line in gzip.decompress(body).splitlines()]
+            for body in server.objects.values()]
+
+
+def test_reports_are_shipped_in_bundles_of_batch_size():
+    server = ArchiveStubServer().start()
+    exporter = make_exporter(server, batch_size=3)
+    for i in range(7):
+        exporter.submit({"call_id": f"call_{i}"})
+    exporter.flush()
+    wait_until(lambda: exporter.profiles_shipped == 7)
+    assert bundle_ids(server) == [["call_0", "call_1", "call_2"], ["call_3", "call_4", "call_5"], ["call_6"]]
+    exporter.stop()
+    server.stop()
+
+
+def test_failed_bundle_backs_off_then_parks(monkeypatch):
+    delays = []
+    sleep = time.sleep
+
+    def record_backoff(seconds):
+        # time is shared with this test's own polling; only record the exporter's sleeps
+        if threading.current_thread().name == "archive-exporter":
+            delays.append(seconds)
+        else:
+            sleep(seconds)
+
+    monkeypatch.setattr(archive_exporter.time, "sleep", record_backoff)
+    server = ArchiveStubServer(failure_rate=1.0).start()
+    exporter = make_exporter(server, max_attempts=5)
+    exporter.submit({"call_id": "call_0"})
+    exporter.flush()
+    wait_until(lambda: exporter.failed_attempts == 5)
+    wait_until(lambda: exporter.stats()["pending_bundles"] == 1)
+    assert server.requests == 5 and server.objects == {}
+    # Exponential backoff capped at max_backoff_seconds, each delay jittered down by at most half
+    for delay, base in zip(delays, [0.01, 0.02, 0.04, 0.05]):
+        assert base * 0.5 <= delay <= base
+    assert len(delays) == 4
+    assert exporter.last_error
+    server.failure_rate = 0.0
+    exporter.stop()
+    server.stop()
+
+
+def test_parked_bundles_are_reshipped_oldest_first():
+    server = ArchiveStubServer(failure_rate=1.0).start()
+    exporter = make_exporter(server, batch_size=1, max_attempts=1)
+    exporter.submit({"call_id": "call_0"})
+    exporter.flush()
+    wait_until(lambda: exporter.failed_attempts == 1)
+    exporter.submit({"call_id": "call_1"})
+    exporter.flush()
+    wait_until(lambda: exporter.failed_attempts == 2)
+    wait_until(lambda: exporter.stats()["pending_bundles"] == 2)
+
+    server.failure_rate = 0.0
+    exporter.flush()
+    wait_until(lambda: exporter.bundles_shipped == 2)
+    assert bundle_ids(server) == [["call_0"], ["call_1"]]
+    assert exporter.stats()["pending_bundles"] == 0 and exporter.bundles_lost == 0
+    exporter.stop()
+    server.stop()
+
+
+def test_submit_drops_reports_when_the_queue_is_full():
+    server = ArchiveStubServer().start()
+    exporter = make_exporter(server, batch_size=10, max_queue=2)
+    assert exporter.submit({"call_id": "call_0"}) and exporter.submit({"call_id": "call_1"})
+    assert not exporter.submit({"call_id": "call_2"})
+    assert exporter.stats()["dropped"] == 1 and exporter.stats()["queued"] == 2
+    exporter.stop()
+    wait_until(lambda: exporter.profiles_shipped == 2)
+    server.stop()
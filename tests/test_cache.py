@@ -0,0 +1,51 @@
+import os
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import RedisCache, make_cache  # noqa: E402
+from partitions import PartitionShard  # noqa: E402
+from test_query_features import profile  # noqa: E402
+
+
+def test_get_many_and_set_many_round_trip():
+    cache = make_cache("stub://")
+    cache.set_many({"a": {"bedtime_num": 23}, "b": [1, 2.5, "x"]})
+    assert cache.get_many(["a", "missing", "b"]) == [{"bedtime_num": 23}, None, [1, 2.5, "x"]]
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 1
+
+
+def test_entries_expire_after_their_ttl():
+    cache = make_cache("stub://")
+    cache.set_many({"short": 1}, ttl=0.05)
+    cache.set_many({"long": 2}, ttl=60)
+    time.sleep(0.1)
+    assert cache.get_many(["short", "long"]) == [None, 2]
+
+
+def test_updated_profiles_miss_under_a_new_versioned_key():
+    cache = make_cache("stub://")
+    profiles = [profile(f"r{i}", "cat") for i in range(3)]
+    first = PartitionShard("north", cache=cache)
+    for p in profiles:
+        first.add(p)
+    first.snapshot()
+    hits, misses = cache.hits, cache.misses
+
+    second = PartitionShard("north", cache=cache)
+    for p in profiles[:2] + [profile("r2", "dog")]:  # r2 changed their answer
+        second.add(p)
+    second.snapshot()
+    assert (cache.hits - hits, cache.misses - misses) == (2, 1)
+
+
+def test_unreachable_server_is_a_miss():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]  # nothing listens here once the socket is closed
+    cache = RedisCache("127.0.0.1", port, timeout=0.2)
+    cache.set_many({"a": 1})
+    assert cache.get_many(["a", "b"]) == [None, None]
+    assert cache.stats()["errors"] >= 1
@@ -0,0 +1,24 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from deadline_matching import DeadlineMatcher  # noqa: E402
+from partitions import PartitionedIndex  # noqa: E402
+from test_query_features import profile  # noqa: E402
+
+
+def test_approximate_tier_keeps_the_stale_index_encoding():
+    index = PartitionedIndex()
+    for i, pets in enumerate(["cat", "cat", "none", "none"]):
+        index.add_profile(profile(f"r{i}", pets))
+    shard = index.shard_for("r0")
+    matcher = shard.snapshot()[0]
+    before = list(matcher.label_encoders["pets"].classes_)
+
+    index.add_profile(profile("newcomer", "dog", dietary="vegetarian"))  # the index is now stale
+    deadline = DeadlineMatcher(index, scheduler=None, n_matches=3)
+    first = deadline._approximate("newcomer")
+    assert first["index_generation"] < first["current_generation"]
+    assert list(matcher.label_encoders["pets"].classes_) == before
+    assert deadline._approximate("newcomer")["matches"] == first["matches"]
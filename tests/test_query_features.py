@@ -0,0 +1,50 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from partitions import PartitionShard  # noqa: E402
+
+
+def profile(call_id, pets, dietary="vegan", cleanliness="8/10"):
+    return {"call_id": call_id, "summary": "", "extracted_variables": {
+        "bedtime": "11 pm", "wake_time": "7 am", "sleep_type": "light sleeper",
+        "cleanliness_rating": cleanliness, "social_energy": "medium", "guests_preference": "rarely",
+        "room_preference": "private", "privacy_importance": "6/10", "pets": pets,
+        "substances": "none", "dietary": dietary, "noise_tolerance": "low"}}
+
+
+def make_shard():
+    shard = PartitionShard("north")
+    for i, (pets, cleanliness) in enumerate([("cat", "9/10"), ("cat", "2/10"), ("none", "5/10"), ("none", "8/10")]):
+        shard.add(profile(f"r{i}", pets, cleanliness=cleanliness))
+    return shard
+
+
+def test_query_with_unseen_category_leaves_encoders_alone():
+    shard = make_shard()
+    matcher = shard.snapshot()[0]
+    before = {col: list(encoder.classes_) for col, encoder in matcher.label_encoders.items()}
+    first = shard.query_profile(profile("q1", "dog", dietary="vegetarian"), n_matches=3)
+    assert {col: list(encoder.classes_) for col, encoder in matcher.label_encoders.items()} == before
+    # Encodes identically however often it is queried
+    again = shard.query_profile(profile("q1", "dog", dietary="vegetarian"), n_matches=3)
+    assert first == again
+
+
+def test_known_query_matches_its_stored_row():
+    shard = make_shard()
+    shard.query_profile(profile("q1", "dog", dietary="vegetarian"), n_matches=3)
+    distance, match = shard.query_profile(profile("q2", "none"), n_matches=1)[0]
+    assert match["user_id"] == "r3"
+    assert distance == 0.0
+
+
+def test_prepare_features_appends_new_classes_in_sorted_order():
+    shard = make_shard()
+    matcher, df = shard.snapshot()[:2]
+    known = list(matcher.label_encoders["pets"].classes_)
+    extra = df.copy()
+    extra["pets"] = ["other", "dog", "cat", "none"]
+    matcher.prepare_features(extra)
+    assert list(matcher.label_encoders["pets"].classes_) == known + ["dog", "other"]
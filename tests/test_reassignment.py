@@ -0,0 +1,36 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reassignment import LocalRepair  # noqa: E402
+from room_inventory import RoomInventory  # noqa: E402
+
+
+def compatibility(a, b):
+    return 0.9 if {a, b} == {"u1", "u2"} else 0.2
+
+
+def make_inventory():
+    inventory = RoomInventory()
+    for room_id in ("A", "B", "C"):
+        inventory.add_room(room_id, "north", "shared", capacity=2)
+    for user_id, room_id in (("u1", "A"), ("u2", "A"), ("u3", "B"), ("u4", "B")):
+        inventory.assign(user_id, room_id)
+    return inventory
+
+
+def test_move_out_keeps_compatible_pair_together():
+    inventory = make_inventory()
+    report = LocalRepair(inventory, compatibility).move_out("u4")
+    assert inventory.room_of("u1").id == inventory.room_of("u2").id
+    assert report["repair_gain"] >= 0
+    assert [m["user_id"] for m in report["moves"]] == ["u4"]
+
+
+def test_move_in_joins_most_compatible_room_over_empty_one():
+    inventory = make_inventory()
+    inventory.vacate("u2")
+    report = LocalRepair(inventory, compatibility).move_in("u2", "north")
+    assert inventory.room_of("u2").id == "A"
+    assert report["compatibility_delta"] > 0
@@ -0,0 +1,41 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model import RoommateMatchingModel  # noqa: E402
+from partitions import PartitionedIndex  # noqa: E402
+from test_query_features import profile  # noqa: E402
+
+
+def reparsed(profiles):
+    """Rows as a job with new parsing rules would produce them"""
+    df = RoommateMatchingModel().convert_omnidim_to_dataframe(profiles)
+    df["summary"] = "parsed under the new rules"
+    return df
+
+
+def test_unloaded_shards_keep_the_installed_rows():
+    index = PartitionedIndex()
+    for i, city in enumerate(["north", "north", "south", "south", "east"]):
+        index.add_profile(dict(profile(f"r{i}", "cat"), property_id=city))
+    index.snapshot("north")  # only north is loaded
+    profiles, layout = index.export()
+
+    installed, skipped = index.install(reparsed(profiles), layout)
+    assert sorted(installed) == ["east", "north", "south"] and skipped == []
+    assert not index.shard("south").loaded
+    south_df = index.snapshot("south")[1]
+    assert set(south_df["summary"]) == {"parsed under the new rules"}
+
+
+def test_shards_that_grew_since_the_export_are_skipped():
+    index = PartitionedIndex()
+    for i, city in enumerate(["north", "north", "south", "south"]):
+        index.add_profile(dict(profile(f"r{i}", "cat"), property_id=city))
+    profiles, layout = index.export()
+    index.add_profile(dict(profile("late", "none"), property_id="south"))
+
+    installed, skipped = index.install(reparsed(profiles), layout)
+    assert installed == ["north"] and skipped == ["south"]
+    assert "parsed under the new rules" not in set(index.snapshot("south")[1]["summary"])
@@ -0,0 +1,51 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import search_index  # noqa: E402
+from search_index import SearchIndex  # noqa: E402
+
+
+def wait_for_saves(index, timeout=5):
+    deadline = time.monotonic() + timeout
+    while index._saving and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_background_saves_never_overlap(tmp_path, monkeypatch):
+    path = str(tmp_path / "search.pkl")
+    index = SearchIndex(path=path, save_every=1)
+    writers, peak = [0], [0]
+    replace = os.replace
+
+    def slow_replace(src, dst):
+        writers[0] += 1
+        peak[0] = max(peak[0], writers[0])
+        time.sleep(0.01)
+        writers[0] -= 1
+        replace(src, dst)
+
+    monkeypatch.setattr(search_index.os, "replace", slow_replace)
+    threads = [threading.Thread(target=index.add, args=(f"call_{i}", {"summary": f"quiet tenant {i}"}))
+               for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wait_for_saves(index)
+
+    assert peak[0] == 1
+    assert len(SearchIndex(path=path)) == 20
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []
+
+
+def test_clear_is_saved_immediately(tmp_path):
+    path = str(tmp_path / "search.pkl")
+    index = SearchIndex(path=path, save_every=1)
+    index.add("call_0", {"summary": "loves cats"})
+    wait_for_saves(index)
+    index.clear()
+    assert len(SearchIndex(path=path)) == 0
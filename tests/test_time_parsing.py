@@ -0,0 +1,21 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model import RoommateMatchingModel  # noqa: E402
+
+
+def test_meridiem_without_minutes():
+    # "11 pm" used to parse as 11: the meridiem is group 2 in that pattern, not group 3
+    model = RoommateMatchingModel()
+    assert model.extract_time_from_text("11 pm") == 23
+    assert model.extract_time_from_text("around 7am") == 7
+    assert model.extract_time_from_text("12 am") == 0
+    assert model.extract_time_from_text("12 pm") == 12
+
+
+def test_meridiem_with_minutes():
+    model = RoommateMatchingModel()
+    assert model.extract_time_from_text("10:30 pm") == 22
+    assert model.extract_time_from_text("12:15 am") == 0
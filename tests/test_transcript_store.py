@@ -0,0 +1,26 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from transcript_store import TranscriptStore  # noqa: E402
+
+
+def test_records_are_readable_by_id_after_a_restart(tmp_path):
+    path = str(tmp_path / "transcripts.bin")
+    store = TranscriptStore(path=path, train_after=2)
+    for i in range(3):
+        store.put(f"call_{i}", {"fullConversation": f"Agent: When do you sleep?\nUser: At {i} am."})
+    stats = store.stats()
+
+    reopened = TranscriptStore(path=path, train_after=2)
+    assert reopened.get("call_2") == {"fullConversation": "Agent: When do you sleep?\nUser: At 2 am."}
+    assert reopened.stats() == stats
+
+
+def test_clear_forgets_the_persisted_index(tmp_path):
+    path = str(tmp_path / "transcripts.bin")
+    store = TranscriptStore(path=path)
+    store.put("call_0", {"fullConversation": "hello"})
+    store.clear()
+    assert TranscriptStore(path=path).get("call_0") is None
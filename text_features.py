@@ -0,0 +1,99 @@
+"""Dense lifestyle vectors from the free-text profile fields.
+
+The featurizer is fit offline on an export of profiles and loaded by the app
+at start-up; each profile is then transformed once, at ingest, and its vector
+is stored on the profile.
+
+Usage: python text_features.py profiles.json text_featurizer.pkl [n_components]
+
+``profiles.json`` is the body of ``GET /all-profiles`` (or a plain list of call reports).
+"""
+import json
+import logging
+import pickle
+import sys
+
+import numpy as np
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+
+logger = logging.getLogger(__name__)
+
+TEXT_FIELDS = ("summary", "cleanliness_habits")
+
+
+def profile_text(call_report):
+    """Free text of a call report that the featurizer reads"""
+    extracted_vars = call_report.get("extracted_variables", {}) or {}
+    parts = [call_report.get("summary"), extracted_vars.get("cleanliness_habits")]
+    return " ".join(str(part) for part in parts if part)
+
+
+class TextFeaturizer:
+    """Hashing vectorizer -> TF-IDF -> truncated SVD, L2-normalised.
+
+    Hashing keeps the vocabulary out of memory and makes unseen words harmless;
+    only the IDF weights and the SVD components are learned.
+    """
+
+    def __init__(self, n_components=16, n_features=2 ** 18):
+        self.n_components = n_components
+        self.vectorizer = HashingVectorizer(n_features=n_features, ngram_range=(1, 2), stop_words="english",
+                                            alternate_sign=False, norm=None)
+        self.tfidf = TfidfTransformer(sublinear_tf=True)
+        self.svd = None
+
+    @property
+    def dims(self):
+        return self.svd.n_components if self.svd is not None else 0
+
+    def fit(self, texts):
+        counts = self.vectorizer.transform(texts)
+        tfidf = self.tfidf.fit_transform(counts)
+        n_components = max(1, min(self.n_components, tfidf.shape[0] - 1, tfidf.nnz))
+        self.svd = TruncatedSVD(n_components=n_components, random_state=0).fit(tfidf)
+        logger.info("Fitted text featurizer on %d texts (%d dims, %.0f%% variance explained)",
+                    len(texts), n_components, 100 * self.svd.explained_variance_ratio_.sum())
+        return self
+
+    def transform(self, texts):
+        reduced = self.svd.transform(self.tfidf.transform(self.vectorizer.transform(texts)))
+        norms = np.linalg.norm(reduced, axis=1, keepdims=True)
+        return reduced / np.where(norms > 0, norms, 1)
+
+    def transform_profile(self, call_report):
+        """Vector stored on the profile at ingest, rounded to keep payloads small"""
+        return [round(float(v), 4) for v in self.transform([profile_text(call_report)])[0]]
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            featurizer = pickle.load(f)
+        if not isinstance(featurizer, cls):
+            raise TypeError(f"{path} does not contain a {cls.__name__}")
+        return featurizer
+
+
+def main():
+    if len(sys.argv) < 3:
+        print(__doc__)
+        sys.exit(1)
+    with open(sys.argv[1]) as f:
+        data = json.load(f)
+    profiles = data["profiles"] if isinstance(data, dict) else data
+    texts = [profile_text(p) for p in profiles]
+    n_components = int(sys.argv[3]) if len(sys.argv) > 3 else 16
+    # Pickle the class under its module name, not __main__, so the app can load it
+    from text_features import TextFeaturizer as ImportableFeaturizer
+    featurizer = ImportableFeaturizer(n_components=n_components).fit(texts)
+    featurizer.save(sys.argv[2])
+    print(f"Fitted on {len(texts)} profiles -> {featurizer.dims} dims, saved to {sys.argv[2]}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,191 @@
+"""Record live request streams to JSON lines for replay by ``benchmarks/replay_traffic.py``.
+
+``register_recording(app, recorder)`` captures every request whose path
+starts with one of ``routes`` (by default the Omnidim webhook and
+``/match-user``). Each line has the method, the route template, the
+concrete path, the query string, the JSON body, the recorded status and
+latency, and an offset in seconds from the start of the recording.
+
+Records are anonymized before they reach the disk (unless recording raw
+for later, offline anonymization with this module's CLI):
+
+* ids (``call_id`` and ``<user_id>``/``<call_id>`` in paths) become keyed
+  pseudonyms. The same id always maps to the same pseudonym within one
+  salt, so a replayed ``/match-user/<id>`` still finds the profile its
+  webhook created;
+* identifying fields (names, phone numbers, e-mail addresses) are replaced,
+  and those values plus anything shaped like a phone number or an e-mail
+  address are scrubbed from free text such as summaries and transcripts.
+
+Lifestyle answers in ``extracted_variables`` are kept, since matching
+depends on them.
+
+Usage: python traffic_recorder.py raw.jsonl anonymized.jsonl [salt]
+"""
+import hashlib
+import hmac
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROUTES = ("/omnidim-callback", "/match-user/")
+ID_KEYS = {"call_id", "user_id"}
+IDENTIFYING_KEYS = {"name", "user_name", "full_name", "caller_name", "phone", "phone_number", "phone_numbers",
+                    "to_number", "from_number", "email", "address"}
+EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+PHONE = re.compile(r"\+?\d[\d\s().-]{7,}\d")
+PATH_PARAM = re.compile(r"<(?:[^:<>]+:)?([^<>]+)>")
+
+
+class Anonymizer:
+    """Keyed pseudonyms for ids and identifying fields; see the module docstring"""
+
+    def __init__(self, salt=None):
+        self.salt = (salt or os.urandom(16).hex()).encode()
+
+    def pseudonym(self, value, prefix="id"):
+        digest = hmac.new(self.salt, str(value).encode("utf-8"), hashlib.sha256).hexdigest()
+        return f"{prefix}_{digest[:12]}"
+
+    def record(self, record):
+        record = dict(record)
+        view_args = {k: self.pseudonym(v) if k in ID_KEYS else v for k, v in (record.get("view_args") or {}).items()}
+        if view_args and record.get("route"):
+            record["path"] = PATH_PARAM.sub(lambda m: str(view_args.get(m.group(1), m.group(0))), record["route"])
+        record["view_args"] = view_args
+        if record.get("body") is not None:
+            names = set()
+            _collect_identifying(record["body"], names)
+            record["body"] = self.value(record["body"], names)
+        return record
+
+    def value(self, value, names=(), key=None):
+        if isinstance(value, dict):
+            return {k: self.value(v, names, k) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self.value(v, names, key) for v in value]
+        if value is None or isinstance(value, bool):
+            return value
+        if key in ID_KEYS:
+            return self.pseudonym(value)
+        if key in IDENTIFYING_KEYS:
+            return self.pseudonym(value, prefix=key)
+        if isinstance(value, str):
+            return self.text(value, names)
+        return value
+
+    def text(self, text, names=()):
+        text = EMAIL.sub("[email]", text)
+        text = PHONE.sub(lambda m: "[phone]" if sum(c.isdigit() for c in m.group(0)) >= 9 else m.group(0), text)
+        for name in names:
+            text = re.sub(rf"\b{re.escape(name)}\b", "[name]", text, flags=re.IGNORECASE)
+        return text
+
+
+def _collect_identifying(value, names, key=None):
+    """Identifying string values anywhere in ``value``, to be scrubbed from free text too"""
+    if isinstance(value, dict):
+        for k, v in value.items():
+            _collect_identifying(v, names, k)
+    elif isinstance(value, list):
+        for v in value:
+            _collect_identifying(v, names, key)
+    elif key in IDENTIFYING_KEYS and isinstance(value, str) and len(value.strip()) > 2:
+        names.add(value.strip())
+
+
+class TrafficRecorder:
+    """Appends one anonymized JSON line per captured request to ``path``"""
+
+    def __init__(self, path, routes=DEFAULT_ROUTES, salt=None, anonymize=True):
+        self.path = path
+        self.routes = tuple(routes)
+        self.anonymizer = Anonymizer(salt) if anonymize else None
+        self.recorded = 0
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def wants(self, path):
+        return path.startswith(self.routes)
+
+    def write(self, record):
+        if self.anonymizer is not None:
+            record = self.anonymizer.record(record)
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self.recorded += 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def stats(self):
+        return {"path": self.path, "routes": list(self.routes), "recorded": self.recorded}
+
+
+def register_recording(app, recorder):
+    """Capture matching requests around every view; the raw body is read before the view can mutate it"""
+
+    @app.before_request
+    def _start_recording():
+        if recorder.wants(request.path):
+            g.recording = (time.perf_counter(), request.get_data(cache=True))
+
+    @app.after_request
+    def _finish_recording(response):
+        recording = g.pop("recording", None)
+        if recording is None:
+            return response
+        started, raw = recording
+        try:
+            body = json.loads(raw) if raw else None
+        except ValueError:
+            body = None
+        try:
+            recorder.write({
+                "t": round(started - recorder.started, 6),
+                "ts": datetime.now().isoformat(),
+                "method": request.method,
+                "route": request.url_rule.rule if request.url_rule else None,
+                "path": request.path,
+                "view_args": request.view_args,
+                "query": request.query_string.decode("utf-8", errors="replace"),
+                "body": body,
+                "status": response.status_code,
+                "latency_ms": round((time.perf_counter() - started) * 1000, 3)
+            })
+        except Exception:
+            logger.exception("Could not record %s %s", request.method, request.path)
+        return response
+
+    return recorder
+
+
+def main():
+    if len(sys.argv) < 3:
+        print(__doc__)
+        sys.exit(1)
+    anonymizer = Anonymizer(sys.argv[3] if len(sys.argv) > 3 else None)
+    count = 0
+    with open(sys.argv[1], encoding="utf-8") as source, open(sys.argv[2], "w", encoding="utf-8") as target:
+        for line in source:
+            if line.strip():
+                target.write(json.dumps(anonymizer.record(json.loads(line)), default=str) + "\n")
+                count += 1
+    print(f"Anonymized {count} records into {sys.argv[2]}")
+
+
+if __name__ == "__main__":
+    main()
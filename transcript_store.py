@@ -0,0 +1,161 @@
+import json
+import os
+import re
+import threading
+import zlib
+from collections import Counter
+
+NO_DICTIONARY = 0
+TRAINED_DICTIONARY = 1
+MAX_DICTIONARY_SIZE = 32 * 1024  # zlib only looks back 32 KB
+
+
+def train_dictionary(samples, size=MAX_DICTIONARY_SIZE):
+    """Build a zlib preset dictionary from the phrases that recur across samples.
+
+    Transcripts share a lot of boilerplate (agent prompts, speaker labels,
+    JSON keys); priming the compressor with it helps short records most.
+    The most valuable phrases go last, where zlib finds them cheapest.
+    """
+    counts = Counter()
+    for sample in samples:
+        for phrase in set(re.split(r"(?<=[.?!\n])\s+", sample)):
+            if 8 <= len(phrase) <= 400:
+                counts[phrase] += 1
+    ranked = sorted((p for p, c in counts.items() if c > 1), key=lambda p: counts[p] * len(p))
+    dictionary, used = [], 0
+    for phrase in reversed(ranked):
+        encoded = phrase.encode("utf-8")
+        if used + len(encoded) > size:
+            continue
+        dictionary.append(encoded)
+        used += len(encoded)
+    return b"".join(reversed(dictionary))
+
+
+class TranscriptStore:
+    """Append-only store of zlib-compressed per-record blobs.
+
+    Records live in one contiguous buffer (or file, when ``path`` is given)
+    and are addressed by ``[offset, length, codec]``; only that small
+    reference stays on the profile. After ``train_after`` records a preset dictionary is
+    trained from them and used for every later record.
+
+    With a ``path``, the id -> reference index is appended to ``<path>.idx``
+    as JSON lines next to the data and ``.dict`` files, and reloaded on
+    start, so records written before a restart can still be read by id.
+    """
+
+    def __init__(self, path=None, level=6, train_after=200):
+        self.level = level
+        self.train_after = train_after
+        self._dictionary = None
+        self._samples = []
+        self._index = {}
+        self._raw_bytes = 0
+        self._lock = threading.Lock()
+        self._path = path
+        if path:
+            self._file = open(path, "a+b")
+            self._size = self._file.seek(0, os.SEEK_END)
+            if os.path.exists(path + ".dict"):
+                with open(path + ".dict", "rb") as f:
+                    self._dictionary = f.read() or None
+            self._load_index()
+            self._index_file = open(path + ".idx", "a", encoding="utf-8")
+        else:
+            self._buffer = bytearray()
+
+    def put(self, record_id, fields):
+        """Compress ``fields`` and return the reference stored on the profile"""
+        raw = json.dumps(fields, ensure_ascii=False).encode("utf-8")
+        with self._lock:
+            codec = TRAINED_DICTIONARY if self._dictionary else NO_DICTIONARY
+            compressor = zlib.compressobj(self.level, zdict=self._dictionary) if codec else zlib.compressobj(self.level)
+            blob = compressor.compress(raw) + compressor.flush()
+            offset = self._append(blob)
+            ref = (offset, len(blob), codec)
+            self._index[record_id] = ref
+            self._raw_bytes += len(raw)
+            if self._path:
+                self._index_file.write(json.dumps({"id": record_id, "ref": ref, "raw": len(raw)}) + "\n")
+                self._index_file.flush()
+            if self._dictionary is None and self.train_after:
+                self._samples.append(raw.decode("utf-8"))
+                if len(self._samples) >= self.train_after:
+                    self._dictionary = train_dictionary(self._samples) or None
+                    self._samples = []
+                    if self._dictionary and self._path:
+                        with open(self._path + ".dict", "wb") as f:
+                            f.write(self._dictionary)
+        return list(ref)
+
+    def get(self, record_id=None, ref=None):
+        """Load and decompress a record by id or by its ``[offset, length, codec]`` reference"""
+        with self._lock:
+            ref = ref or self._index.get(record_id)
+            if ref is None:
+                return None
+            offset, length, codec = ref
+            blob = self._read(offset, length)
+            dictionary = self._dictionary if codec == TRAINED_DICTIONARY else None
+        decompressor = zlib.decompressobj(zdict=dictionary) if dictionary else zlib.decompressobj()
+        return json.loads(decompressor.decompress(blob) + decompressor.flush())
+
+    def stats(self):
+        with self._lock:
+            records = len(self._index)
+            raw_bytes = self._raw_bytes
+            stored = sum(length for _, length, _ in self._index.values())
+            dictionary_bytes = len(self._dictionary) if self._dictionary else 0
+        return {
+            "records": records,
+            "raw_bytes": raw_bytes,
+            "stored_bytes": stored,
+            "compression_ratio": round(raw_bytes / stored, 2) if stored else None,
+            "dictionary_bytes": dictionary_bytes
+        }
+
+    def clear(self):
+        with self._lock:
+            self._index = {}
+            self._raw_bytes = 0
+            if self._path:
+                self._file.truncate(0)
+                self._size = 0
+                self._index_file.truncate(0)
+            else:
+                self._buffer = bytearray()
+
+    def _load_index(self):
+        """Reload ``<path>.idx``; a torn last line or a reference past the data file's end is skipped"""
+        if not os.path.exists(self._path + ".idx"):
+            return
+        with open(self._path + ".idx", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    offset, length, codec = entry["ref"]
+                except (ValueError, KeyError, TypeError):
+                    continue
+                if offset + length <= self._size:
+                    self._index[entry["id"]] = (offset, length, codec)
+                    self._raw_bytes += entry.get("raw", 0)
+
+    def _append(self, blob):
+        if self._path:
+            offset = self._size
+            self._file.seek(0, os.SEEK_END)
+            self._file.write(blob)
+            self._file.flush()
+            self._size += len(blob)
+            return offset
+        offset = len(self._buffer)
+        self._buffer.extend(blob)
+        return offset
+
+    def _read(self, offset, length):
+        if self._path:
+            self._file.seek(offset)
+            return self._file.read(length)
+        return bytes(self._buffer[offset:offset + length])